@@ -0,0 +1,198 @@
+"""End-to-end pipeline benchmark on synthetic data.
+
+Generates inputs with `benchmarks.synthetic`, then times every stage of `main.py` against
+them with Carbon Intensity data served by a local fake client:
+
+    python -m benchmarks.run --sessions 10000 100000 1000000 --output benchmarks/results.json
+
+Each scale writes one entry to the JSON results file with per-stage wall-clock seconds,
+so runs of different versions of the pipeline can be compared.
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from benchmarks.synthetic import FakeCarbonClient, FakeWeatherClient, generate_dataset
+from src.carbon.carbon_adapter import CarbonAdapter
+from src.carbon.carbon_fetcher import AsyncCarbonFetcher
+from src.carbon.carbon_intensity_api import CarbonIntensityAPI
+from src.carbon.carbon_store import CarbonStore
+from src.chargeplace.chargeplace_scotland_api import ChargePlaceScotlandAPI
+from src.chargeplace.sessions import expand_sessions
+from src.weather.weather_service import WeatherService
+from src.weather.weather_store import WeatherStore
+
+logger = logging.getLogger(__name__)
+
+STAGES = ('generate', 'load', 'spatial_join', 'session_expansion', 'carbon_fetch', 'weather_fetch', 'output_write')
+
+
+class StageTimer:
+    def __init__(self):
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name, **extra):
+        start = time.perf_counter()
+        yield extra
+        self.stages[name] = dict(seconds=round(time.perf_counter() - start, 4), **extra)
+        logger.info('%-18s %8.2fs %s', name, self.stages[name]['seconds'], extra)
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def authority_infrastructure(base_dir):
+    """Yield (local_auth, charging infrastructure) for every authority with at least one charger."""
+    for local_auth in sorted(os.listdir(base_dir)):
+        path = os.path.join(base_dir, local_auth, 'charging_infrastructure.csv')
+        if os.path.exists(path):
+            infrastructure = pd.read_csv(path)
+            if not infrastructure.empty:
+                yield local_auth, infrastructure
+
+
+def run_scale(n_sessions, workdir, args):
+    timer = StageTimer()
+    data_dir = os.path.join(workdir, 'source')
+    base_dir = os.path.join(workdir, 'result')
+
+    with timer.stage('generate', sessions=n_sessions):
+        paths = generate_dataset(data_dir, n_sessions, n_chargers=args.chargers,
+                                 n_authorities=args.authorities, seed=args.seed)
+
+    with timer.stage('load', sessions=n_sessions):
+        api = ChargePlaceScotlandAPI(paths['feature_collection'], paths['sessions'], paths['council_shp'],
+                                     paths['council_csv'], carbon_cache_path=None, cache_dir=None)
+        # inputs are loaded on first use; load them here so this stage keeps timing the parsing
+        api.feature_collection, api.session_store, api.council_areas
+    timer.stages['load']['sessions_loaded'] = len(api.sessions)
+
+    client = FakeCarbonClient()
+    # a fetcher of our own so the fake client is the only one the benchmark ever talks to
+    fetcher = AsyncCarbonFetcher(client=client, rate=args.carbon_rate, burst=args.carbon_rate)
+    carbon_api = CarbonIntensityAPI(client=client)
+    carbon_api.service.fetcher = fetcher
+    api.carbon_adapter = CarbonAdapter(api=carbon_api, store=CarbonStore(os.path.join(workdir, 'carbon.sqlite')))
+
+    with timer.stage('spatial_join', chargers=len(api.feature_collection)):
+        api.create_folder_structure(base_dir=base_dir)
+        api.locate_council_area_charging_infrastructure(base_dir=base_dir)
+
+    # expansion and carbon fetches run inside the populate stage as well; they are timed on
+    # their own here so a regression can be attributed to one of them
+    joined = [(local_auth, api.session_store.join(infrastructure.astype({'CP ID': str, 'Connector': str})))
+              for local_auth, infrastructure in authority_infrastructure(base_dir)]
+
+    with timer.stage('session_expansion', sessions=sum(len(sessions) for _, sessions in joined)) as extra:
+        intervals = 0
+        for _, sessions in joined:
+            energy, occupied = expand_sessions(sessions['Start'].values, sessions['Duration'].values,
+                                               sessions['Consumed(kWh)'].values,
+                                               sessions['Nominal Power (kW)'].values, args.granularity)
+            intervals += len(energy.timestamp) + len(occupied.timestamp)
+        extra['intervals'] = intervals
+
+    with timer.stage('carbon_fetch', authorities=len(joined)) as extra:
+        for _, sessions in joined:
+            start = sessions['Start'].min().floor(f'{args.granularity}min')
+            end = (sessions['Start'] + sessions['Duration']).max().ceil(f'{args.granularity}min')
+            api.carbon_adapter.fetch(start.isoformat(), end.isoformat(), 'postcode',
+                                     postcode=sessions['Postcode'].mode()[0])
+        extra['requests'] = client.requests
+    del joined
+
+    if args.weather:
+        weather_client = FakeWeatherClient()
+        api.weather_service = WeatherService(WeatherStore(os.path.join(workdir, 'weather.sqlite')),
+                                             client=weather_client)
+        with timer.stage('weather_fetch') as extra:
+            api.fetch_and_store_weather(base_dir=base_dir)
+            extra['requests'] = weather_client.requests
+            extra['locations'] = weather_client.locations
+
+    # carbon data is now cached, so this is dominated by expansion, merging and writing
+    with timer.stage('output_write', format=args.output_format, backend='thread'):
+        api.populate_session_data_per_charger(granularity=args.granularity, base_dir=base_dir,
+                                              max_workers=args.max_workers, expansion='vectorized',
+                                              backend='thread', output_format=args.output_format,
+                                              incremental=False, weather=args.weather)
+    fetcher.close()
+
+    return {
+        'sessions': n_sessions,
+        'chargers': len(api.feature_collection),
+        'authorities': args.authorities,
+        'granularity': args.granularity,
+        'stages': timer.stages,
+    }
+
+
+def build_parser():
+    p = argparse.ArgumentParser(description='Benchmark the GridCharge pipeline on synthetic data.')
+    p.add_argument('--sessions', type=int, nargs='+', default=[10_000, 100_000],
+                   help='Session counts to benchmark, e.g. 10000 1000000 10000000.')
+    p.add_argument('--chargers', type=int, default=None,
+                   help='Number of chargers (default scales with the session count).')
+    p.add_argument('--authorities', type=int, default=8)
+    p.add_argument('--granularity', type=int, default=30)
+    p.add_argument('--max-workers', type=int, default=4)
+    p.add_argument('--output-format', choices=['csv', 'parquet'], default='csv')
+    p.add_argument('--carbon-rate', type=float, default=1000.0,
+                   help='Requests per second allowed to the fake Carbon Intensity client.')
+    p.add_argument('--weather', action='store_true',
+                   help='Also fetch weather from a fake client and join it onto the outputs.')
+    p.add_argument('--seed', type=int, default=0)
+    p.add_argument('--workdir', default=None,
+                   help='Keep generated inputs and outputs here instead of a temporary directory.')
+    p.add_argument('--output', default='benchmarks/results.json')
+    return p
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    args = build_parser().parse_args()
+
+    results = []
+    for n_sessions in args.sessions:
+        logger.info('Benchmarking %d sessions', n_sessions)
+        if args.workdir:
+            workdir = os.path.join(args.workdir, str(n_sessions))
+            os.makedirs(workdir, exist_ok=True)
+            results.append(run_scale(n_sessions, workdir, args))
+        else:
+            with tempfile.TemporaryDirectory(prefix='gridcharge_bench_') as workdir:
+                results.append(run_scale(n_sessions, workdir, args))
+
+    report = {
+        'commit': git_commit(),
+        'created': datetime.now(timezone.utc).isoformat(),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'pandas': pd.__version__,
+        'results': results,
+    }
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2, default=str)
+    logger.info('Wrote benchmark results to %s', args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,215 @@
+"""Synthetic inputs for benchmarking the GridCharge pipeline without the real exports or API.
+
+Generates, at a configurable scale, the same files `main.py` reads:
+
+* a council-area shapefile plus `council_areas.csv` (a grid of rectangular areas over Scotland),
+* a charge point feature collection JSON with chargers placed inside those areas,
+* an `all_sessions.csv` in the format written by `data/scraper.py`,
+
+plus fake `CarbonClient` and `OpenMeteoClient` stand-ins that answer Carbon Intensity API
+URLs and hourly weather requests locally.
+"""
+
+import json
+import os
+import re
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+# bounding box (lon, lat) roughly covering mainland Scotland
+LON_RANGE = (-6.0, -2.0)
+LAT_RANGE = (55.0, 58.5)
+
+FUELS = ["biomass", "coal", "imports", "gas", "nuclear", "other", "hydro", "solar", "wind"]
+CARBON_INDEX_LEVELS = ['very low', 'low', 'moderate', 'high', 'very high']
+CONNECTOR_TYPES = [('Type 2', 7.0), ('Type 2', 22.0), ('CCS', 50.0), ('CHAdeMO', 50.0)]
+
+Charger = namedtuple('Charger', ['cp_id', 'connectors', 'latitude', 'longitude', 'postcode'])
+Area = namedtuple('Area', ['local_auth', 'region_id', 'bounds'])
+
+
+def council_areas(n_authorities):
+    """Split the bounding box into a grid of `n_authorities` rectangular areas."""
+    columns = int(np.ceil(np.sqrt(n_authorities)))
+    rows = int(np.ceil(n_authorities / columns))
+    lon_step = (LON_RANGE[1] - LON_RANGE[0]) / columns
+    lat_step = (LAT_RANGE[1] - LAT_RANGE[0]) / rows
+    areas = []
+    for k in range(n_authorities):
+        row, column = divmod(k, columns)
+        west = LON_RANGE[0] + column * lon_step
+        south = LAT_RANGE[0] + row * lat_step
+        areas.append(Area(f'Authority {k:02d}', 1 + k % 2, (west, south, west + lon_step, south + lat_step)))
+    return areas
+
+
+def write_council_areas(shp_path, csv_path, areas):
+    import geopandas as gpd
+    from shapely.geometry import box
+
+    polygons = gpd.GeoDataFrame({
+        'local_auth': [a.local_auth for a in areas],
+        'la_s_code': [f'S{k:08d}' for k in range(len(areas))],
+        'cc_name': [a.local_auth for a in areas],
+        'active': 'Yes',
+        'url': '',
+        'sh_date_up': '2024-01-01',
+        'sh_src': 'synthetic',
+        'sh_src_id': 0,
+    }, geometry=[box(*a.bounds) for a in areas], crs='EPSG:4326')
+    os.makedirs(os.path.dirname(shp_path) or '.', exist_ok=True)
+    polygons.to_file(shp_path)
+    pd.DataFrame({'local_auth': [a.local_auth for a in areas],
+                  'region_id': [a.region_id for a in areas]}).to_csv(csv_path, index=False)
+
+
+def make_chargers(n_chargers, areas, rng):
+    chargers = []
+    for k in range(n_chargers):
+        area = areas[k % len(areas)]
+        west, south, east, north = area.bounds
+        # keep points away from the edges so every charger falls inside exactly one area
+        longitude = rng.uniform(west + 0.01, east - 0.01)
+        latitude = rng.uniform(south + 0.01, north - 0.01)
+        connectors = int(rng.integers(1, 3))
+        chargers.append(Charger(str(50000 + k), connectors, latitude, longitude,
+                                f'S{areas.index(area)}{k % 3} 1AA'))
+    return chargers
+
+
+def write_feature_collection(path, chargers, rng):
+    features = []
+    for charger in chargers:
+        groups = []
+        for group_id in range(1, charger.connectors + 1):
+            plug, power = CONNECTOR_TYPES[int(rng.integers(len(CONNECTOR_TYPES)))]
+            groups.append({'connectorGroupID': group_id,
+                           'connectors': [{'connectorPlugTypeName': plug, 'connectorMaxChargeRate': power}]})
+        features.append({
+            'type': 'Feature',
+            # the pipeline reads coordinates as (latitude, longitude)
+            'geometry': {'type': 'Point', 'coordinates': [charger.latitude, charger.longitude]},
+            'properties': {
+                'name': charger.cp_id,
+                'tariff': {'amount': round(float(rng.uniform(0.2, 0.8)), 2), 'connectionfee': 0},
+                'address': {'sitename': f'Site {charger.cp_id}', 'postcode': charger.postcode},
+                'connectorGroups': groups,
+            },
+        })
+    with open(path, 'w') as f:
+        json.dump({'type': 'FeatureCollection', 'features': features}, f)
+
+
+def write_sessions_csv(path, chargers, n_sessions, rng, start='2022-01-01', days=365, chunk_size=1_000_000):
+    """Write `n_sessions` random sessions in chunks so memory stays bounded at any scale."""
+    keys = [(c.cp_id, connector) for c in chargers for connector in range(1, c.connectors + 1)]
+    origin = pd.Timestamp(start).value // 10 ** 9
+    header = True
+    for offset in range(0, n_sessions, chunk_size):
+        n = min(chunk_size, n_sessions - offset)
+        picks = rng.integers(len(keys), size=n)
+        starts = pd.to_datetime(origin + rng.integers(0, days * 86400, size=n), unit='s')
+        duration = rng.gamma(2.0, 3600.0, size=n).clip(60, 86000).astype(np.int64)
+        consumed = np.round(rng.uniform(0.5, 40.0, size=n), 2)
+        chunk = pd.DataFrame({
+            'Start': starts.strftime('%Y-%m-%d %H:%M:%S'),
+            'Duration': [f'{s // 3600:02d}:{s % 3600 // 60:02d}:{s % 60:02d}' for s in duration],
+            'Consumed(kWh)': consumed,
+            'Paid(gbp)': np.round(consumed * 0.3, 2),
+            'CP ID': [keys[p][0] for p in picks],
+            'Connector': [keys[p][1] for p in picks],
+        })
+        chunk.to_csv(path, mode='w' if header else 'a', header=header, index=False)
+        header = False
+
+
+def generate_dataset(directory, n_sessions, n_chargers=None, n_authorities=8, seed=0):
+    """Write a complete synthetic input set into `directory` and return the paths main.py needs."""
+    rng = np.random.default_rng(seed)
+    n_chargers = n_chargers or max(10, min(20000, n_sessions // 500))
+    os.makedirs(directory, exist_ok=True)
+    paths = {
+        'feature_collection': os.path.join(directory, 'feature_collection.json'),
+        'sessions': os.path.join(directory, 'all_sessions.csv'),
+        'council_shp': os.path.join(directory, 'geo_data', 'pub_commcnc.shp'),
+        'council_csv': os.path.join(directory, 'council_areas.csv'),
+    }
+    areas = council_areas(n_authorities)
+    chargers = make_chargers(n_chargers, areas, rng)
+    write_council_areas(paths['council_shp'], paths['council_csv'], areas)
+    write_feature_collection(paths['feature_collection'], chargers, rng)
+    write_sessions_csv(paths['sessions'], chargers, n_sessions, rng)
+    return paths
+
+
+class FakeCarbonClient:
+    """Stand-in for `CarbonClient` that builds Carbon Intensity API payloads locally.
+
+    Values are deterministic per region and half hour, so repeated runs are comparable.
+    Counts the requests it serves in `requests`.
+    """
+
+    RANGE = re.compile(r'/intensity/([^/]+)/([^/]+)(?:/(regionid|postcode)/([^/]+))?$')
+    POSTCODE = re.compile(r'/regional/postcode/([^/]+)$')
+
+    def __init__(self):
+        self.requests = 0
+
+    @staticmethod
+    def _region(kind, value):
+        if kind == 'regionid':
+            return int(value)
+        # same rule as the synthetic areas: region ids alternate between 1 and 2
+        return 1 + int(re.sub(r'\D', '', value)[:-1] or 0) % 2
+
+    def fetch_json(self, url, timeout=20):
+        self.requests += 1
+        match = self.POSTCODE.search(url)
+        if match:
+            return {'data': [{'regionid': self._region('postcode', match.group(1)), 'postcode': match.group(1)}]}
+
+        match = self.RANGE.search(url)
+        start, end, kind, value = match.groups()
+        ends = pd.date_range(pd.Timestamp(start), pd.Timestamp(end), freq='30min')
+        data = []
+        for ts in ends:
+            step = ts.value // (1800 * 10 ** 9)
+            forecast = 50 + step % 200
+            data.append({
+                'from': (ts - pd.Timedelta(minutes=30)).strftime('%Y-%m-%dT%H:%MZ'),
+                'to': ts.strftime('%Y-%m-%dT%H:%MZ'),
+                'intensity': {'forecast': int(forecast), 'index': CARBON_INDEX_LEVELS[forecast * 5 // 250]},
+                'generationmix': [{'fuel': fuel, 'perc': round(100.0 / len(FUELS), 1)} for fuel in FUELS],
+            })
+        if kind is None:
+            return {'data': data}
+        return {'data': {'regionid': self._region(kind, value), 'data': data}}
+
+
+class FakeWeatherClient:
+    """Stand-in for `OpenMeteoClient` that builds hourly weather locally.
+
+    Values are deterministic per location and hour. Counts the requests it serves in
+    `requests` and the locations asked for in `locations`.
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.locations = 0
+
+    def hourly(self, latitudes, longitudes, start_date, end_date, variables):
+        self.requests += 1
+        self.locations += len(latitudes)
+        timestamps = pd.date_range(pd.Timestamp(start_date, tz='UTC'),
+                                   pd.Timestamp(end_date, tz='UTC') + pd.Timedelta(hours=23), freq='60min')
+        hours = np.asarray((timestamps - pd.Timestamp(0, tz='UTC')) // pd.Timedelta(hours=1))
+        frames = []
+        for latitude, longitude in zip(latitudes, longitudes):
+            seed = int(round(latitude * 10)) * 7 + int(round(longitude * 10)) * 3
+            frame = pd.DataFrame({'timestamp': timestamps})
+            for k, variable in enumerate(variables):
+                frame[variable] = ((hours + seed + 5 * k) % 24).astype(np.float32)
+            frames.append(frame)
+        return frames
@@ -1,136 +1,160 @@
 import requests
+import hashlib
 import json
 import os
 import re
+import sys
 import requests
 from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
 from urllib.parse import urljoin
 import pandas as pd
 import io 
 import numpy as np
-from datetime import timedelta
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 
+# run as `python data/scraper.py`, only data/ is on sys.path; the session store lives in src/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.chargeplace.session_partitions import DEFAULT_SESSIONS_DIR, SessionPartitions
 
-def clean_data(df):
-    # Handle missing values: fill with NaN and optionally drop or fill them
 
-    df.replace('', np.nan, inplace=True)
-    df.dropna(subset=['Duration', 'Start', 'Consumed(kWh)'], inplace=True)  # Drop rows where elements are NaN
-    # df.fillna(method='ffill', inplace=True)  # Forward fill NaN values
-    
-    # drop rows with zero consumption
-    df = df[df['Consumed(kWh)'] > 0]
+START_FORMAT = '%Y-%m-%d %H:%M:%S'
 
-    # Remove duplicates
-    # df.drop_duplicates(inplace=True)
 
-    # Function to check if a string represents a valid timedelta (not a date)
-    def is_valid_timedelta(value):
-        try:
-            pd.to_timedelta(value)
-            return True
-        except Exception as e:
-            # print(f"  -> ERROR: Reason: {e}")
-            return False
+def validate_sessions(df):
+    """
+    Validates every session row in a single vectorized pass.
 
-    def is_valid_datetime(value):
-        try:
-            pd.to_datetime(value, format='%Y-%m-%d %H:%M:%S', errors='raise')
-            return True
-        except Exception as e:
-            # print(f"  -> ERROR: Reason: {e}")
-            return False
+    Each column is parsed once (unparseable values become NaT) and every rejected row is
+    attributed to the first check it fails.
+
+    Args:
+        df (pd.DataFrame): Sessions with 'Start', 'Duration' and 'Consumed(kWh)' columns.
 
-    # Apply the function to create a boolean mask
-    mask_1 = df['Duration'].apply(is_valid_timedelta)
-    mask_2 = df['Start'].apply(is_valid_datetime)
+    Returns:
+        tuple: (valid mask, parsed 'Start' and 'Duration' values, {reason: rejected row count}).
+    """
+    start = df['Start']
+    if not pd.api.types.is_datetime64_any_dtype(start):
+        start = pd.to_datetime(start, format=START_FORMAT, errors='coerce')
+    duration = pd.to_timedelta(df['Duration'], errors='coerce')
+    consumed = pd.to_numeric(df['Consumed(kWh)'], errors='coerce')
+
+    missing = df[['Duration', 'Start', 'Consumed(kWh)']].isna().any(axis=1)
+    checks = [
+        ('missing values', missing),
+        ('non-positive consumption', ~(consumed > 0)),
+        ('invalid duration', duration.isna()),
+        ('invalid start', start.isna()),
+        ('duration over 1 day', duration > pd.Timedelta(days=1)),
+    ]
 
-    # Filter the DataFrame to keep only valid timedelta strings
-    df_filtered = df[mask_1 & mask_2]
+    valid = pd.Series(True, index=df.index)
+    rejected = {}
+    for reason, failed in checks:
+        failed = failed & valid
+        rejected[reason] = int(failed.sum())
+        valid &= ~failed
 
-    print(f'  -> Cleaning the data: Removed {round((len(df) - len(df_filtered)) / len(df), 6) * 100}% of records')
-    #else:
-    #    df_filtered[column] = df_filtered[column].astype(dtype, errors='ignore')
+    return valid, pd.DataFrame({'Start': start, 'Duration': duration}), rejected
 
-    df_filtered = df_filtered.dropna(subset=['Duration', 'Start', 'Consumed(kWh)'])  # Drop rows where elements are NaN
 
-    # Remove any rows where Duration is longer than 1 day
-    try:
-        durations_td = pd.to_timedelta(df_filtered['Duration'], errors='coerce')
-        mask_duration = durations_td <= pd.Timedelta(days=1)
-        removed_long = (~mask_duration).sum()
-        if removed_long:
-            print(f"  -> Filtering: Removed {int(removed_long)} record(s) with 'Duration' > 1 day")
-        df_filtered = df_filtered[mask_duration]
-    except Exception as e:
-        print(f"  -> Warning: Failed to filter long durations. Reason: {e}")
+def clean_data(df):
+    """
+    Drops incomplete or invalid sessions and reports how many rows were removed for which reason.
+
+    'Start' and 'Duration' are returned parsed (datetime64 and timedelta64), so later stages
+    do not parse them again.
+    """
+    # Handle missing values: fill with NaN and optionally drop or fill them
+    df = df.replace('', np.nan)
+
+    valid, parsed, rejected = validate_sessions(df)
+
+    df_filtered = df[valid].copy()
+    df_filtered['Start'] = parsed['Start'][valid]
+    df_filtered['Duration'] = parsed['Duration'][valid]
+
+    removed = len(df) - len(df_filtered)
+    share = round(removed / len(df) * 100, 4) if len(df) else 0
+    print(f'  -> Cleaning the data: Removed {removed} record(s) ({share}%)')
+    for reason, count in rejected.items():
+        if count:
+            print(f"     - {reason}: {count}")
 
     return df_filtered
 
 
-def convert_datetime_with_validation(df, column_name, known_year, known_month):
-    """
-    Identifies the correct datetime format by validating against the first and last records.
+DATETIME_FORMATS = [
+    '%d-%m-%Y %H:%M:%S', '%d/%m/%Y %H:%M:%S', '%d-%m-%y %H:%M:%S',
+    '%m-%d-%Y %H:%M:%S', '%m/%d/%Y %H:%M:%S', '%m-%d-%y %H:%M:%S',
+    '%d/%m/%Y %H:%M', '%d-%m-%Y %H:%M',
+    '%m/%d/%Y %H:%M', '%m-%d-%Y %H:%M',
+    '%d/%m/%Y', '%d-%m-%Y',
+    '%m/%d/%Y', '%m-%d-%Y',
+    '%Y-%m-%d %H:%M:%S', '%Y/%m/%d %H:%M:%S',
+    # ISO timestamps with a 'T' separator (e.g. October 2023)
+    '%Y-%m-%dT%H:%M:%S',
+]
+
+
+def score_datetime_format(values, fmt, known_year, known_month):
+    """Fraction of `values` that parse with `fmt` into the report's year and month."""
+    parsed = pd.to_datetime(values, format=fmt, errors='coerce')
+    return ((parsed.dt.year == known_year) & (parsed.dt.month == known_month)).mean()
+
+
+def detect_datetime_format(values, known_year, known_month, sample_size=1000, min_score=0.9):
     """
-    if df[column_name].dropna().empty:
-        print("Column is empty or all NaN. No conversion performed.")
-        return df
+    Picks the datetime format of a report column by scoring every candidate on a sample of rows.
 
-    # Get the first and last valid string values from the column
-    mid_val = df[column_name].dropna().iloc[int(len(df) / 2)]
+    Rows are sampled evenly across the column and each candidate format is parsed over the
+    whole sample at once. The format placing most of the sample in the report's month wins,
+    earlier formats winning ties, so day/month ambiguities are settled by the many rows
+    whose day is above 12.
 
-    possible_month_formats = [
-        '%d-%m-%Y %H:%M:%S', '%d/%m/%Y %H:%M:%S', '%d-%m-%y %H:%M:%S',
-        '%m-%d-%Y %H:%M:%S', '%m/%d/%Y %H:%M:%S', '%m-%d-%y %H:%M:%S',
-        '%d/%m/%Y %H:%M', '%d-%m-%Y %H:%M',
-        '%m/%d/%Y %H:%M', '%m-%d-%Y %H:%M',
-        '%d/%m/%Y', '%d-%m-%Y',
-        '%m/%d/%Y', '%m-%d-%Y'
-    ]
+    Args:
+        values (pd.Series): The raw column values.
+        known_year (int): Year the report covers.
+        known_month (int): Month the report covers.
 
-    possible_year_formats = [
-        '%Y-%m-%d %H:%M:%S', '%Y/%m/%d %H:%M:%S',
-    ]
+    Returns:
+        tuple: (format, score) of the best candidate.
+    """
+    values = values.dropna().astype(str).str.strip()
+    if len(values) > sample_size:
+        values = values.iloc[np.linspace(0, len(values) - 1, sample_size).astype(int)]
 
-    candidate_formats = []
-    for fmt in possible_month_formats:
-        try:
-            parsed_date = pd.to_datetime(mid_val, format=fmt)
-            if parsed_date.year == known_year and parsed_date.month == known_month:
-                candidate_formats.append(fmt)
-        except (ValueError, TypeError):
-            continue
+    scores = [(score_datetime_format(values, fmt, known_year, known_month), -rank, fmt)
+              for rank, fmt in enumerate(DATETIME_FORMATS)]
+    score, _, correct_format = max(scores)
+    if score < min_score:
+        raise ValueError(f"  -> Could not detect the datetime format. Best candidate '{correct_format}' only "
+                         f"matches {score:.1%} of sampled rows.")
+    return correct_format, score
 
-    correct_format = None
-    if len(candidate_formats) == 1:
-        correct_format = candidate_formats[0]
-        print(f"  -> Unambiguous format found: '{correct_format}'")
-    elif len(candidate_formats) == 2:
-        for fmt in candidate_formats:
-            try:
-                parsed_date = pd.to_datetime(mid_val, format=fmt)
-                parsed_date = parsed_date + timedelta(hours=12)
-                if parsed_date.year == known_year and parsed_date.month == known_month:
-                    correct_format = fmt
-                    print(f"  -> Validation successful. Correct format is: '{correct_format}'")
-                    break
-            except (ValueError, TypeError):
-                continue
 
-    else:
-        print(f"  -> Ambiguous format detected. Candidates: {candidate_formats}. Validating with first and last record...")
-        for fmt in possible_year_formats:
-            try:
-                parsed_date = pd.to_datetime(mid_val, format=fmt)
-                if parsed_date.year == known_year and parsed_date.month == known_month:
-                    correct_format = fmt
-                    print(f"  -> Validation successful. Correct format is: '{correct_format}'")
-                    break
-            except (ValueError, TypeError):
-                continue
+def convert_datetime_with_validation(df, column_name, known_year, known_month, format_cache=None):
+    """
+    Identifies the correct datetime format from a sample of rows and parses the column once with it.
 
-    if not correct_format:
-        raise ValueError("  -> Could not resolve ambiguity. None of the candidate formats result in a valid chronological order.")
+    `format_cache` maps (year, month) to the format chosen for that report before; a cached
+    format is reused as long as it still fits the sampled rows.
+    """
+    if df[column_name].dropna().empty:
+        print("Column is empty or all NaN. No conversion performed.")
+        return df
+
+    format_cache = {} if format_cache is None else format_cache
+    correct_format = format_cache.get((known_year, known_month))
+    sample = df[column_name].dropna().astype(str).str.strip()
+    if correct_format and score_datetime_format(sample.head(1000), correct_format, known_year, known_month) >= 0.9:
+        print(f"  -> Using cached format: '{correct_format}'")
+    else:
+        correct_format, score = detect_datetime_format(df[column_name], known_year, known_month)
+        print(f"  -> Detected format '{correct_format}' ({score:.1%} of sampled rows in the report month)")
+        format_cache[(known_year, known_month)] = correct_format
 
     df[column_name] = pd.to_datetime(df[column_name], 
                                     format=correct_format, 
@@ -139,6 +163,26 @@ def convert_datetime_with_validation(df, column_name, known_year, known_month):
     return df
 
 
+def seconds_to_duration(values):
+    """Formats a column of durations in seconds as 'hh:mm:ss' text (the seconds within a day, as before)."""
+    seconds = pd.to_timedelta(pd.to_numeric(values, errors='coerce'), unit='s').dt.seconds
+    valid = seconds.notna()
+    seconds = seconds.fillna(0).astype(np.int64)
+    text = ((seconds // 3600).astype(str).str.zfill(2) + ':' +
+            (seconds % 3600 // 60).astype(str).str.zfill(2) + ':' +
+            (seconds % 60).astype(str).str.zfill(2))
+    # values that are not a number of seconds become missing and are dropped by clean_data
+    return text.where(valid)
+
+
+def format_duration(values):
+    """Formats a column of timedeltas as 'hh:mm:ss' text, the format of the published reports."""
+    seconds = values.dt.total_seconds().astype(np.int64)
+    return ((seconds // 3600).astype(str).str.zfill(2) + ':' +
+            (seconds % 3600 // 60).astype(str).str.zfill(2) + ':' +
+            (seconds % 60).astype(str).str.zfill(2))
+
+
 def map_and_filter_columns(df):
     """
     Renames DataFrame columns to a standard format and filters for desired columns.
@@ -191,18 +235,31 @@ def map_and_filter_columns(df):
     
     return df[present_columns]
 
-def scrape_sessions_data(html_data):
-    """
-    Parses HTML to find and download monthly session reports, converting all to CSV.
+REPORT_INDEX = 'report_index.json'
 
-    Args:
-        html_data (str): The HTML content as a string.
-    """
-    base_url = "https://chargeplacescotland.org/"
-    output_dir = "downloaded_reports"
-    os.makedirs(output_dir, exist_ok=True)
-    print(f"Files will be saved as CSV in the '{output_dir}' directory.")
+SessionReport = namedtuple('SessionReport', ['month', 'year', 'url', 'ext', 'filename'])
+
+
+def load_report_index(output_dir):
+    """Return the cache index of already downloaded reports ({filename: metadata})."""
+    path = os.path.join(output_dir, REPORT_INDEX)
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_report_index(output_dir, index):
+    path = os.path.join(output_dir, REPORT_INDEX)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
 
+
+def find_session_reports(html_data, base_url="https://chargeplacescotland.org/"):
+    """Find the monthly session report links in the performance page and the month each one covers."""
     soup = BeautifulSoup(html_data, 'html.parser')
     session_links = soup.find_all(
         'a',
@@ -210,21 +267,11 @@ def scrape_sessions_data(html_data):
         href=re.compile(r'\.(xlsx|csv)$', re.I)
     )
 
-    if not session_links:
-        print("No session report links found.")
-        return
-
-    print(f"Found {len(session_links)} potential session files to download and convert.\n")
-
-    import calendar
-                
-    month_map = {m.lower(): i for i, m in enumerate(calendar.month_name) if i}
-
-    all_sessions = []
+    reports = []
     for link in session_links:
         file_url = link.get('href')
         original_ext = os.path.splitext(file_url)[1].lower()
-        
+
         month = None
         year = None
         # Start searching from the link's parent paragraph for better context
@@ -252,107 +299,203 @@ def scrape_sessions_data(html_data):
             print(f"Could not find a date for: {file_url}. Skipping.")
             continue
 
-        new_filename = f"{month}-{year}.csv"
-        output_filepath = os.path.join(output_dir, new_filename)
-        
-        download_url = urljoin(base_url, file_url)
+        reports.append(SessionReport(month, year, urljoin(base_url, file_url), original_ext, f"{month}-{year}.csv"))
+    return reports
 
-        print(f"Processing report for: {month.capitalize()} {year}")
-        print(f"  -> Original URL: {file_url}")
-        print(f"  -> Saving as: {new_filename}")
 
-        #if (month.lower() not in 'october') or int(year) != 2024:
-        #    continue
+def download_report(session, report, cached=None, timeout=15):
+    """
+    Download a report, revalidating a cached copy with a conditional request.
 
+    Args:
+        session (requests.Session): Session shared by the download workers.
+        report (SessionReport): The report to download.
+        cached (dict): Index entry of the cached copy, if there is one.
+
+    Returns:
+        tuple: (content, headers); content is None if the server reports the cached copy as unchanged.
+    """
+    headers = {}
+    if cached:
+        if cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+        if cached.get('last_modified'):
+            headers['If-Modified-Since'] = cached['last_modified']
+
+    response = session.get(report.url, headers=headers, timeout=timeout)
+    if response.status_code == 304:
+        return None, response.headers
+    response.raise_for_status()
+    return response.content, response.headers
+
+
+def process_report(content, report, month_map, format_cache=None):
+    """Convert the raw content of a monthly report into the cleaned session table."""
+    file_content = io.BytesIO(content) # Use BytesIO for in-memory file handling
+
+    if report.ext == '.xlsx':
+        # Read from excel file in memory
+        df = pd.read_excel(file_content, engine='openpyxl')
+        message = "Converted from XLSX to CSV and saved."
+    else: # The file is a CSV
+        # Read from csv file in memory, trying common encodings
         try:
-            response = requests.get(download_url, timeout=15)
-            response.raise_for_status()
-            file_content = io.BytesIO(response.content) # Use BytesIO for in-memory file handling
-
-            if original_ext == '.xlsx':
-                # Read from excel file in memory
-                df = pd.read_excel(file_content, engine='openpyxl')
-                message = "Converted from XLSX to CSV and saved."
-            else: # The file is a CSV
-                # Read from csv file in memory, trying common encodings
-                try:
-                    df = pd.read_csv(file_content, encoding='utf-8')
-                except UnicodeDecodeError:
-                    file_content.seek(0) # Reset buffer position
-                    df = pd.read_csv(file_content, encoding='latin1') # Fallback encoding
-                message = "CSV file downloaded successfully."
-            
-            # Print the header of the cleaned DataFrame
-            print(f"  -> Old Header: {list(df.columns)}")
+            df = pd.read_csv(file_content, encoding='utf-8')
+        except UnicodeDecodeError:
+            file_content.seek(0) # Reset buffer position
+            df = pd.read_csv(file_content, encoding='latin1') # Fallback encoding
+        message = "CSV file downloaded successfully."
 
-            # Standardize the column headers
-            df = map_and_filter_columns(df)
+    month = report.month
+    year = report.year
 
-            df.dropna(subset=['Start'], inplace=True)
+    # Print the header of the cleaned DataFrame
+    print(f"  -> Old Header: {list(df.columns)}")
 
+    # Standardize the column headers
+    df = map_and_filter_columns(df)
 
-            # Print the header of the cleaned DataFrame
-            print(f"  -> New Header: {list(df.columns)}")
+    df.dropna(subset=['Start'], inplace=True)
 
-            # Convert string to its number; use .lower() for case-insensitivity
-            month_number = month_map[month.lower()]
 
-            # print(f"  -> Types: {df.info()}")
+    # Print the header of the cleaned DataFrame
+    print(f"  -> New Header: {list(df.columns)}")
 
-            print(f"  -> df['Start']: {df['Start'].iloc[100]}, Month: {month_number}, Year: {year} ")
-            # print(f"  -> df['Duration']: {df['Duration'].iloc[100]}")
+    # Convert string to its number; use .lower() for case-insensitivity
+    month_number = month_map[month.lower()]
 
-            # Handle known data issues
+    # print(f"  -> Types: {df.info()}")
 
-            # Specific fix for known 'T' issue in October 2023 data
-            if (int(year) == 2023 and month_number == 10):
-                df['Start'] = df['Start'].str.replace('T', ' ')
+    print(f"  -> df['Start']: {df['Start'].iloc[100]}, Month: {month_number}, Year: {year} ")
+    # print(f"  -> df['Duration']: {df['Duration'].iloc[100]}")
 
-            # Specific fix for known seconds issue in Duration for September 2024 data
-            if int(year) == 2024 and month_number == 9:
+    # Handle known data issues
 
-                def seconds_to_hh_mm_ss(seconds):
-                    # Convert seconds to timedelta
-                    td = pd.Timedelta(seconds=seconds)
-                    # Extract hours, minutes, seconds and format as hh:mm:ss
-                    hours, remainder = divmod(td.seconds, 3600)
-                    minutes, seconds = divmod(remainder, 60)
-                    return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+    # 'T' separated timestamps (October 2023) are detected as their own format below
 
-                df.dropna(subset=['Duration'], inplace=True)
-                df['Duration'] = df['Duration'].apply(seconds_to_hh_mm_ss)
+    # Specific fix for known seconds issue in Duration for September 2024 data
+    if int(year) == 2024 and month_number == 9:
+        df.dropna(subset=['Duration'], inplace=True)
+        df['Duration'] = seconds_to_duration(df['Duration'])
 
 
-            # Convert column to datetime objects, coercing errors to NaT (Not a Time)
-            if df['Start'].dtype != 'datetime64[ns]':
-                df = convert_datetime_with_validation(
-                    df=df,
-                    column_name='Start',
-                    known_year=int(year),
-                    known_month=month_number
-                )
+    # Convert column to datetime objects, coercing errors to NaT (Not a Time)
+    if df['Start'].dtype != 'datetime64[ns]':
+        df = convert_datetime_with_validation(
+            df=df,
+            column_name='Start',
+            known_year=int(year),
+            known_month=month_number,
+            format_cache=format_cache
+        )
 
-            df.dropna(subset=['Start'], inplace=True)
-            df['Start'] = df['Start'].dt.strftime('%Y-%m-%d %H:%M:%S')
-            df = df.sort_values('Start').reset_index(drop=True)
+    df.dropna(subset=['Start'], inplace=True)
+    # keep the parsed values, truncated to whole seconds like the saved '%Y-%m-%d %H:%M:%S' text
+    df['Start'] = df['Start'].dt.floor('s')
+    df = df.sort_values('Start').reset_index(drop=True)
 
-            df_clean = clean_data(df)
-            
-            # Save the DataFrame to a CSV file
-            df_clean.to_csv(output_filepath, index=False, encoding='utf-8')
-            
-            all_sessions.append(df_clean)
+    return clean_data(df), message
 
-            print(f"  -> SUCCESS: {message} ")
-        
-        except Exception as e: # Catch pandas and other errors
-            print(f"  -> ERROR: Could not process file. \n      Reason: {e}")
-        
-        print("-" * 30)
 
-    out = pd.concat(all_sessions, ignore_index=True)
-    out.to_csv('data/source/all_sessions.csv', index=False)
-    print(f"Successfully saved all sessions to 'data/source/all_sessions.csv'.")
+def scrape_sessions_data(html_data, output_dir="downloaded_reports", max_workers=4, force=False,
+                         sessions_dir=DEFAULT_SESSIONS_DIR):
+    """
+    Parses HTML to find and download monthly session reports, converting all to CSV.
+
+    Every month is also written to the month-partitioned session store in `sessions_dir`
+    that the pipeline loads; months already in the store are left untouched.
+
+    Converted reports are cached in `output_dir` together with an index of their ETag,
+    Last-Modified header and content hash. Cached months are revalidated with conditional
+    requests and only reports that actually changed are converted again; new months are
+    downloaded concurrently.
+
+    Args:
+        html_data (str): The HTML content as a string.
+        output_dir (str): Directory holding the converted reports and the cache index.
+        max_workers (int): Maximum number of reports downloaded at the same time.
+        force (bool): Ignore the cache and download and convert every report.
+        sessions_dir (str): Directory of the partitioned session store.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    print(f"Files will be saved as CSV in the '{output_dir}' directory.")
+
+    reports = find_session_reports(html_data)
+
+    if not reports:
+        print("No session report links found.")
+        return
+
+    print(f"Found {len(reports)} potential session files to download and convert.\n")
+
+    import calendar
+                
+    month_map = {m.lower(): i for i, m in enumerate(calendar.month_name) if i}
+
+    index = {} if force else load_report_index(output_dir)
+    # a cache entry is only usable while its converted CSV is still on disk
+    cached = {r.filename: index[r.filename] for r in reports
+              if r.filename in index and os.path.exists(os.path.join(output_dir, r.filename))}
+    # datetime format chosen for each (year, month) on earlier runs
+    format_cache = {(int(r.year), month_map[r.month]): index[r.filename]['start_format'] for r in reports
+                    if index.get(r.filename, {}).get('start_format')}
+
+    store = SessionPartitions(sessions_dir)
+
+    with requests.Session() as session:
+        session.mount('https://', HTTPAdapter(pool_maxsize=max_workers))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            downloads = [executor.submit(download_report, session, report, cached.get(report.filename))
+                         for report in reports]
+
+            # convert in page order so the output does not depend on download timing
+            for report, download in zip(reports, downloads):
+                output_filepath = os.path.join(output_dir, report.filename)
+                entry = cached.get(report.filename)
+                year, month_number = int(report.year), month_map[report.month]
+
+                print(f"Processing report for: {report.month.capitalize()} {report.year}")
+                print(f"  -> Original URL: {report.url}")
+                print(f"  -> Saving as: {report.filename}")
+
+                try:
+                    content, headers = download.result()
+                    digest = hashlib.sha256(content).hexdigest() if content is not None else None
+
+                    if entry is not None and (content is None or digest == entry.get('sha256')):
+                        print(f"  -> UNCHANGED: using cached {report.filename}")
+                        store_cached_month(store, year, month_number, output_filepath, entry)
+                    else:
+                        df_clean, message = process_report(content, report, month_map, format_cache)
+
+                        # Save the DataFrame to a CSV file
+                        df_clean.assign(Duration=format_duration(df_clean['Duration'])).to_csv(
+                            output_filepath, index=False, encoding='utf-8', date_format=START_FORMAT)
+                        store.append(year, month_number, df_clean, source=digest)
+                        print(f"  -> SUCCESS: {message} ")
+                        entry = {'url': report.url, 'sha256': digest,
+                                 'start_format': format_cache.get((year, month_number))}
+
+                    entry.update(etag=headers.get('ETag', entry.get('etag')),
+                                 last_modified=headers.get('Last-Modified', entry.get('last_modified')))
+                    index[report.filename] = entry
+
+                except Exception as e: # Catch pandas and other errors
+                    print(f"  -> ERROR: Could not process file. \n      Reason: {e}")
+                    if entry is not None:
+                        print(f"  -> Using previously converted {report.filename}")
+                        store_cached_month(store, year, month_number, output_filepath, entry)
+
+                print("-" * 30)
+
+    save_report_index(output_dir, index)
+    print(f"Session store '{sessions_dir}' holds {len(store.months())} month(s).")
+
+
+def store_cached_month(store, year, month_number, filepath, entry):
+    """Adds a previously converted report to the session store unless it is already there."""
+    if not store.is_current(year, month_number, source=entry.get('sha256')):
+        store.append(year, month_number, pd.read_csv(filepath, dtype=str), source=entry.get('sha256'))
 
 
 def scrape_chargepoint_data(api_url, api_key, output_file_name):
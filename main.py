@@ -1,32 +1,225 @@
 import argparse
 import logging
-from src.chargeplace.chargeplace_scotland_api import ChargePlaceScotlandAPI
+import os
+from collections import namedtuple
+from src.chargeplace.profiling import Profiler
+
+logger = logging.getLogger(__name__)
+
+# A pipeline stage: the artifacts in the result directory it needs and produces, and how to run it (run(api, args))
+Stage = namedtuple('Stage', ['name', 'requires', 'produces', 'run'])
+
+
+def authority_dirs(base_dir):
+    if not os.path.isdir(base_dir):
+        return []
+    return [d for d in os.listdir(base_dir) if os.path.isdir(os.path.join(base_dir, d))]
+
+
+def has_infrastructure(base_dir):
+    local_auths = authority_dirs(base_dir)
+    return bool(local_auths) and all(os.path.exists(os.path.join(base_dir, local_auth, 'charging_infrastructure.csv'))
+                                     for local_auth in local_auths)
+
+
+# checks whether an artifact is already present in the result directory
+ARTIFACTS = {
+    'authority folders': lambda base_dir: bool(authority_dirs(base_dir)),
+    'charging infrastructure': has_infrastructure,
+}
+
+
+def run_folders(api, args):
+    api.create_folder_structure(base_dir=args.base_dir)
+
+
+def run_spatial_locate(api, args):
+    api.locate_council_area_charging_infrastructure(base_dir=args.base_dir)
+
+
+def run_weather(api, args):
+    api.fetch_and_store_weather(base_dir=args.base_dir)
+
+
+def run_populate(api, args):
+    api.populate_session_data_per_charger(granularity=args.granularity,
+                                          base_dir=args.base_dir,
+                                          max_workers=args.max_workers,
+                                          expansion=args.expansion,
+                                          backend=args.backend,
+                                          output_format=args.output_format,
+                                          partition_by_year=args.partition_by_year,
+                                          incremental=not args.full_rebuild,
+                                          rollups=args.rollups,
+                                          layout=args.layout,
+                                          weather=args.weather,
+                                          shard=args.shard)
+
+
+def run_merge(api, args):
+    from src.chargeplace.sharding import merge_shards
+
+    merge_shards(args.base_dir)
+
+
+# in pipeline order; every artifact is produced by exactly one stage
+STAGES = [
+    Stage('folders', requires=(), produces=('authority folders',), run=run_folders),
+    Stage('spatial-locate', requires=('authority folders',), produces=('charging infrastructure',),
+          run=run_spatial_locate),
+    # Prefetch weather data for each CP ID over its active session date range
+    Stage('weather', requires=('charging infrastructure',), produces=(), run=run_weather),
+    Stage('populate', requires=('charging infrastructure',), produces=(), run=run_populate),
+    # combine the outputs of `populate --shard i/N` runs into the result directory
+    Stage('merge', requires=(), produces=(), run=run_merge),
+]
+DEFAULT_STAGES = ['folders', 'spatial-locate', 'populate']
+# stages a shard may run; the others write shared files and run once, before the shards
+SHARD_STAGES = ('weather', 'populate')
+
+
+def plan_stages(selected, base_dir):
+    """Return the stages to run, in pipeline order: `selected` plus the stages producing any
+    artifact they need that is neither in `base_dir` nor produced earlier in this run."""
+    planned = set(selected)
+    # walk backwards so that a stage pulled in here gets its own requirements checked as well
+    for position in reversed(range(len(STAGES))):
+        stage = STAGES[position]
+        if stage.name not in planned:
+            continue
+        produced = {artifact for earlier in STAGES[:position] if earlier.name in planned
+                    for artifact in earlier.produces}
+        for artifact in stage.requires:
+            if artifact in produced or ARTIFACTS[artifact](base_dir):
+                continue
+            producer = next(candidate for candidate in STAGES if artifact in candidate.produces)
+            logger.info("Running stage '%s' as well: '%s' needs the %s, which is missing from %s",
+                        producer.name, stage.name, artifact, base_dir)
+            planned.add(producer.name)
+    return [stage for stage in STAGES if stage.name in planned]
+
+
+# session store written by data/scraper.py, and the single CSV that older versions of it wrote
+SESSIONS_DIR = 'data/source/sessions'
+LEGACY_SESSIONS_CSV = 'data/source/all_sessions.csv'
+
+
+def default_sessions_path():
+    """The session store if it exists, else an existing all_sessions.csv from an older checkout."""
+    if not os.path.isdir(SESSIONS_DIR) and os.path.isfile(LEGACY_SESSIONS_CSV):
+        logger.info('No session store in %s, reading sessions from %s', SESSIONS_DIR, LEGACY_SESSIONS_CSV)
+        return LEGACY_SESSIONS_CSV
+    return SESSIONS_DIR
+
+
+def build_api(args, profiler):
+    # imported here so that parsing arguments and planning stages stay cheap; the API itself
+    # loads its inputs (and geopandas) only when a stage first needs them
+    from src.chargeplace.chargeplace_scotland_api import ChargePlaceScotlandAPI
+
+    return ChargePlaceScotlandAPI(args.feature_collection,
+                                  args.sessions,
+                                  args.council_shp,
+                                  args.council_csv,
+                                  carbon_cache_path=args.carbon_cache or None,
+                                  cache_dir=args.cache_dir or None,
+                                  weather_cache_path=args.weather_cache,
+                                  profiler=profiler,
+                                  session_months=args.months,
+                                  session_range=(args.start, args.end))
 
 
 def build_parser():
     p = argparse.ArgumentParser(description='GridCharge Dataset Pipelline.')
+    p.add_argument('--stages', nargs='+', choices=[stage.name for stage in STAGES], default=None,
+                   help='Pipeline stages to run (default: folders spatial-locate populate, or populate with '
+                        '--shard). Stages whose inputs are missing from --base-dir pull in the stages that '
+                        'produce them.')
+    p.add_argument('--shard', default=None, metavar='I/N',
+                   help='Only run shard I of N of the populate stage, writing to <base-dir>_shards/; '
+                        'combine all shards afterwards with --stages merge.')
+    p.add_argument('--shard-by', choices=['connector', 'authority'], default='connector',
+                   help='Split the shards by (CP ID, Connector) or by local authority, balanced by session cost.')
     p.add_argument('--feature-collection', default='data/source/feature_collection.json')
-    p.add_argument('--sessions', default='data/source/all_sessions.csv')
+    p.add_argument('--sessions', default=None,
+                   help=f'Month-partitioned session store written by data/scraper.py, or an all_sessions.csv file '
+                        f'(default: {SESSIONS_DIR}, or {LEGACY_SESSIONS_CSV} if only that exists).')
+    p.add_argument('--months', nargs='+', default=None,
+                   help='Only load sessions of these report months (YYYY-MM).')
+    p.add_argument('--start', default=None, help='Only load sessions starting on or after this date.')
+    p.add_argument('--end', default=None, help='Only load sessions starting before this date.')
     p.add_argument('--council-shp', default='data/source/geo_data/pub_commcnc.shp')
     p.add_argument('--council-csv', default='data/source/council_areas.csv')
     p.add_argument('--base-dir', default='data/result')
+    p.add_argument('--cache-dir', default='data/cache',
+                   help='Directory for snapshots of parsed inputs (empty string disables them).')
+    p.add_argument('--carbon-cache', default='data/cache/carbon_intensity.sqlite',
+                   help='SQLite file caching Carbon Intensity API data between runs (empty string disables it).')
+    p.add_argument('--weather-cache', default='data/cache/weather.sqlite',
+                   help='SQLite file storing hourly weather per grid cell between runs.')
+    p.add_argument('--weather', action='store_true',
+                   help='Join hourly weather onto the session outputs (fetched by the weather stage).')
+    p.add_argument('--granularity', type=int, nargs='+', default=[30],
+                   help='Interval length(s) in minutes; several (e.g. 15 30 60) are written in one run.')
+    p.add_argument('--expansion', choices=['vectorized', 'reference'], default='vectorized',
+                   help='Session-to-interval expansion engine (reference is the original per-session loop).')
+    p.add_argument('--backend', choices=['thread', 'process'], default='thread',
+                   help='Run local authorities in a thread pool or in a process pool.')
+    p.add_argument('--max-workers', type=int, default=4)
+    p.add_argument('--output-format', choices=['csv', 'parquet'], default='csv',
+                   help='One CSV per connector, or one Parquet dataset per local authority.')
+    p.add_argument('--layout', choices=['dense', 'sparse'], default='dense',
+                   help='Dense rows for every interval, or only active intervals plus shared carbon tables (csv).')
+    p.add_argument('--partition-by-year', action='store_true',
+                   help='Split Parquet output into year=<YYYY> partitions.')
+    p.add_argument('--full-rebuild', action='store_true',
+                   help='Regenerate every connector instead of only those whose sessions changed.')
+    p.add_argument('--rollups', action='store_true',
+                   help='Also write consumption and occupied-connector totals per authority and carbon region. '
+                        'Rollups need every connector, so this requires --full-rebuild.')
+    p.add_argument('--profile', action='store_true',
+                   help='Record wall/CPU time and rows per stage and authority, and the peak memory of the run.')
+    p.add_argument('--profile-report', default=None,
+                   help='Where to write the JSON profile (default: <base-dir>/profile.json).')
     return p
 
 
 def main():
     logging.basicConfig(level=logging.INFO)
-    args = build_parser().parse_args()
+    parser = build_parser()
+    args = parser.parse_args()
+    if args.sessions is None:
+        args.sessions = default_sessions_path()
 
-    api = ChargePlaceScotlandAPI(args.feature_collection,
-                                 args.sessions,
-                                 args.council_shp,
-                                 args.council_csv)
+    if args.rollups and not args.full_rebuild:
+        parser.error('--rollups regenerates every connector and cannot be combined with the incremental mode; '
+                     'pass --full-rebuild as well')
+    if args.shard:
+        from src.chargeplace.sharding import parse_shard
 
-    api.create_folder_structure(base_dir=args.base_dir)
-    api.locate_council_area_charging_infrastructure(base_dir=args.base_dir)
-    # Prefetch weather data for each CP ID over its active session date range
-    # api.fetch_and_store_weather()
-    api.populate_session_data_per_charger(base_dir=args.base_dir)
+        try:
+            args.shard = parse_shard(args.shard, args.shard_by)
+        except ValueError as error:
+            parser.error(str(error))
+    selected = set(args.stages or (['populate'] if args.shard else DEFAULT_STAGES))
+    if args.weather and 'populate' in selected and not args.shard:
+        # fetch every authority's weather in batched requests up front instead of per authority
+        selected.add('weather')
+    stages = plan_stages(selected, args.base_dir)
+    if args.shard and any(stage.name not in SHARD_STAGES for stage in stages):
+        parser.error(f"a shard only runs the {' and '.join(SHARD_STAGES)} stages; run the "
+                     f"{', '.join(stage.name for stage in stages if stage.name not in SHARD_STAGES)} stages "
+                     f"once without --shard first")
+
+    profiler = Profiler(enabled=args.profile)
+    api = build_api(args, profiler)
+    for stage in stages:
+        logger.info("Running stage '%s'", stage.name)
+        stage.run(api, args)
+
+    if args.profile:
+        default_report = f'profile_shard-{args.shard.index}-of-{args.shard.count}.json' if args.shard else 'profile.json'
+        profiler.write_report(args.profile_report or os.path.join(args.base_dir, default_report))
 
 
 if __name__ == '__main__':
@@ -1,4 +1,5 @@
-from functools import lru_cache
+from collections import OrderedDict, defaultdict
+import threading
 import pytz
 
 from src.carbon.carbon_intensity_api import CarbonIntensityAPI
@@ -8,12 +9,45 @@ class CarbonAdapter:
     """Adapter around CarbonIntensityAPI that normalizes inputs and caches results.
 
     Accepts an injectable `api` for testing. The cache key is the normalized ISO strings
-    for start/end plus the type and region/postcode.
+    for start/end plus the type and region/postcode. Only complete results are cached, so a
+    range whose fetch failed (in part) is requested again on the next call.
+
+    With a `store` (see `CarbonStore`) results are also persisted on disk and only the
+    parts of a requested range that were never fetched before are requested from the API.
+
+    With `resolve_regions`, postcode queries are mapped to the DNO region the API resolves
+    the postcode to and served from that region's series, so each region is downloaded once
+    however many postcodes fall into it. The postcode to region map is cached as well.
     """
 
-    def __init__(self, api=None, retries=5, max_workers=6):
+    def __init__(self, api=None, retries=5, max_workers=6, store=None, resolve_regions=True, cache_size=256):
         # allow dependency injection for tests
         self.api = api or CarbonIntensityAPI(retries=retries, max_workers=max_workers)
+        self.store = store
+        self.resolve_regions = resolve_regions
+        self._regions = {}
+        self._regions_lock = threading.Lock()
+        # one lock per scope so concurrent callers do not download the same gap twice
+        self._scope_locks = defaultdict(threading.Lock)
+        # least recently used results, keyed like `_fetch_cached`
+        self._results = OrderedDict()
+        self._results_lock = threading.Lock()
+        self.cache_size = cache_size
+
+    def region_for_postcode(self, postcode):
+        """Return the region id of `postcode` (None if it cannot be resolved)."""
+        with self._regions_lock:
+            if postcode in self._regions:
+                return self._regions[postcode]
+            region_id = self.store.region_for_postcode(postcode) if self.store is not None else None
+            if region_id is None and hasattr(self.api, 'region_for_postcode'):
+                region_id = self.api.region_for_postcode(postcode)
+                if region_id is not None and self.store is not None:
+                    self.store.set_region_for_postcode(postcode, region_id)
+            # failed lookups are not remembered so they are retried on the next call
+            if region_id is not None:
+                self._regions[postcode] = region_id
+            return region_id
 
     @staticmethod
     def _normalize_dt(dt):
@@ -28,15 +62,50 @@ class CarbonAdapter:
             ts = ts.tz_convert(pytz.utc)
         return ts.isoformat()
 
-    @lru_cache(maxsize=256)
     def _fetch_cached(self, start_iso, end_iso, type_, region_id, postcode):
         import pandas as pd
 
+        key = (start_iso, end_iso, type_, region_id, postcode)
+        with self._results_lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                return self._results[key]
+
         start = pd.to_datetime(start_iso)
         end = pd.to_datetime(end_iso)
-        return self.api.between(start, end, type=type_, region_id=region_id, postcode=postcode)
+        if self.store is None:
+            result = self.api.between(start, end, type=type_, region_id=region_id, postcode=postcode)
+            complete = result[0] is not None and not result[0].empty
+        else:
+            result, complete = self._fetch_stored(start, end, type_, region_id, postcode)
+
+        if complete:
+            with self._results_lock:
+                self._results[key] = result
+                if len(self._results) > self.cache_size:
+                    self._results.popitem(last=False)
+        return result
+
+    def _fetch_stored(self, start, end, type_, region_id, postcode):
+        """Return the stored (carbon, gen_mix) frames after fetching the gaps, and whether every gap was fetched."""
+        scope = self.store.scope(type_, region_id=region_id, postcode=postcode)
+        complete = True
+        with self._scope_locks[scope]:
+            for gap_start, gap_end in self.store.missing(scope, start, end):
+                carbon, gen_mix = self.api.between(gap_start, gap_end, type=type_, region_id=region_id,
+                                                   postcode=postcode)
+                # failed fetches come back empty; leave the gap uncovered so it is retried
+                if carbon is not None and not carbon.empty:
+                    self.store.add(scope, gap_start, gap_end, carbon, gen_mix)
+                else:
+                    complete = False
+        return self.store.load(scope, start, end), complete
 
     def fetch(self, start, end, type_, region_id=None, postcode=None):
+        if type_ == "postcode" and self.resolve_regions:
+            resolved = self.region_for_postcode(postcode)
+            if resolved is not None:
+                type_, region_id, postcode = "regional", resolved, None
         start_iso = self._normalize_dt(start)
         end_iso = self._normalize_dt(end)
         return self._fetch_cached(start_iso, end_iso, type_, region_id, postcode)
@@ -6,8 +6,8 @@ from urllib3.util import Retry
 class CarbonClient:
     """Small HTTP client with connection pooling and retries for the Carbon Intensity API.
 
-    Uses requests.Session with urllib3 Retry mounted on the HTTPS adapter. Intended for
-    use with ThreadPoolExecutor for concurrent fetches.
+    Uses requests.Session with urllib3 Retry mounted on the HTTPS adapter. Intended to be
+    shared by concurrent fetches (see `AsyncCarbonFetcher`) so connections are kept alive.
     """
 
     def __init__(self, retries=3, backoff_factor=0.5, max_pool=12):
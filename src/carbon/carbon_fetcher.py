@@ -0,0 +1,112 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.carbon.carbon_client import CarbonClient
+
+
+class TokenBucket:
+    """Asyncio token bucket: allows `rate` acquisitions per second with bursts of up to `capacity`."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class AsyncCarbonFetcher:
+    """Process-wide fetcher that runs every Carbon Intensity request on one asyncio event loop.
+
+    The loop lives in a daemon thread. All requests share a global concurrency cap, a token
+    bucket rate limit and one `CarbonClient` (a pooled keep-alive session), no matter how
+    many authorities or services are fetching at the same time. Blocking client calls are
+    run in a bounded executor owned by the fetcher.
+
+    Parameters
+    ----------
+    `client` : CarbonClient
+        Default client for requests that do not bring their own.
+    `max_concurrency` : int
+        Maximum number of requests in flight across the whole process.
+    `rate` : float
+        Sustained requests per second; `burst` requests may be sent back to back.
+    """
+
+    def __init__(self, client=None, max_concurrency=8, rate=10.0, burst=10):
+        self.client = client or CarbonClient(max_pool=max_concurrency)
+        self.max_concurrency = max_concurrency
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='carbon-fetch')
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='carbon-event-loop', daemon=True)
+        self._thread.start()
+        self._semaphore, self._bucket = self._run(self._create_limits(rate, burst))
+
+    async def _create_limits(self, rate, burst):
+        # asyncio primitives must be created on the loop that uses them
+        return asyncio.Semaphore(self.max_concurrency), TokenBucket(rate, burst)
+
+    def _run(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    async def fetch_json(self, url, client=None):
+        client = client or self.client
+        async with self._semaphore:
+            await self._bucket.acquire()
+            return await self._loop.run_in_executor(self._executor, client.fetch_json, url)
+
+    async def fetch_all(self, urls, client=None, limit=None):
+        """Fetch `urls` concurrently and return the JSON payloads in the same order.
+
+        `limit` additionally caps how many of these particular URLs are in flight at once.
+        """
+        local = asyncio.Semaphore(limit) if limit else None
+
+        async def fetch(url):
+            if local is None:
+                return await self.fetch_json(url, client)
+            async with local:
+                return await self.fetch_json(url, client)
+
+        return await asyncio.gather(*(fetch(url) for url in urls))
+
+    def fetch_many(self, urls, client=None, limit=None):
+        """Blocking wrapper around `fetch_all` that can be called from any thread."""
+        return self._run(self.fetch_all(urls, client=client, limit=limit))
+
+    def close(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._executor.shutdown()
+
+
+_shared_fetcher = None
+_shared_fetcher_pid = None
+_shared_fetcher_lock = threading.Lock()
+
+
+def get_shared_fetcher():
+    """Return the fetcher shared by the whole process, creating it on first use.
+
+    A forked worker process does not inherit the event loop thread, so it gets its own fetcher.
+    """
+    global _shared_fetcher, _shared_fetcher_pid
+    with _shared_fetcher_lock:
+        if _shared_fetcher is None or _shared_fetcher_pid != os.getpid():
+            _shared_fetcher = AsyncCarbonFetcher()
+            _shared_fetcher_pid = os.getpid()
+        return _shared_fetcher
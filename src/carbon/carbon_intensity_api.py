@@ -17,9 +17,9 @@ class CarbonIntensityAPI:
     supports parallel fetching and a pluggable client/parser.
     """
 
-    def __init__(self, retries=5, max_workers=6):
+    def __init__(self, retries=5, max_workers=6, client=None):
         # keep the simple constructor signature but wire up components
-        self.service = CarbonService(max_workers=max_workers)
+        self.service = CarbonService(max_workers=max_workers, client=client)
 
     def between(self, start, end, type="national", region_id=None, postcode=None):
         try:
@@ -29,6 +29,14 @@ class CarbonIntensityAPI:
             print(f"Error fetching carbon intensity data for {region_id}/{postcode} {start}:{end} %s", e)
             return pd.DataFrame(), pd.DataFrame()
 
+    def region_for_postcode(self, postcode):
+        try:
+            return self.service.region_for_postcode(postcode)
+
+        except Exception as e:
+            print(f"Error resolving region for postcode {postcode}: {e}")
+            return None
+
 
 def main(region_id=None):
     import pytz
@@ -1,16 +1,44 @@
+import numpy as np
 import pandas as pd
 from numpy import nan
 
 
+def _numeric_column(values):
+    """Array of JSON numbers with missing values as NaN; stays int64 when every value is an int,
+    matching how pandas infers the column from a list of rows."""
+    values = np.array([nan if v is None else v for v in values])
+    return values if values.dtype.kind in 'if' else values.astype(float)
+
+
+def parse_timestamps(values):
+    """Parse API timestamps (e.g. '2018-01-20T12:00Z') once into int64 UTC epoch nanoseconds."""
+    if all(v.endswith('Z') for v in values):
+        try:
+            # numpy parses ISO 8601 directly but no longer accepts the zone designator
+            return np.array([v[:-1] for v in values], dtype='datetime64[ns]').view(np.int64)
+        except ValueError:
+            pass
+    return pd.to_datetime(pd.Series(values, dtype=object), utc=True).values.astype('datetime64[ns]').view(np.int64)
+
+
+def _utc_index(epoch_ns):
+    return pd.DatetimeIndex(epoch_ns.view('datetime64[ns]')).tz_localize('UTC')
+
+
 class CarbonParser:
     """Parse Carbon Intensity API JSON payloads into pandas DataFrames.
 
     This is kept deterministic and side-effect free so it is easy to unit test.
+
+    Payloads are read column by column into NumPy arrays (the generation mix straight into a
+    preallocated matrix) and every timestamp is parsed once into an int64 epoch column shared
+    by the carbon and fuel mix frames. With ``as_arrow=True`` pyarrow Tables with the same
+    columns are returned instead of DataFrames.
     """
 
     FUEL_MIX_LABELS = ["biomass", "coal", "imports", "gas", "nuclear", "other", "hydro", "solar", "wind"]
 
-    def parse_fromto_json(self, response, type_):
+    def parse_fromto_json(self, response, type_, as_arrow=False):
         """Parse the response from the /{from}/{to} endpoints into DataFrame(s).
 
         Returns:
@@ -18,29 +46,72 @@ class CarbonParser:
             else: (carbon_df, fuel_mix_df)
         """
         if type_ == "national":
-            data_list = [
-                [d["to"], d["intensity"].get("forecast", nan), d["intensity"].get("actual", nan),
-                 d["intensity"]["index"]] for d in response.get("data", [])
-            ]
-            data = pd.DataFrame(data_list, columns=["timestamp", "forecast", "actual", "index"])
-            data["timestamp"] = pd.to_datetime(data["timestamp"], utc=True, infer_datetime_format=True)
-            return data, None
+            data = response.get("data", [])
+            regionid = None
         else:
-            carbon_list = []
-            fuel_mix_list = []
             region = response.get("data", {})
-            for datum in region.get("data", []):
-                carbon_list.append([datum["to"], region.get("regionid"),
-                                    datum["intensity"].get("forecast", nan),
-                                    datum["intensity"].get("actual", nan),
-                                    datum["intensity"]["index"]])
-                fuel_mix = {f["fuel"]: f.get("perc", nan) for f in datum.get("generationmix", [])}
-                fuel_mix_list.append([datum["to"], region.get("regionid")] + [fuel_mix.get(l, nan) for l in self.FUEL_MIX_LABELS])
+            data = region.get("data", [])
+            regionid = region.get("regionid")
 
-            carbon_data = pd.DataFrame(carbon_list, columns=["timestamp", "regionid", "forecast", "actual", "index"])
-            carbon_data["timestamp"] = pd.to_datetime(carbon_data["timestamp"], utc=True, infer_datetime_format=True)
+        n = len(data)
+        timestamps = parse_timestamps([d["to"] for d in data])
+        intensities = [d["intensity"] for d in data]
+        carbon = {
+            "timestamp": timestamps,
+            "forecast": _numeric_column([i.get("forecast", nan) for i in intensities]),
+            "actual": _numeric_column([i.get("actual", nan) for i in intensities]),
+            "index": np.array([i["index"] for i in intensities], dtype=object),
+        }
+        if type_ == "national":
+            return self._frame(carbon, as_arrow), None
 
-            fuel_mix_data = pd.DataFrame(fuel_mix_list, columns=["timestamp", "regionid"] + self.FUEL_MIX_LABELS)
-            fuel_mix_data["timestamp"] = pd.to_datetime(fuel_mix_data["timestamp"], utc=True, infer_datetime_format=True)
+        carbon = dict(carbon, regionid=np.full(n, regionid, dtype=None if regionid is not None else object))
+        carbon = {name: carbon[name] for name in ["timestamp", "regionid", "forecast", "actual", "index"]}
 
-            return carbon_data, fuel_mix_data
+        column_of = {label: j for j, label in enumerate(self.FUEL_MIX_LABELS)}
+        mix = np.full((n, len(self.FUEL_MIX_LABELS)), nan)
+        for i, datum in enumerate(data):
+            for f in datum.get("generationmix", []):
+                j = column_of.get(f["fuel"])
+                perc = f.get("perc", nan)
+                if j is not None and perc is not None:
+                    mix[i, j] = perc
+        fuel_mix = {"timestamp": timestamps, "regionid": carbon["regionid"]}
+        fuel_mix.update((label, mix[:, j]) for label, j in column_of.items())
+
+        return self._frame(carbon, as_arrow), self._frame(fuel_mix, as_arrow)
+
+    @staticmethod
+    def _frame(columns, as_arrow):
+        if as_arrow:
+            import pyarrow as pa
+
+            arrays = {name: pa.array(values, type=pa.timestamp('ns', tz='UTC')) if name == "timestamp"
+                      else pa.array(values, from_pandas=True) for name, values in columns.items()}
+            return pa.table(arrays)
+        columns = dict(columns, timestamp=_utc_index(columns["timestamp"]))
+        return pd.DataFrame(columns)
+
+
+def align_carbon(frame, granularity, source_granularity=30, time_column="timestamp"):
+    """Align half-hourly carbon rows to the `granularity` minute intervals of the output.
+
+    A finer interval takes the row of the carbon interval it falls in. A coarser interval
+    averages the numeric columns of its carbon rows and keeps the other columns (index,
+    region) of its first row.
+    """
+    if granularity == source_granularity or frame is None or not len(frame):
+        return frame
+    times = frame[time_column]
+    if granularity < source_granularity:
+        steps = range(0, source_granularity, granularity)
+        aligned = pd.concat([frame.assign(**{time_column: times + pd.Timedelta(minutes=step)}) for step in steps],
+                            ignore_index=True)
+        return aligned.sort_values(time_column, kind="mergesort").reset_index(drop=True)
+    buckets = times.dt.floor(f"{granularity}min")
+    numeric = [c for c in frame.columns if c != time_column and pd.api.types.is_numeric_dtype(frame[c])
+               and not c.lower().startswith("region")]
+    grouped = frame.drop(columns=time_column).groupby(buckets.rename(time_column), sort=True)
+    aligned = grouped.first()
+    aligned[numeric] = grouped[numeric].mean()
+    return aligned.reset_index()[list(frame.columns)]
@@ -1,8 +1,7 @@
 from datetime import timedelta
-from concurrent.futures import ThreadPoolExecutor, as_completed
 import pandas as pd
 
-from src.carbon.carbon_client import CarbonClient
+from src.carbon.carbon_fetcher import get_shared_fetcher
 from src.carbon.carbon_parser import CarbonParser
 
 
@@ -11,15 +10,29 @@ class CarbonService:
 
     Provides a between(start, end, type, region_id/postcode) method similar to the old API but
     implemented with smaller components and optional parallel fetches.
+
+    Requests go through an `AsyncCarbonFetcher` (by default the one shared by the whole
+    process), so concurrency and request rate are limited globally rather than per call;
+    `max_workers` only caps how many chunks of a single call are in flight.
     """
 
-    def __init__(self, base_url="https://api.carbonintensity.org.uk", max_range=None, client=None, parser=None, max_workers=6):
+    def __init__(self, base_url="https://api.carbonintensity.org.uk", max_range=None, client=None, parser=None, max_workers=6,
+                 fetcher=None):
         self.base_url = base_url
         self.max_range = max_range or {"national": timedelta(days=14), "regional": timedelta(days=14), "postcode": timedelta(days=14)}
-        self.client = client or CarbonClient()
+        self.fetcher = fetcher or get_shared_fetcher()
+        self.client = client or self.fetcher.client
         self.parser = parser or CarbonParser()
         self.max_workers = max_workers
 
+    def region_for_postcode(self, postcode):
+        """Return the DNO region id the API assigns to an outward `postcode` (e.g. 'G5')."""
+        url = f"{self.base_url}/regional/postcode/{str(postcode)}"
+        data = self.fetcher.fetch_many([url], client=self.client)[0].get("data")
+        # the current-intensity endpoint wraps the region in a list
+        region = data[0] if isinstance(data, list) else data
+        return int(region["regionid"])
+
     def between(self, start, end, type="national", region_id=None, postcode=None):
         type = type.lower()
         if type not in ("national", "regional", "postcode"):
@@ -48,18 +61,15 @@ class CarbonService:
         carbon_parts = []
         gen_mix_parts = []
 
-        # parallel fetches
-        with ThreadPoolExecutor(max_workers=min(self.max_workers, max(1, len(urls)))) as ex:
-            future_to_url = {ex.submit(self.client.fetch_json, u): u for u in urls}
-            for fut in as_completed(future_to_url):
-                url = future_to_url[fut]
-                print(f"Fetched {url}")
-                resp = fut.result()
-                carbon_part, genmix_part = self.parser.parse_fromto_json(resp, type)
-                if carbon_part is not None and not carbon_part.empty:
-                    carbon_parts.append(carbon_part)
-                if genmix_part is not None and not genmix_part.empty:
-                    gen_mix_parts.append(genmix_part)
+        # concurrent fetches on the shared event loop; responses come back in url order
+        responses = self.fetcher.fetch_many(urls, client=self.client, limit=self.max_workers)
+        for url, resp in zip(urls, responses):
+            print(f"Fetched {url}")
+            carbon_part, genmix_part = self.parser.parse_fromto_json(resp, type)
+            if carbon_part is not None and not carbon_part.empty:
+                carbon_parts.append(carbon_part)
+            if genmix_part is not None and not genmix_part.empty:
+                gen_mix_parts.append(genmix_part)
 
         carbon = pd.concat(carbon_parts, ignore_index=True) if carbon_parts else pd.DataFrame()
         genmix = pd.concat(gen_mix_parts, ignore_index=True) if gen_mix_parts else None
@@ -0,0 +1,169 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytz
+
+from src.carbon.carbon_parser import CarbonParser
+
+
+EPOCH = pd.Timestamp('1970-01-01', tz='UTC')
+
+
+def to_epoch_seconds(values):
+    """Convert timezone-aware timestamps (scalar or Series) to integer UTC epoch seconds."""
+    return (values - EPOCH) // pd.Timedelta(seconds=1)
+
+
+def from_epoch_seconds(values):
+    return pd.to_datetime(values, unit='s', utc=True)
+
+
+class CarbonStore:
+    """Persistent SQLite store of half-hourly carbon intensity and generation mix rows.
+
+    Rows are kept per scope (e.g. ``postcode:G5`` or ``regional:1``) together with the time
+    ranges that have already been fetched for that scope, so callers only need to request
+    the gaps. Safe to share between threads (one connection per thread) and processes
+    (SQLite file locking).
+
+    Parameters
+    ----------
+    `path` : str
+        Location of the SQLite database; parent directories are created.
+    `settle_period` : timedelta
+        Data this close to the present is stored but not marked as covered, so it is
+        fetched again once the API has published the final values.
+    """
+
+    FUEL_MIX_LABELS = CarbonParser.FUEL_MIX_LABELS
+
+    def __init__(self, path='data/cache/carbon_intensity.sqlite', settle_period=timedelta(days=2)):
+        self.path = path
+        self.settle_period = settle_period
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._create_tables()
+
+    @staticmethod
+    def scope(type_, region_id=None, postcode=None):
+        if type_ == "regional":
+            return f"regional:{region_id}"
+        if type_ == "postcode":
+            return f"postcode:{postcode}"
+        return "national"
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=60)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _create_tables(self):
+        fuel_columns = ", ".join(f"{label} REAL" for label in self.FUEL_MIX_LABELS)
+        with self._connection() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS carbon ("
+                         "scope TEXT, timestamp INTEGER, regionid INTEGER, forecast REAL, actual REAL, "
+                         "carbon_index TEXT, PRIMARY KEY (scope, timestamp))")
+            conn.execute("CREATE TABLE IF NOT EXISTS generation_mix ("
+                         f"scope TEXT, timestamp INTEGER, regionid INTEGER, {fuel_columns}, "
+                         "PRIMARY KEY (scope, timestamp))")
+            conn.execute("CREATE TABLE IF NOT EXISTS coverage (scope TEXT, start INTEGER, end INTEGER)")
+            conn.execute("CREATE TABLE IF NOT EXISTS postcode_region (postcode TEXT PRIMARY KEY, regionid INTEGER)")
+
+    def region_for_postcode(self, postcode):
+        """Return the cached region id of `postcode`, or None if it was never resolved."""
+        row = self._connection().execute("SELECT regionid FROM postcode_region WHERE postcode = ?",
+                                         (str(postcode),)).fetchone()
+        return None if row is None else row[0]
+
+    def set_region_for_postcode(self, postcode, region_id):
+        with self._connection() as conn:
+            conn.execute("INSERT OR REPLACE INTO postcode_region VALUES (?, ?)", (str(postcode), int(region_id)))
+
+    def _coverage(self, conn, scope):
+        return conn.execute("SELECT start, end FROM coverage WHERE scope = ? ORDER BY start",
+                            (scope,)).fetchall()
+
+    def missing(self, scope, start, end):
+        """Return the (start, end) sub-ranges of [start, end] that are not covered yet."""
+        start_s, end_s = int(to_epoch_seconds(start)), int(to_epoch_seconds(end))
+        gaps = []
+        cursor = start_s
+        for covered_start, covered_end in self._coverage(self._connection(), scope):
+            if covered_end < cursor:
+                continue
+            if covered_start > end_s:
+                break
+            if covered_start > cursor:
+                gaps.append((cursor, covered_start))
+            cursor = max(cursor, covered_end)
+        if cursor < end_s:
+            gaps.append((cursor, end_s))
+        return [(from_epoch_seconds(a), from_epoch_seconds(b)) for a, b in gaps]
+
+    def add(self, scope, start, end, carbon, gen_mix):
+        """Store fetched rows and mark [start, end] (minus the settle period) as covered."""
+        conn = self._connection()
+        with conn:
+            if carbon is not None and not carbon.empty:
+                regionids = carbon['regionid'].tolist() if 'regionid' in carbon else [None] * len(carbon)
+                rows = zip(to_epoch_seconds(carbon['timestamp']).tolist(), regionids,
+                           carbon['forecast'].tolist(), carbon['actual'].tolist(), carbon['index'].tolist())
+                conn.executemany("INSERT OR REPLACE INTO carbon VALUES (?, ?, ?, ?, ?, ?)",
+                                 ((scope,) + row for row in rows))
+            if gen_mix is not None and not gen_mix.empty:
+                columns = [to_epoch_seconds(gen_mix['timestamp']).tolist(), gen_mix['regionid'].tolist()]
+                columns += [gen_mix[label].tolist() for label in self.FUEL_MIX_LABELS]
+                placeholders = ", ".join("?" * (len(columns) + 1))
+                conn.executemany(f"INSERT OR REPLACE INTO generation_mix VALUES ({placeholders})",
+                                 ((scope,) + row for row in zip(*columns)))
+
+            settled = datetime.now(pytz.utc) - self.settle_period
+            end = min(pd.Timestamp(end), pd.Timestamp(settled))
+            if end <= start:
+                return
+            intervals = self._coverage(conn, scope) + [(int(to_epoch_seconds(start)), int(to_epoch_seconds(end)))]
+            merged = []
+            for covered_start, covered_end in sorted(intervals):
+                if merged and covered_start <= merged[-1][1]:
+                    merged[-1][1] = max(merged[-1][1], covered_end)
+                else:
+                    merged.append([covered_start, covered_end])
+            conn.execute("DELETE FROM coverage WHERE scope = ?", (scope,))
+            conn.executemany("INSERT INTO coverage VALUES (?, ?, ?)", ((scope, a, b) for a, b in merged))
+
+    def load(self, scope, start, end):
+        """Return (carbon, gen_mix) rows of `scope` with timestamps in [start, end].
+
+        Same layout as `CarbonParser.parse_fromto_json`; gen_mix is None for national scopes.
+        """
+        conn = self._connection()
+        bounds = (scope, int(to_epoch_seconds(start)), int(to_epoch_seconds(end)))
+        carbon = pd.read_sql_query("SELECT timestamp, regionid, forecast, actual, carbon_index AS 'index' "
+                                   "FROM carbon WHERE scope = ? AND timestamp BETWEEN ? AND ? "
+                                   "ORDER BY timestamp", conn, params=bounds)
+        if carbon.empty:
+            return pd.DataFrame(), None
+        carbon['timestamp'] = from_epoch_seconds(carbon['timestamp'])
+        # NULLs come back as None and ints as REAL; restore the parser's dtypes (int64 unless missing)
+        for column in ['forecast', 'actual']:
+            values = carbon[column].astype(float)
+            if values.notna().all() and (values == values.round()).all():
+                values = values.astype('int64')
+            carbon[column] = values
+        if scope == "national":
+            return carbon.drop('regionid', axis=1), None
+
+        gen_mix = pd.read_sql_query("SELECT timestamp, regionid, " + ", ".join(self.FUEL_MIX_LABELS) + " "
+                                    "FROM generation_mix WHERE scope = ? AND timestamp BETWEEN ? AND ? "
+                                    "ORDER BY timestamp", conn, params=bounds)
+        gen_mix['timestamp'] = from_epoch_seconds(gen_mix['timestamp'])
+        gen_mix[self.FUEL_MIX_LABELS] = gen_mix[self.FUEL_MIX_LABELS].astype(float)
+        return carbon, gen_mix
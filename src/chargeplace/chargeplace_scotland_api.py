@@ -1,24 +1,61 @@
-import json
 import logging
-from datetime import datetime, timedelta, date
+from datetime import datetime, timedelta
 from time import sleep
-import requests
 import pandas as pd
 from numpy import nan
-from shapely.geometry import Point
-import geopandas as gpd
 import os
 import numpy as np
-from src.carbon.carbon_intensity_api import CarbonIntensityAPI
-from src.carbon.carbon_adapter import CarbonAdapter
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from src.chargeplace.sessions import process_session_data, calculate_time_intervals, get_time_energy, get_time_occupied
-import pytz
+from src.carbon.carbon_parser import align_carbon
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+import contextlib
+import tempfile
+from collections import namedtuple
+from functools import cached_property
+from src.chargeplace.sessions import process_session_data, calculate_time_intervals, get_time_energy, get_time_occupied, \
+    expand_sessions, slice_intervals, downsample_intervals
+from src.chargeplace.shared_sessions import export_sessions, load_sessions
+from src.chargeplace.session_store import SessionStore
+from src.chargeplace.session_partitions import load_sessions_source
+from src.chargeplace.features import load_features, parse_features
+from src.chargeplace.input_cache import InputCache, shapefile_sources
+from src.chargeplace.writers import OUTPUT_FORMATS, OUTPUT_LAYOUTS, CsvWriter, create_writer, resolution_suffix
+from src.chargeplace.sparse import carbon_table, sparse_rows, write_carbon_tables
+from src.chargeplace.manifest import Manifest, session_fingerprint
+from src.chargeplace.profiling import Profiler
+from src.chargeplace.rollups import RollupAccumulator, write_rollups
+from src.chargeplace.sharding import assign_shards, connector_costs, shard_dir
 
 # basic logging for visibility
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+EXPANSION_MODES = ('vectorized', 'reference')
+EXECUTION_BACKENDS = ('thread', 'process')
+
+# Result of one local authority: its rollup frames ({granularity: frame}) and the carbon tables of the sparse layout
+AuthorityResult = namedtuple('AuthorityResult', ['rollups', 'carbon'])
+
+# One output resolution of a local authority: interval length in minutes and where it is written
+Resolution = namedtuple('Resolution', ['granularity', 'writer', 'manifest', 'rollup'])
+
+# Per-process API instance used by the process-pool backend (set by _init_worker)
+_worker_api = None
+
+
+def _init_worker(sessions_dir, carbon_cache_path, profile=False, weather_cache_path=None):
+    global _worker_api
+    _worker_api = ChargePlaceScotlandAPI._from_sessions(SessionStore(load_sessions(sessions_dir), presorted=True),
+                                                        carbon_cache_path, Profiler(enabled=profile),
+                                                        weather_cache_path)
+
+
+def _process_in_worker(local_auth, granularities, base_dir, expansion, output_format, partition_by_year,
+                       incremental, rollups, layout, weather, output_dir, connectors):
+    result = _worker_api._process_local_authority(local_auth, granularities, base_dir, expansion,
+                                                  output_format, partition_by_year, incremental, rollups, layout,
+                                                  weather, output_dir, connectors)
+    # the worker's stage timings travel back with the result and are merged by the parent
+    return result, _worker_api.profiler.drain() if _worker_api.profiler.enabled else None
 
 
 class ChargePlaceScotlandAPI:
@@ -36,123 +73,508 @@ class ChargePlaceScotlandAPI:
                  feature_collection_path,
                  sessions_path,
                  council_areas_polygon_path,
-                 council_areas_path):
-
-        self.feature_collection = self._parse_features_json_to_df(feature_collection_path)
-        self.feature_collection = self._create_gdf_instance(self.feature_collection)
-        self.sessions = pd.read_csv(sessions_path)
-        #self.sessions = self.sessions.drop([], axis=1)
-
-        self.sessions['Duration'] = pd.to_timedelta(self.sessions['Duration'])
-        self.sessions['Start'] = pd.to_datetime(self.sessions['Start'])
-        self.sessions['charging_period'] = self.sessions['Duration'].dt.total_seconds() / 3600
-        self.sessions['CP ID'] = self.sessions['CP ID'].astype(str)
-        self.sessions['Connector'] = pd.to_numeric(self.sessions['Connector'], downcast='integer', errors='coerce')
-        self.sessions['Consumed(kWh)'] = pd.to_numeric(self.sessions['Consumed(kWh)'], downcast='float', errors='coerce')
-        self.sessions['Paid(gbp)'] = pd.to_numeric(self.sessions['Paid(gbp)'], downcast='float', errors='coerce')
+                 council_areas_path,
+                 carbon_cache_path='data/cache/carbon_intensity.sqlite',
+                 cache_dir='data/cache',
+                 weather_cache_path='data/cache/weather.sqlite',
+                 profiler=None,
+                 session_months=None,
+                 session_range=None):
+
+        # stage timings are only recorded with an enabled profiler (main.py --profile)
+        self.profiler = profiler or Profiler(enabled=False)
+
+        # inputs are loaded on first use, so a run only pays for what its stages need
+        self.feature_collection_path = feature_collection_path
+        self.sessions_path = sessions_path
+        self.council_areas_polygon_path = council_areas_polygon_path
+        self.council_areas_path = council_areas_path
+        self.session_months = session_months
+        self.session_range = session_range
+
+        # parsed inputs are snapshotted in cache_dir, keyed by the hashes of their source files,
+        # so a warm start maps them instead of parsing
+        self.cache_dir = cache_dir
+        # directory of the memory-mapped session snapshot, handed to process-backend workers
+        self.sessions_cache_path = None
 
-        self.sessions = self.sessions[['Start', 'Duration', 'Consumed(kWh)', 'Paid(gbp)', 'CP ID', 'Connector']]
+        # Carbon adapter with caching; reuse across calls
+        self.carbon_cache_path = carbon_cache_path
+        # hourly weather per grid cell, fetched by the weather stage and joined by populate
+        self.weather_cache_path = weather_cache_path
+
+    @cached_property
+    def input_cache(self):
+        return InputCache(self.cache_dir) if self.cache_dir else None
+
+    @cached_property
+    def feature_collection(self):
+        with self.profiler.stage('load_features') as stage:
+            feature_collection = self._create_gdf_instance(load_features(self.feature_collection_path,
+                                                                         self.cache_dir))
+            stage.rows = len(feature_collection)
+        return feature_collection
+
+    @cached_property
+    def session_store(self):
+        """Sorted, read-only view of the sessions keyed by (CP ID, Connector); shared by all workers."""
+        cache = self.input_cache
+        with self.profiler.stage('load_sessions') as stage:
+            # sessions_path is a month-partitioned store directory or a single all_sessions.csv
+            start, end = self.session_range or (None, None)
+            sessions_key = cache.key('sessions', [self.sessions_path], self.session_months, start, end) \
+                if cache else None
+            cached = cache.load_sessions(sessions_key) if cache else None
+            if cached is not None:
+                sessions, self.ingest_stats = cached
+            else:
+                sessions, self.ingest_stats = load_sessions_source(self.sessions_path, self.session_months, start, end)
+            stage.rows = len(sessions)
+
+        with self.profiler.stage('build_session_store') as stage:
+            # the snapshot is already in store order
+            session_store = SessionStore(sessions, presorted=cached is not None)
+            if cache is not None:
+                if cached is None:
+                    cache.save_sessions(sessions_key, session_store.sessions)
+                self.sessions_cache_path = cache.sessions_path(sessions_key)
+            stage.rows = len(session_store)
+        return session_store
+
+    @cached_property
+    def sessions(self):
+        return self.session_store.sessions
+
+    @cached_property
+    def council_areas(self):
+        with self.profiler.stage('load_council_areas') as stage:
+            read = lambda: self._read_council_areas(self.council_areas_polygon_path, self.council_areas_path)
+            if self.input_cache is not None:
+                sources = [self.council_areas_path] + shapefile_sources(self.council_areas_polygon_path)
+                council_areas = self.input_cache.frame('council_areas', sources, read, geo=True)
+            else:
+                council_areas = read()
+            stage.rows = len(council_areas)
+        return council_areas
 
-        # self.sessions = self.sessions[:100000]
+    @cached_property
+    def carbon_adapter(self):
+        return self._create_carbon_adapter(self.carbon_cache_path)
 
-        #self.sessions = pd.merge(self.sessions, self.feature_collection[['name', 'id', 'capacity']], left_on=['CP ID', 'Connector'], right_on=['name', 'id'])
-        #self.sessions['real_charging_duration'] = self.sessions['Consum(kWh)'] / self.sessions['connectorMaxChargeRate']
+    @cached_property
+    def weather_service(self):
+        return self._create_weather_service(self.weather_cache_path)
 
-        # self.sessions.dropna(subset=['Duration', 'Start'])
+    @staticmethod
+    def _read_council_areas(council_areas_polygon_path, council_areas_path):
+        import geopandas as gpd
 
         council_areas_polygon = gpd.read_file(council_areas_polygon_path)
         council_areas_regions = pd.read_csv(council_areas_path)
 
-        self.council_areas = pd.merge(council_areas_polygon, council_areas_regions, on='local_auth')
-        self.council_areas = self.council_areas.drop(['la_s_code',
-                                                      'cc_name',
-                                                      'active',
-                                                      'url',
-                                                      'sh_date_up',
-                                                      'sh_src',
-                                                      'sh_src_id'], axis=1)
-
-        # Carbon adapter with caching; reuse across calls
-        self.carbon_adapter = CarbonAdapter()
+        council_areas = pd.merge(council_areas_polygon, council_areas_regions, on='local_auth')
+        council_areas = council_areas.drop(['la_s_code',
+                                            'cc_name',
+                                            'active',
+                                            'url',
+                                            'sh_date_up',
+                                            'sh_src',
+                                            'sh_src_id'], axis=1)
+        return council_areas
+
+    @staticmethod
+    def _create_carbon_adapter(carbon_cache_path):
+        """Carbon adapter backed by the on-disk cache at `carbon_cache_path` (in-memory only if None)."""
+        from src.carbon.carbon_adapter import CarbonAdapter
+        from src.carbon.carbon_store import CarbonStore
+
+        store = CarbonStore(carbon_cache_path) if carbon_cache_path else None
+        return CarbonAdapter(store=store)
+
+    @staticmethod
+    def _create_weather_service(weather_cache_path):
+        """Weather service backed by the on-disk store at `weather_cache_path`."""
+        from src.weather.weather_service import WeatherService
+        from src.weather.weather_store import WeatherStore
+
+        return WeatherService(WeatherStore(weather_cache_path))
 
     def create_folder_structure(self, base_dir='data/result'):
-        local_authorities = self.council_areas['local_auth'].unique()
-        for local_auth in local_authorities:
-            directory_path = os.path.join(base_dir, local_auth, 'sessions_mix')
-            if not os.path.exists(directory_path):
-                try:
-                    os.makedirs(directory_path, exist_ok=True)
-                    logger.info("Directory '%s' created successfully.", local_auth)
-                except OSError as error:
-                    logger.error("Error creating directory '%s': %s", local_auth, error)
-            else:
-                logger.debug("Directory '%s' already exists.", local_auth)
+        with self.profiler.stage('create_folder_structure') as stage:
+            local_authorities = self.council_areas['local_auth'].unique()
+            stage.rows = len(local_authorities)
+            for local_auth in local_authorities:
+                directory_path = os.path.join(base_dir, local_auth, 'sessions_mix')
+                if not os.path.exists(directory_path):
+                    try:
+                        os.makedirs(directory_path, exist_ok=True)
+                        logger.info("Directory '%s' created successfully.", local_auth)
+                    except OSError as error:
+                        logger.error("Error creating directory '%s': %s", local_auth, error)
+                else:
+                    logger.debug("Directory '%s' already exists.", local_auth)
 
     def locate_council_area_charging_infrastructure(self, base_dir='data/result'):
-        def remove_incode(postcode):
-            if ' ' in postcode:
-                return postcode.split(' ')[0]
-            else:
-                return postcode[:-3]
-
-        for local_auth in os.listdir(base_dir):
-            if os.path.isdir(os.path.join(base_dir, local_auth)):
-                council_area = self.council_areas[self.council_areas['local_auth'] == local_auth]
-                # council_area = council_area[['geometry']]
-
-                if council_area.crs != self.feature_collection.crs:
-                    council_area = council_area.to_crs(self.feature_collection.crs)
-
-                gdf = gpd.sjoin(self.feature_collection, council_area, how='inner', op='within')
-                gdf = gdf.reset_index(drop=True)
-
-                gdf['Postcode'] = gdf['Postcode'].apply(remove_incode)
-
-                gdf = gdf.drop(['index_right', 'geometry'], axis=1)
-                
-                gdf = gdf.assign(
-                    **{
-                        'Local Authority': gdf['local_auth'].astype(str).str.strip(),
-                        'Region ID': gdf['region_id'].astype(str).str.strip(),
-                    }
-                )
-                gdf = gdf[['Latitude', 'Longitude', 'CP ID', 'Connector', 
+        """Assign every charger to its council area and write charging_infrastructure.csv per authority.
+
+        All charger points are joined against all council polygons in a single spatial-index
+        backed ``sjoin`` (polygons reprojected once), and the result is split per authority.
+        """
+        import geopandas as gpd
+
+        with self.profiler.stage('locate_council_area_charging_infrastructure') as stage:
+            local_auths = [d for d in os.listdir(base_dir) if os.path.isdir(os.path.join(base_dir, d))]
+
+            council_areas = self.council_areas[self.council_areas['local_auth'].isin(local_auths)]
+            if council_areas.crs != self.feature_collection.crs:
+                council_areas = council_areas.to_crs(self.feature_collection.crs)
+
+            joined = gpd.sjoin(self.feature_collection, council_areas, how='inner', op='within')
+            # keep chargers in feature collection order within each authority
+            joined = joined.sort_index(kind='mergesort').reset_index(drop=True)
+            stage.rows = len(joined)
+
+            # remove the inward code of the postcode
+            postcode = joined['Postcode']
+            joined['Postcode'] = postcode.str.split(' ').str[0].where(postcode.str.contains(' '), postcode.str[:-3])
+
+            joined = joined.drop(['index_right', 'geometry'], axis=1)
+            joined = joined.assign(
+                **{
+                    'Local Authority': joined['local_auth'].astype(str).str.strip(),
+                    'Region ID': joined['region_id'].astype(str).str.strip(),
+                }
+            )
+            groups = dict(list(joined.groupby('local_auth', sort=False)))
+
+            for local_auth in local_auths:
+                gdf = groups.get(local_auth, joined.iloc[0:0])
+                gdf = gdf[['Latitude', 'Longitude', 'CP ID', 'Connector',
                            'Nominal Power (kW)', 'Connector Type', 'Tariff', 'Connection Fee',
                            'Address', 'Postcode', 'Local Authority', 'Region ID']]
-                
+
                 gdf_path = os.path.join(base_dir, local_auth, 'charging_infrastructure.csv')
                 gdf.to_csv(gdf_path, index=False)
 
-    def populate_session_data_per_charger(self, granularity=30, base_dir='data/result', max_workers=4):
-        """Process each local authority in parallel (bounded by max_workers)."""
-        local_auths = [d for d in os.listdir(base_dir) if os.path.isdir(os.path.join(base_dir, d))]
+    def fetch_and_store_weather(self, base_dir='data/result'):
+        """Prefetch the hourly weather of every charger over its active session date range.
 
-        def _process(local_auth):
-            infra_path = os.path.join(base_dir, local_auth, 'charging_infrastructure.csv')
-            if not os.path.exists(infra_path):
-                logger.warning("No charging_infrastructure.csv for %s, skipping", local_auth)
+        Chargers of all authorities in `base_dir` are snapped to weather cells and only the
+        ranges missing from the weather store are requested, in batched multi-location calls,
+        so the weather join of `populate_session_data_per_charger` is served from the store.
+        """
+        with self.profiler.stage('fetch_and_store_weather') as stage:
+            local_auths = [d for d in os.listdir(base_dir) if os.path.isdir(os.path.join(base_dir, d))]
+            paths = [os.path.join(base_dir, la, 'charging_infrastructure.csv') for la in sorted(local_auths)]
+            paths = [path for path in paths if os.path.exists(path)]
+            if not paths:
+                logger.warning('No charging_infrastructure.csv in %s, no weather to fetch', base_dir)
                 return
-            charging_infrastructure = pd.read_csv(infra_path)
-            self.generate_charging_data_with_rounded_time(charging_infrastructure, granularity,
-                                                          folder=os.path.join(base_dir, local_auth, 'sessions_mix'))
-
-        with ThreadPoolExecutor(max_workers=max_workers) as ex:
-            futures = {ex.submit(_process, la): la for la in local_auths}
-            for fut in as_completed(futures):
-                la = futures[fut]
-                try:
-                    fut.result()
-                except Exception as e:
-                    logger.exception("Error processing %s: %s", la, e)
-                    
-
-    def generate_charging_data_with_rounded_time(self, df, granularity, folder):
-
-        df['Connector'] = df['Connector'].astype(str)
-        df['CP ID'] = df['CP ID'].astype(str)
-        self.sessions['CP ID'] = self.sessions['CP ID'].astype(str)
-        self.sessions['Connector'] = self.sessions['Connector'].astype(str)
-        session_df = pd.merge(self.sessions, df, on=['CP ID', 'Connector'], how='inner')
+            chargers = pd.concat([pd.read_csv(path, usecols=['CP ID', 'Latitude', 'Longitude']) for path in paths],
+                                 ignore_index=True)
+            cells = self.weather_service.cell_ranges(chargers, self.sessions)
+            stage.rows = len(cells)
+            requests = self.weather_service.prefetch(cells)
+        logger.info('Weather for %d chargers in %d cells is stored (%d requests)', chargers['CP ID'].nunique(),
+                    len(cells), requests)
+
+    @classmethod
+    def _from_sessions(cls, session_store, carbon_cache_path=None, profiler=None, weather_cache_path=None):
+        """Build a minimal instance that can only run the per-authority session stage."""
+        api = cls.__new__(cls)
+        api.profiler = profiler or Profiler(enabled=False)
+        api.session_store = session_store
+        api.sessions_cache_path = None
+        api.carbon_cache_path = carbon_cache_path
+        api.weather_cache_path = weather_cache_path
+        return api
+
+    def populate_session_data_per_charger(self, granularity=30, base_dir='data/result', max_workers=4,
+                                          expansion='vectorized', backend='thread', output_format='csv',
+                                          partition_by_year=False, incremental=True, rollups=False,
+                                          layout='dense', weather=False, shard=None):
+        """Process each local authority in parallel (bounded by max_workers).
+
+        `granularity` is the interval length in minutes, or a list of them to write several
+        resolutions in one run (each a multiple of the finest, dividing an hour). Sessions are
+        expanded once at the finest one and downsampled to the others; outputs other than the
+        30 minute ones get a '_<granularity>min' suffix (e.g. sessions_mix_15min/).
+
+        `expansion` selects how sessions are split into intervals: 'vectorized' expands all
+        sessions of an authority at once with NumPy, 'reference' keeps the original per-session loop.
+
+        `backend` is either 'thread' or 'process'. The process backend sidesteps the GIL: the
+        session table is exported once to memory-mapped files that every worker process maps
+        at start-up, so it is never pickled per task.
+
+        `output_format` is 'csv' (one file per connector in sessions_mix/) or 'parquet' (one
+        dataset per authority in sessions_mix.parquet/, split by year if `partition_by_year`).
+
+        Every authority keeps a manifest of what was generated from which sessions. With
+        `incremental`, connectors whose sessions and carbon coverage are unchanged since the
+        last (possibly interrupted) run are skipped; otherwise everything is regenerated.
+
+        With `rollups`, total consumption and the number of occupied connectors per interval
+        are accumulated per local authority while the sessions are expanded, and written to
+        authority_rollups and region_rollups (per carbon region) in `base_dir`. Rollups need
+        every connector, so they cannot be combined with `incremental`.
+
+        `layout` 'sparse' (csv only) writes just the active intervals of each connector into
+        sessions_sparse/ with an index, and the carbon columns once per carbon region into
+        carbon_region_<id>.csv in `base_dir`; `src.chargeplace.sparse` expands them back to
+        the dense files on demand.
+
+        With `weather` (dense layout only), the hourly weather of each charger's grid cell
+        (see `fetch_and_store_weather`) is added to its rows; ranges the weather store lacks
+        are fetched per authority first.
+
+        With a `shard` (`src.chargeplace.sharding.Shard`), only its part of the work is done and
+        written to its own directory next to `base_dir` (see `shard_dir`), so several nodes
+        sharing a filesystem can each run one shard; `merge_shards` then combines them into
+        `base_dir`. Work is split by connector or by local authority, balancing the estimated
+        cost of each (`connector_costs`). Connectors already merged into `base_dir` and still
+        up to date are skipped as in an unsharded incremental run.
+        """
+        if expansion not in EXPANSION_MODES:
+            raise ValueError(f"expansion must be one of {EXPANSION_MODES}, got {expansion!r}")
+        if backend not in EXECUTION_BACKENDS:
+            raise ValueError(f"backend must be one of {EXECUTION_BACKENDS}, got {backend!r}")
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"output_format must be one of {OUTPUT_FORMATS}, got {output_format!r}")
+        if layout not in OUTPUT_LAYOUTS:
+            raise ValueError(f"layout must be one of {OUTPUT_LAYOUTS}, got {layout!r}")
+        if layout == 'sparse' and output_format != 'csv':
+            raise ValueError("The sparse layout is only available for csv output")
+        if weather and layout != 'dense':
+            raise ValueError("Weather is only joined onto the dense layout")
+        if rollups and incremental:
+            raise ValueError("Rollups need every connector; run with incremental=False")
+        granularities = sorted({granularity} if isinstance(granularity, int) else set(granularity))
+        for g in granularities:
+            if g <= 0 or 60 % g or g % granularities[0]:
+                raise ValueError(f"granularities must divide an hour and be multiples of {granularities[0]}, "
+                                 f"got {granularities}")
+        # load the inputs the workers share before they start, instead of on first use in a worker
+        self.session_store
+        if backend == 'thread':
+            self.carbon_adapter
+            if weather:
+                self.weather_service
+        local_auths = [d for d in os.listdir(base_dir) if os.path.isdir(os.path.join(base_dir, d))]
+        output_dir, connectors = base_dir, {}
+        if shard is not None:
+            output_dir = shard_dir(base_dir, shard)
+            local_auths, connectors = self._shard_work(local_auths, base_dir, shard, granularities[0])
+            os.makedirs(output_dir, exist_ok=True)
+            logger.info('Shard %d of %d: %d local authorities, writing to %s', shard.index, shard.count,
+                        len(local_auths), output_dir)
+
+        with self.profiler.stage('populate_session_data_per_charger', process_cpu=True) as stage:
+            stage.rows = len(local_auths)
+            if backend == 'thread':
+                with ThreadPoolExecutor(max_workers=max_workers) as ex:
+                    futures = {ex.submit(self._process_local_authority, la, granularities, base_dir, expansion,
+                                         output_format, partition_by_year, incremental, rollups, layout,
+                                         weather, output_dir, connectors.get(la)): la
+                               for la in local_auths}
+                    results = self._collect_results(futures)
+            else:
+                # workers map the input cache snapshot directly; without one the sessions are exported
+                if self.sessions_cache_path is not None:
+                    sessions_context = contextlib.nullcontext(self.sessions_cache_path)
+                else:
+                    sessions_context = tempfile.TemporaryDirectory(prefix='gridcharge_sessions_')
+                with sessions_context as sessions_dir:
+                    if self.sessions_cache_path is None:
+                        export_sessions(self.sessions, sessions_dir)
+                    with ProcessPoolExecutor(max_workers=max_workers,
+                                             initializer=_init_worker,
+                                             initargs=(sessions_dir, self.carbon_cache_path,
+                                                       self.profiler.enabled, self.weather_cache_path)) as ex:
+                        futures = {ex.submit(_process_in_worker, la, granularities, base_dir, expansion,
+                                             output_format, partition_by_year, incremental, rollups, layout,
+                                             weather, output_dir, connectors.get(la)): la
+                                   for la in local_auths}
+                        results = self._collect_results(futures, from_workers=True)
+
+        if rollups:
+            with self.profiler.stage('write_rollups') as stage:
+                paths = []
+                for g in granularities:
+                    # authorities in a fixed order so the output does not depend on completion order
+                    paths += write_rollups(output_dir, [results[la].rollups.get(g) for la in sorted(results)],
+                                           output_format, resolution_suffix(g))
+                stage.rows = len(results)
+            logger.info('Wrote rollups to %s', ', '.join(paths))
+
+        if layout == 'sparse':
+            with self.profiler.stage('write_carbon_tables') as stage:
+                tables = {}
+                for la in sorted(results):
+                    for carbon_region, table in results[la].carbon.items():
+                        tables.setdefault(carbon_region, []).append(table)
+                tables = {region: pd.concat(parts, ignore_index=True) for region, parts in tables.items()}
+                paths = write_carbon_tables(output_dir, tables)
+                stage.rows = len(paths)
+            logger.info('Wrote carbon tables %s', ', '.join(paths))
+
+    def _shard_work(self, local_auths, base_dir, shard, granularity):
+        """Return the local authorities `shard` works on and {local_auth: connector keys} when
+        it is split by connector (no entry means the whole authority)."""
+        with self.profiler.stage('shard') as stage:
+            costs = connector_costs(self.sessions, granularity)
+            keys = {}
+            for la in sorted(local_auths):
+                infra_path = os.path.join(base_dir, la, 'charging_infrastructure.csv')
+                if os.path.exists(infra_path):
+                    infrastructure = pd.read_csv(infra_path, usecols=['CP ID', 'Connector'], dtype=str)
+                    keys[la] = list(zip(infrastructure['CP ID'], infrastructure['Connector']))
+            stage.rows = sum(len(la_keys) for la_keys in keys.values())
+
+            if shard.by == 'authority':
+                assignment = assign_shards({la: sum(costs.get(key, 0) for key in la_keys)
+                                            for la, la_keys in keys.items()}, shard.count)
+                return [la for la in local_auths if assignment.get(la) == shard.index], {}
+
+            assignment = assign_shards({(la,) + key: costs.get(key, 0) for la, la_keys in keys.items()
+                                        for key in la_keys}, shard.count)
+            connectors = {}
+            for (la, cp_id, connector), index in assignment.items():
+                if index == shard.index:
+                    connectors.setdefault(la, set()).add((cp_id, connector))
+            return [la for la in local_auths if la in connectors], connectors
+
+    def _collect_results(self, futures, from_workers=False):
+        """Wait for all authorities and return {local_auth: result}; failed authorities are logged."""
+        results = {}
+        for fut in as_completed(futures):
+            la = futures[fut]
+            try:
+                result = fut.result()
+                if from_workers:
+                    # process workers also return their stage timings, thread workers record them directly
+                    result, profile = result
+                    self.profiler.merge(profile)
+                results[la] = result
+            except Exception as e:
+                logger.exception("Error processing %s: %s", la, e)
+        return results
+
+    def _process_local_authority(self, local_auth, granularities, base_dir, expansion, output_format='csv',
+                                 partition_by_year=False, incremental=True, rollups=False, layout='dense',
+                                 weather=False, output_dir=None, connectors=None):
+        """Generate the output of one local authority at every granularity in `granularities`
+        and return its `AuthorityResult`.
+
+        Outputs go to `output_dir` (default `base_dir`); `connectors`, if given, limits them to
+        those (CP ID, Connector) keys.
+        """
+        output_dir = output_dir or base_dir
+        infra_path = os.path.join(base_dir, local_auth, 'charging_infrastructure.csv')
+        if not os.path.exists(infra_path):
+            logger.warning("No charging_infrastructure.csv for %s, skipping", local_auth)
+            return AuthorityResult({}, {})
+        charging_infrastructure = pd.read_csv(infra_path)
+        if connectors is not None:
+            keys = zip(charging_infrastructure['CP ID'].astype(str), charging_infrastructure['Connector'].astype(str))
+            charging_infrastructure = charging_infrastructure[[key in connectors for key in keys]]
+        os.makedirs(os.path.join(output_dir, local_auth), exist_ok=True)
+        resolutions = []
+        for granularity in granularities:
+            writer = create_writer(output_format, output_dir, local_auth, partition_by_year, layout, granularity)
+            manifest = Manifest(output_dir, local_auth, resolution_suffix(granularity))
+            if output_dir != base_dir and writer.incremental:
+                # connectors merged into base_dir earlier count as generated, shard entries take precedence
+                manifest.entries = {**Manifest(base_dir, local_auth, resolution_suffix(granularity)).entries,
+                                    **manifest.entries}
+            resolutions.append(Resolution(granularity, writer, manifest,
+                                          RollupAccumulator(local_auth) if rollups else None))
+        with self.profiler.stage('authority', authority=local_auth) as stage:
+            try:
+                stage.rows = self.generate_charging_data_with_rounded_time(
+                    charging_infrastructure, granularities[0],
+                    folder=os.path.join(output_dir, local_auth, 'sessions_mix'),
+                    expansion=expansion,
+                    incremental=incremental,
+                    authority=local_auth,
+                    resolutions=resolutions,
+                    weather=weather)
+            finally:
+                with self.profiler.stage('write', authority=local_auth):
+                    for res in resolutions:
+                        res.writer.close()
+            for res in resolutions:
+                # entries of non-incremental writers only become valid once the output is closed
+                res.manifest.commit()
+                res.manifest.compact()
+
+        rollup_frames = {}
+        if rollups:
+            with self.profiler.stage('rollup', authority=local_auth) as stage:
+                rollup_frames = {res.granularity: res.rollup.frame(res.granularity) for res in resolutions}
+                stage.rows = sum(len(frame) for frame in rollup_frames.values())
+        writer = resolutions[0].writer
+        return AuthorityResult(rollup_frames, writer.carbon if writer.sparse else {})
+
+    def generate_charging_data_with_rounded_time(self, df, granularity, folder, expansion='vectorized', writer=None,
+                                                 manifest=None, incremental=True, authority=None, rollup=None,
+                                                 resolutions=None, weather=False):
+        """Build and write the interval time series of every connector in `df`.
+
+        `writer` receives one frame per connector; defaults to a CSV file per connector in `folder`.
+        If a `manifest` is given every written connector is recorded in it and, with `incremental`,
+        connectors it reports as up to date are not regenerated.
+
+        The inner steps are profiled under `authority`. Every expanded connector is added to
+        `rollup` (a `RollupAccumulator`), if given. Returns the number of sessions joined to `df`.
+
+        `resolutions` (`Resolution` tuples of one layout) replace `granularity`, `writer`,
+        `manifest` and `rollup` to write several resolutions in one pass: the sessions are
+        expanded once at the finest granularity and the coarser series are downsampled from it.
+
+        With `weather`, the hourly weather of each connector's grid cell is added to its rows.
+        """
+        if resolutions is None:
+            resolutions = [Resolution(granularity, writer if writer is not None else CsvWriter(folder),
+                                      manifest, rollup)]
+        resolutions = sorted(resolutions, key=lambda res: res.granularity)
+        finest, coarsest = resolutions[0].granularity, resolutions[-1].granularity
+        sparse = resolutions[0].writer.sparse
+        profile = self.profiler.stage
+
+        with profile('join', authority) as stage:
+            df['Connector'] = df['Connector'].astype(str)
+            df['CP ID'] = df['CP ID'].astype(str)
+            session_df = self.session_store.join(df)
+
+            # stable sort so that each charger's sessions are contiguous and keep their order
+            session_df = session_df.sort_values(['CP ID', 'Connector'], kind='mergesort').reset_index(drop=True)
+            stage.rows = len(session_df)
+
+        with profile('fingerprint', authority) as stage:
+            fingerprints = {res.granularity: {} for res in resolutions}
+            for (cp_id, connector), group in session_df.groupby(['CP ID', 'Connector']):
+                for res in resolutions:
+                    settings = (res.granularity, type(res.writer).__name__) + (('weather',) if weather else ())
+                    fingerprints[res.granularity][Manifest.key(cp_id, connector)] = session_fingerprint(
+                        group, *settings)
+            stage.rows = len(session_df)
+        stale = {}
+        for res in resolutions:
+            stale[res.granularity] = set(fingerprints[res.granularity])
+            if res.manifest is not None and incremental:
+                stale[res.granularity] = {key for key, fingerprint in fingerprints[res.granularity].items()
+                                          if not res.manifest.is_current(key, fingerprint)}
+                if stale[res.granularity] and not res.writer.incremental:
+                    # the output is rewritten as a whole, so every connector has to be regenerated
+                    stale[res.granularity] = set(fingerprints[res.granularity])
+        if not any(stale.values()):
+            logger.info('All %d connectors in %s are up to date, skipping', len(fingerprints[finest]), folder)
+            return len(session_df)
+        if incremental and resolutions[0].manifest is not None:
+            for res in resolutions:
+                logger.info('Regenerating %d of %d connectors in %s at %d minutes', len(stale[res.granularity]),
+                            len(fingerprints[res.granularity]), folder, res.granularity)
 
         ######
 
@@ -160,15 +582,16 @@ class ChargePlaceScotlandAPI:
 
         end_times = start_times + session_df['Duration']
 
-        overall_start_time = start_times.min().replace(minute=(start_times.min().minute // granularity) * granularity,
+        # the coarsest intervals span those of every finer resolution
+        overall_start_time = start_times.min().replace(minute=(start_times.min().minute // coarsest) * coarsest,
                                                        second=0,
                                                        microsecond=0)
-        end_minute = end_times.max().minute // granularity
+        end_minute = end_times.max().minute // coarsest
 
-        overall_end_time = end_times.max().replace(minute=(end_times.max().minute // granularity) * granularity,
+        overall_end_time = end_times.max().replace(minute=(end_times.max().minute // coarsest) * coarsest,
                                                    second=0,
                                                    microsecond=0)
-        overall_end_time = overall_end_time + timedelta(minutes=granularity)
+        overall_end_time = overall_end_time + timedelta(minutes=coarsest)
 
         auth = session_df['Local Authority'].mode()[0]
         code = session_df['Postcode'].mode()[0]
@@ -176,160 +599,264 @@ class ChargePlaceScotlandAPI:
 
         # get carbon intensity data for this postcode / region (cached)
         start_iso = overall_start_time.isoformat()
-        end_iso = overall_end_time.isoformat()
-        carbon_data, gen_mix_data = self.carbon_adapter.fetch(start_iso, end_iso, "postcode", postcode=session_df['Postcode'].mode()[0])
+        # the last output interval starts at overall_end_time; include every carbon row it is aligned from,
+        # so its values do not depend on which other connectors are processed in the same run
+        end_iso = (overall_end_time + timedelta(minutes=coarsest)).isoformat()
+        with profile('carbon_fetch', authority) as stage:
+            carbon_data, gen_mix_data = self.carbon_adapter.fetch(start_iso, end_iso, "postcode", postcode=session_df['Postcode'].mode()[0])
+            stage.rows = len(carbon_data)
+
+        # the region of the carbon series every connector of the authority is merged with
+        carbon_region = carbon_data['regionid'].mode()[0] if len(carbon_data['regionid'].mode()) else None
+        if sparse:
+            if carbon_region is not None:
+                # stored once, half-hourly; the loader aligns it to each resolution
+                resolutions[0].writer.add_carbon(carbon_region, carbon_table(carbon_data, gen_mix_data))
+        aligned_carbon = {res.granularity: (align_carbon(carbon_data, res.granularity),
+                                            align_carbon(gen_mix_data, res.granularity)) for res in resolutions}
+
+        if weather:
+            # also binds join_weather for the merge below; only runs with weather data pay for the import
+            from src.weather.weather_service import join_weather, weather_cells
+
+            with profile('weather_fetch', authority) as stage:
+                cells = self.weather_service.cell_ranges(df, session_df)
+                weather_tables = self.weather_service.hourly(cells)
+                charger_cells = dict(zip(df['CP ID'], weather_cells(df['Latitude'], df['Longitude'],
+                                                                    self.weather_service.cell_size)[0]))
+                stage.rows = len(cells)
 
         ######
 
+        if expansion == 'vectorized':
+            with profile('expansion', authority) as stage:
+                energy_intervals, occupied_intervals = expand_sessions(session_df['Start'].values,
+                                                                       session_df['Duration'].values,
+                                                                       session_df['Consumed(kWh)'].values,
+                                                                       session_df['Nominal Power (kW)'].values,
+                                                                       finest)
+                intervals = {finest: (energy_intervals, occupied_intervals)}
+                for res in resolutions[1:]:
+                    intervals[res.granularity] = (downsample_intervals(energy_intervals, res.granularity),
+                                                  downsample_intervals(occupied_intervals, res.granularity, how='max'))
+                stage.rows = len(session_df)
+
         grouped = session_df.groupby(['CP ID', 'Connector'])
 
         for (cp_id, connector), group in grouped:
 
+            key = Manifest.key(cp_id, connector)
+            outputs = [res for res in resolutions if key in stale[res.granularity]]
+            if not outputs:
+                continue
+
             start_times = group['Start']
 
             end_times = start_times + pd.to_timedelta(group['Duration'], unit='h')
 
-            overall_start_time = start_times.min().replace(
-                minute=(start_times.min().minute // granularity) * granularity, second=0,
-                microsecond=0)
-
-            overall_end_time = end_times.max().replace(minute=(end_times.max().minute // granularity) * granularity,
-                                                        second=0,
-                                                        microsecond=0)
-            overall_end_time = overall_end_time + timedelta(minutes=granularity)
-
             if len(group['Postcode'].unique()) > 1:
                 raise ValueError()
 
-            # Generate a complete time series for the overall operational period
-            complete_time_series = pd.date_range(start=overall_start_time, end=overall_end_time, freq=f'{granularity}T')
-
-            charging_time_series_all = []
-            energy_series_all = []
-
-            occupied_time_series_all = []
-            occupied_series_all = []
-
-            for index, row in group.iterrows():
-                cp_id = row['CP ID']
-                connector = row['Connector']
-                start_time = row['Start']
-                max_charge_rate = row['Nominal Power (kW)']
-                total_consumed = row['Consumed(kWh)']
-                postcode = row['Postcode']
-                region_id = row['Region ID']
-                local_auth = row['Local Authority']
-                charging_duration = row['Duration']
-
-                real_charging_duration = total_consumed / max_charge_rate  # in hours
-
-                rounded_start, rounded_end, rounded_stay = self.calculate_time_intervals(start_time,
-                                                                                            charging_duration,
-                                                                                            real_charging_duration,
-                                                                                            granularity)
-
-                # Calculate number of real charging intervals (n minutes each)
-                num_charging_intervals = int((rounded_end - rounded_start) / timedelta(minutes=granularity))
-                charging_time_series, energy_series = self.get_time_energy(start_time,
-                                                                            num_charging_intervals,
-                                                                            granularity,
-                                                                            max_charge_rate,
-                                                                            total_consumed)
-
-                difference = round(np.sum(energy_series), 2) - round(total_consumed, 2)
-                assert difference < 0.1, f'Energy mismatch of {difference} for {cp_id}_{connector} at {start_time}'
-
-                # Calculate number of charging intervals with overstay(n minutes each)
-                try:
-                    num_stay_intervals = int((rounded_stay - rounded_start) / timedelta(minutes=granularity))
-                except:
-                    print(f'Issue stay period {cp_id}_{connector} at {start_time}')
-                    continue
-
-                occupied_time_series, occupied_series = self.get_time_occupied(start_time, num_stay_intervals,
-                                                                                granularity)
-
-                # save both
-                charging_time_series_all.extend(charging_time_series)
-                energy_series_all.extend(energy_series)
-
-                occupied_time_series_all.extend(occupied_time_series)
-                occupied_series_all.extend(occupied_series)
-
-            complete_data = pd.DataFrame({'timestamp': complete_time_series})
-
-            # Create DataFrame for the charger
-            processed_charging_data = self.process_session_data(timestamp=charging_time_series_all,
-                                                                column=energy_series_all,
-                                                                column_name='consumed_total',
-                                                                complete_data=complete_data)
-
-            #
-            processed_occupied_data = self.process_session_data(timestamp=occupied_time_series_all,
-                                                                column=occupied_series_all,
-                                                                column_name='occupied',
-                                                                complete_data=complete_data)
-
-            processed_session_data = processed_charging_data.merge(processed_occupied_data, on='timestamp')
-
-            merged_df = processed_session_data.merge(carbon_data, on='timestamp').merge(gen_mix_data, on='timestamp')
-
-            for column in ['biomass', 'coal', 'imports', 'gas', 'nuclear', 'other', 'hydro', 'solar', 'wind']:
-                merged_df[column] = merged_df[column] / 100
-
-            if len(merged_df['regionid_x'].mode()) != 0:
-                if region_id != merged_df['regionid_x'].mode()[0]:
-                    logger.warning('Local auth %s is set to %s but should be %s', local_auth, region_id, merged_df['regionid_x'].mode()[0])
-            else:
-                logger.warning('Problematic station without Region ID: %s_%s', cp_id, connector)
-
-            merged_df['Region ID'] = region_id
-            merged_df = merged_df.drop(['regionid_x', 'regionid_y'], axis=1)
-
-            # Reorganizing columns using reindex
-            new_column_order = ['Timestamp',
-                                'Consumed',
-                                'Occupied',
-                                'Biomass', 
-                                'Coal', 
-                                'Gas', 
-                                'Nuclear', 
-                                'Hydro', 
-                                'Solar', 
-                                'Wind',
-                                'Imports', 
-                                'Other', 
-                                'Forecast',
-                                'Carbon Index',
-                                'Region ID']
-            old_columns = [
-                                'timestamp',
-                                'consumed_total',
-                                'occupied',
-                                'biomass', 
-                                'coal', 
-                                'gas', 
-                                'nuclear', 
-                                'hydro', 
-                                'solar', 
-                                'wind',
-                                'imports',
-                                'other',  
-                                'forecast',
-                                'index',
-                                'region_id'
-            ]   
-
-            # Rename columns from old_columns to new_column_order (mapping by position)
-            rename_map = dict(zip(old_columns, new_column_order))
-            merged_df = merged_df.rename(columns=rename_map)
-
-            merged_df = merged_df.reindex(columns=new_column_order)
-
-            # Save to CSV
-            filename = f"{cp_id}_{connector}.csv"
-            filename = os.path.join(folder, filename)
-            merged_df.to_csv(filename, index=False)
+            region_id = group['Region ID'].iloc[-1]
+            local_auth = group['Local Authority'].iloc[-1]
+
+            for granularity, writer, manifest, rollup in outputs:
+                overall_start_time = start_times.min().replace(
+                    minute=(start_times.min().minute // granularity) * granularity, second=0,
+                    microsecond=0)
+
+                overall_end_time = end_times.max().replace(minute=(end_times.max().minute // granularity) * granularity,
+                                                            second=0,
+                                                            microsecond=0)
+                overall_end_time = overall_end_time + timedelta(minutes=granularity)
+
+                # Generate a complete time series for the overall operational period
+                complete_time_series = pd.date_range(start=overall_start_time, end=overall_end_time,
+                                                     freq=f'{granularity}T')
+
+                with profile('expansion', authority) as stage:
+                    if expansion == 'vectorized':
+                        energy_intervals, occupied_intervals = intervals[granularity]
+                        first_session, last_session = group.index[0], group.index[-1] + 1
+                        charging_time_series_all, energy_series_all = slice_intervals(energy_intervals,
+                                                                                      first_session, last_session)
+                        occupied_time_series_all, occupied_series_all = slice_intervals(occupied_intervals,
+                                                                                        first_session, last_session)
+                    else:
+                        (charging_time_series_all, energy_series_all,
+                         occupied_time_series_all, occupied_series_all) = self._expand_group_reference(group,
+                                                                                                       granularity)
+                        stage.rows = len(group)
+
+                if rollup is not None:
+                    # attributed to the carbon region of its output; the infrastructure's region if there is none
+                    rollup.add(charging_time_series_all, energy_series_all,
+                               occupied_time_series_all, occupied_series_all,
+                               region_id=carbon_region if carbon_region is not None else region_id)
+
+                with profile('merge', authority) as stage:
+                    complete_data = pd.DataFrame({'timestamp': complete_time_series})
+
+                    # Create DataFrame for the charger
+                    processed_charging_data = self.process_session_data(timestamp=charging_time_series_all,
+                                                                        column=energy_series_all,
+                                                                        column_name='consumed_total',
+                                                                        complete_data=complete_data)
+
+                    #
+                    processed_occupied_data = self.process_session_data(timestamp=occupied_time_series_all,
+                                                                        column=occupied_series_all,
+                                                                        column_name='occupied',
+                                                                        complete_data=complete_data)
+
+                    processed_session_data = processed_charging_data.merge(processed_occupied_data, on='timestamp')
+
+                    if sparse:
+                        # only active intervals; the carbon columns live in the shared region table
+                        merged_df = sparse_rows(processed_session_data)
+                        if carbon_region is None:
+                            logger.warning('Problematic station without Region ID: %s_%s', cp_id, connector)
+                        elif region_id != carbon_region:
+                            logger.warning('Local auth %s is set to %s but should be %s', local_auth, region_id,
+                                           carbon_region)
+                    else:
+                        interval_carbon, interval_gen_mix = aligned_carbon[granularity]
+                        merged_df = processed_session_data.merge(interval_carbon, on='timestamp') \
+                            .merge(interval_gen_mix, on='timestamp')
+
+                        for column in ['biomass', 'coal', 'imports', 'gas', 'nuclear', 'other', 'hydro', 'solar', 'wind']:
+                            merged_df[column] = merged_df[column] / 100
+
+                        if len(merged_df['regionid_x'].mode()) != 0:
+                            if region_id != merged_df['regionid_x'].mode()[0]:
+                                logger.warning('Local auth %s is set to %s but should be %s', local_auth, region_id, merged_df['regionid_x'].mode()[0])
+                        else:
+                            logger.warning('Problematic station without Region ID: %s_%s', cp_id, connector)
+
+                        merged_df['Region ID'] = region_id
+                        merged_df = merged_df.drop(['regionid_x', 'regionid_y'], axis=1)
+
+                        # Reorganizing columns using reindex
+                        new_column_order = ['Timestamp',
+                                            'Consumed',
+                                            'Occupied',
+                                            'Biomass', 
+                                            'Coal', 
+                                            'Gas', 
+                                            'Nuclear', 
+                                            'Hydro', 
+                                            'Solar', 
+                                            'Wind',
+                                            'Imports', 
+                                            'Other', 
+                                            'Forecast',
+                                            'Carbon Index',
+                                            'Region ID']
+                        old_columns = [
+                                            'timestamp',
+                                            'consumed_total',
+                                            'occupied',
+                                            'biomass', 
+                                            'coal', 
+                                            'gas', 
+                                            'nuclear', 
+                                            'hydro', 
+                                            'solar', 
+                                            'wind',
+                                            'imports',
+                                            'other',  
+                                            'forecast',
+                                            'index',
+                                            'region_id'
+                        ]   
+
+                        # Rename columns from old_columns to new_column_order (mapping by position)
+                        rename_map = dict(zip(old_columns, new_column_order))
+                        merged_df = merged_df.rename(columns=rename_map)
+
+                        merged_df = merged_df.reindex(columns=new_column_order)
+
+                        if weather:
+                            table = weather_tables.get(charger_cells[cp_id])
+                            if table is None:
+                                table = pd.DataFrame(columns=self.weather_service.store.VARIABLES, dtype=float)
+                            merged_df = join_weather(merged_df, table)
+                    stage.rows = len(merged_df)
+
+                with profile('write', authority) as stage:
+                    if sparse:
+                        output = writer.write(merged_df, cp_id, connector,
+                                              start=complete_time_series[0].isoformat(),
+                                              end=complete_time_series[-1].isoformat(),
+                                              granularity=granularity, region_id=region_id, carbon_region=carbon_region)
+                        carbon_times = aligned_carbon[granularity][0]['timestamp']
+                        covered = carbon_times[(carbon_times >= complete_time_series[0].tz_localize('UTC')) &
+                                               (carbon_times <= complete_time_series[-1].tz_localize('UTC'))]
+                        carbon_range = (covered.min(), covered.max()) if len(covered) else (None, None)
+                    else:
+                        output = writer.write(merged_df, cp_id, connector)
+                        carbon_range = (merged_df['Timestamp'].min(), merged_df['Timestamp'].max()) if len(merged_df) \
+                            else (None, None)
+                    stage.rows = len(merged_df)
+                    if manifest is not None:
+                        manifest.record(key, fingerprints[granularity][key],
+                                        (complete_time_series[0], complete_time_series[-1]),
+                                        carbon_range, output, commit=writer.incremental)
+
+        return len(session_df)
+
+    def _expand_group_reference(self, group, granularity):
+        """Expand one charger's sessions row by row with the original interval functions."""
+        charging_time_series_all = []
+        energy_series_all = []
+
+        occupied_time_series_all = []
+        occupied_series_all = []
+
+        for index, row in group.iterrows():
+            cp_id = row['CP ID']
+            connector = row['Connector']
+            start_time = row['Start']
+            max_charge_rate = row['Nominal Power (kW)']
+            total_consumed = row['Consumed(kWh)']
+            charging_duration = row['Duration']
+
+            real_charging_duration = total_consumed / max_charge_rate  # in hours
+
+            rounded_start, rounded_end, rounded_stay = self.calculate_time_intervals(start_time,
+                                                                                        charging_duration,
+                                                                                        real_charging_duration,
+                                                                                        granularity)
+
+            # Calculate number of real charging intervals (n minutes each)
+            num_charging_intervals = int((rounded_end - rounded_start) / timedelta(minutes=granularity))
+            charging_time_series, energy_series = self.get_time_energy(start_time,
+                                                                        num_charging_intervals,
+                                                                        granularity,
+                                                                        max_charge_rate,
+                                                                        total_consumed)
+
+            difference = round(np.sum(energy_series), 2) - round(total_consumed, 2)
+            assert difference < 0.1, f'Energy mismatch of {difference} for {cp_id}_{connector} at {start_time}'
+
+            # Calculate number of charging intervals with overstay(n minutes each)
+            try:
+                num_stay_intervals = int((rounded_stay - rounded_start) / timedelta(minutes=granularity))
+            except:
+                logger.warning('Issue stay period %s_%s at %s', cp_id, connector, start_time)
+                continue
+
+            occupied_time_series, occupied_series = self.get_time_occupied(start_time, num_stay_intervals,
+                                                                            granularity)
+
+            # save both
+            charging_time_series_all.extend(charging_time_series)
+            energy_series_all.extend(energy_series)
+
+            occupied_time_series_all.extend(occupied_time_series)
+            occupied_series_all.extend(occupied_series)
+
+        return charging_time_series_all, energy_series_all, occupied_time_series_all, occupied_series_all
 
     def process_session_data(self, timestamp, column, column_name, complete_data):
         return process_session_data(timestamp, column, column_name, complete_data)
@@ -347,60 +874,20 @@ class ChargePlaceScotlandAPI:
         pass
 
     def _create_gdf_instance(self, df, epsg=4326):
+        import geopandas as gpd
+
         df['Latitude'] = df['Latitude'].astype(float)
         df['Longitude'] = df['Longitude'].astype(float)
 
-        df['geometry'] = [Point(x, y) for x, y in zip(df['Longitude'], df['Latitude'])]
+        geometry = gpd.points_from_xy(df['Longitude'], df['Latitude'])
 
-        gdf = gpd.GeoDataFrame(df, geometry=df['geometry'])
+        gdf = gpd.GeoDataFrame(df, geometry=geometry)
         # set_crs returns None when inplace=True, so call without assignment
         gdf.set_crs(epsg=epsg, inplace=True)
         return gdf
 
     def _parse_features_json_to_df(self, location):
-
-        with open(location) as f:
-            json_data = json.load(f)
-
-        rows = []
-
-        for feature in json_data['features']:
-            latitude, longitude = feature['geometry']['coordinates']
-            for group in feature['properties']['connectorGroups']:
-                group_id = group['connectorGroupID']
-                for connector in group['connectors']:
-                    row = {
-                    'Latitude': latitude,
-                    'Longitude': longitude,
-                    'CP ID': feature['properties']['name'],
-                    'Connector': group_id,
-                    'Tariff': feature['properties']['tariff']['amount'],
-                    'Connection Fee': feature['properties']['tariff']['connectionfee'],
-                    'Address': feature['properties']['address']['sitename'],
-                    'Postcode': feature['properties']['address']['postcode'],
-                    'Connector Type': connector['connectorPlugTypeName'],
-                    'Nominal Power (kW)': connector['connectorMaxChargeRate']
-                    }
-                    rows.append(row)
-
-        dataset = pd.DataFrame(rows)
-
-        # Normalize types: keep id/name as str, numeric where appropriate
-        if not dataset.empty:
-            dataset['Latitude'] = pd.to_numeric(dataset['Latitude'], errors='coerce')
-            dataset['Longitude'] = pd.to_numeric(dataset['Longitude'], errors='coerce')
-            # Ensure is numeric (max charge rate)
-            dataset['Nominal Power (kW)'] = pd.to_numeric(dataset['Nominal Power (kW)'], downcast='float', errors='coerce')
-            dataset['Tariff'] = pd.to_numeric(dataset['Tariff'], downcast='float', errors='coerce')
-            dataset['Connection Fee'] = pd.to_numeric(dataset['Connection Fee'], downcast='float', errors='coerce')
-            # Ensure is string (id/name/postcode)
-            dataset['Connector'] = dataset['Connector'].astype(str)
-            dataset['Connector Type'] = dataset['Connector Type'].astype(str)
-            dataset['CP ID'] = dataset['CP ID'].astype(str)
-            dataset['Postcode'] = dataset['Postcode'].astype(str)
-            dataset['Address'] = dataset['Address'].astype(str)
-
-        return dataset
+        return parse_features(location)
 
     def between(self, start, end, type="national", region_id=None):
         """
@@ -500,6 +987,8 @@ class ChargePlaceScotlandAPI:
 
     def _fetch_url(self, url):
         """Fetch the URL with GET request."""
+        import requests
+
         success = False
         try_counter = 0
         delay = 1
@@ -0,0 +1,90 @@
+import hashlib
+import json
+import pandas as pd
+
+try:
+    import ijson
+except ImportError:  # pragma: no cover - streaming is an optimisation, json.load works too
+    ijson = None
+
+FEATURE_COLUMNS = ['Latitude', 'Longitude', 'CP ID', 'Connector', 'Tariff', 'Connection Fee', 'Address',
+                   'Postcode', 'Connector Type', 'Nominal Power (kW)']
+
+
+def file_hash(path, block_size=1 << 20):
+    """SHA-256 of a file's contents, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def iter_features(path):
+    """Yield the features of a GeoJSON-like collection one at a time.
+
+    Streams the file with ijson when it is installed instead of loading the whole document.
+    """
+    with open(path, 'rb') as f:
+        if ijson is not None:
+            yield from ijson.items(f, 'features.item', use_float=True)
+        else:
+            yield from json.load(f)['features']
+
+
+def parse_features(path):
+    """Parse the static charge point feature collection into one row per connector.
+
+    Values are appended straight into per-column lists, so no per-row dict is built.
+    """
+    columns = {name: [] for name in FEATURE_COLUMNS}
+    append = {name: values.append for name, values in columns.items()}
+
+    for feature in iter_features(path):
+        latitude, longitude = feature['geometry']['coordinates']
+        properties = feature['properties']
+        tariff = properties['tariff']
+        address = properties['address']
+        for group in properties['connectorGroups']:
+            group_id = group['connectorGroupID']
+            for connector in group['connectors']:
+                append['Latitude'](latitude)
+                append['Longitude'](longitude)
+                append['CP ID'](properties['name'])
+                append['Connector'](group_id)
+                append['Tariff'](tariff['amount'])
+                append['Connection Fee'](tariff['connectionfee'])
+                append['Address'](address['sitename'])
+                append['Postcode'](address['postcode'])
+                append['Connector Type'](connector['connectorPlugTypeName'])
+                append['Nominal Power (kW)'](connector['connectorMaxChargeRate'])
+
+    dataset = pd.DataFrame(columns, columns=FEATURE_COLUMNS) if columns['CP ID'] else pd.DataFrame()
+
+    # Normalize types: keep id/name as str, numeric where appropriate
+    if not dataset.empty:
+        dataset['Latitude'] = pd.to_numeric(dataset['Latitude'], errors='coerce')
+        dataset['Longitude'] = pd.to_numeric(dataset['Longitude'], errors='coerce')
+        # Ensure is numeric (max charge rate)
+        dataset['Nominal Power (kW)'] = pd.to_numeric(dataset['Nominal Power (kW)'], downcast='float', errors='coerce')
+        dataset['Tariff'] = pd.to_numeric(dataset['Tariff'], downcast='float', errors='coerce')
+        dataset['Connection Fee'] = pd.to_numeric(dataset['Connection Fee'], downcast='float', errors='coerce')
+        # Ensure is string (id/name/postcode)
+        for column in ['Connector', 'Connector Type', 'CP ID', 'Postcode', 'Address']:
+            dataset[column] = dataset[column].astype(str)
+
+    return dataset
+
+
+def load_features(path, cache_dir=None):
+    """Return the parsed feature table, using a snapshot in `cache_dir` keyed by the source file hash.
+
+    The first start-up after the source changes parses the JSON and stores the table in the
+    `InputCache`; later start-ups map the snapshot instead. Without a `cache_dir` the JSON
+    is always parsed.
+    """
+    if not cache_dir:
+        return parse_features(path)
+    from src.chargeplace.input_cache import InputCache
+
+    return InputCache(cache_dir).frame('features', [path], lambda: parse_features(path))
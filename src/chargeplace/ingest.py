@@ -0,0 +1,92 @@
+import logging
+import os
+import time
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+logger = logging.getLogger(__name__)
+
+SESSION_COLUMNS = ['Start', 'Duration', 'Consumed(kWh)', 'Paid(gbp)', 'CP ID', 'Connector']
+
+# format written by data/scraper.py; anything else falls back to pandas' parser
+START_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+EMPTY_DTYPES = {'Start': np.int64, 'Duration': np.int64, 'Consumed(kWh)': np.float32, 'Paid(gbp)': np.float32}
+
+IngestStats = namedtuple('IngestStats', ['rows', 'chunks', 'bytes', 'seconds'])
+
+
+def _parse_start(values):
+    parsed = pd.to_datetime(values, format=START_FORMAT, errors='coerce')
+    retry = parsed.isna() & values.notna()
+    if retry.any():
+        parsed[retry] = pd.to_datetime(values[retry], errors='coerce')
+    return parsed.values.astype('datetime64[ns]').view(np.int64)
+
+
+def parse_chunk(chunk):
+    """Convert one chunk of raw strings into compact typed columns."""
+    connector = pd.to_numeric(chunk['Connector'], errors='coerce')
+    connector = connector.where(connector == np.floor(connector))
+    return {
+        'Start': _parse_start(chunk['Start']),
+        'Duration': pd.to_timedelta(chunk['Duration'], errors='coerce').values.astype('timedelta64[ns]').view(np.int64),
+        'Consumed(kWh)': pd.to_numeric(chunk['Consumed(kWh)'], errors='coerce').values.astype(np.float32),
+        'Paid(gbp)': pd.to_numeric(chunk['Paid(gbp)'], errors='coerce').values.astype(np.float32),
+        'CP ID': pd.Categorical(chunk['CP ID']),
+        'Connector': connector.astype('Int32'),
+    }
+
+
+def combine_parts(parts):
+    """Concatenate per-column lists of `parse_chunk` outputs into one session table.
+
+    The lists in `parts` are released column by column while the table is built.
+    """
+    columns = {}
+    for name in SESSION_COLUMNS:
+        values, parts[name] = parts[name], None
+        if name == 'CP ID':
+            columns[name] = union_categoricals(values, sort_categories=True) if values else pd.Categorical([])
+        elif name == 'Connector':
+            columns[name] = pd.concat(values, ignore_index=True) if values else pd.Series([], dtype='Int32')
+        else:
+            columns[name] = np.concatenate(values) if values else np.array([], dtype=EMPTY_DTYPES[name])
+    columns['Start'] = columns['Start'].view('datetime64[ns]')
+    columns['Duration'] = columns['Duration'].view('timedelta64[ns]')
+    return pd.DataFrame(columns, columns=SESSION_COLUMNS)
+
+
+def log_stats(stats, sessions):
+    logger.info('Loaded %d sessions in %.1fs (%d chunks, %.0f rows/s, %.1f MB/s, %.1f MB in memory)',
+                stats.rows, stats.seconds, stats.chunks, stats.rows / max(stats.seconds, 1e-9),
+                stats.bytes / 1e6 / max(stats.seconds, 1e-9), sessions.memory_usage(deep=True).sum() / 1e6)
+
+
+def read_sessions_csv(path, chunksize=250_000):
+    """Read all_sessions.csv chunk by chunk into a compact session table.
+
+    Only the raw strings of one chunk are alive at a time, so peak memory is the final table
+    plus one chunk regardless of file size. Timestamps and durations are kept as int64
+    nanosecond epochs (exposed as datetime64/timedelta64 without copying), measures as
+    float32, CP IDs as a categorical and connectors as nullable integers.
+
+    Returns (sessions, IngestStats).
+    """
+    started = time.perf_counter()
+    parts = {name: [] for name in SESSION_COLUMNS}
+    chunks = 0
+    for chunk in pd.read_csv(path, usecols=SESSION_COLUMNS, dtype=str, chunksize=chunksize):
+        for name, values in parse_chunk(chunk).items():
+            parts[name].append(values)
+        chunks += 1
+
+    sessions = combine_parts(parts)
+
+    stats = IngestStats(rows=len(sessions), chunks=chunks, bytes=os.path.getsize(path),
+                        seconds=time.perf_counter() - started)
+    log_stats(stats, sessions)
+    return sessions, stats
@@ -0,0 +1,238 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+from src.chargeplace.features import file_hash
+from src.chargeplace.ingest import IngestStats
+from src.chargeplace.shared_sessions import SPEC_FILE, export_sessions, load_sessions
+
+logger = logging.getLogger(__name__)
+
+HASHES_FILE = 'source_hashes.json'
+# held with a shared lock by every run that maps a session snapshot, see `InputCache._hold`
+LOCK_FILE = '.lock'
+
+
+def shapefile_sources(path):
+    """The files a shapefile is read from: `path` and its sidecars (.dbf, .shx, .prj, ...)."""
+    stem, _ = os.path.splitext(path)
+    directory = os.path.dirname(path) or '.'
+    prefix = os.path.basename(stem) + '.'
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                  if name.startswith(prefix) and name.count('.') == prefix.count('.'))
+
+
+class InputCache:
+    """Snapshots of the parsed pipeline inputs that later start-ups map instead of parsing.
+
+    Every entry is keyed by the SHA-256 of its source files (and the settings it was built
+    with), so a changed source simply misses the cache and older entries of the same input
+    are removed when the new one is written. Entries are never rewritten in place, and a
+    session snapshot is only removed once no running job holds its lock (on systems without
+    `fcntl` older session snapshots are kept). Tables are stored uncompressed so they can be
+    memory-mapped: the session table as one .npy file per column (the layout the process
+    backend hands to its workers) and other frames as Arrow IPC (Feather) files, with
+    geometries through geopandas' Feather support.
+
+    Source hashes are remembered with the file size and modification time, so a warm start
+    does not read the sources at all.
+
+    Parameters
+    ----------
+    `directory` : str
+        Directory holding the snapshots and `source_hashes.json`.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._hashes_path = os.path.join(directory, HASHES_FILE)
+        try:
+            with open(self._hashes_path, encoding='utf-8') as f:
+                self._hashes = json.load(f)
+        except (OSError, ValueError):
+            self._hashes = {}
+        # open lock files of the session snapshots this run maps; closing them releases the locks
+        self._held = {}
+
+    def source_hash(self, path):
+        """SHA-256 of a source file (or of every file below a source directory)."""
+        if os.path.isdir(path):
+            digest = hashlib.sha256()
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    file_path = os.path.join(root, name)
+                    digest.update(os.path.relpath(file_path, path).encode())
+                    digest.update(self.source_hash(file_path).encode())
+            return digest.hexdigest()
+
+        stat = os.stat(path)
+        known = self._hashes.get(os.path.abspath(path))
+        if known and known['size'] == stat.st_size and known['mtime_ns'] == stat.st_mtime_ns:
+            return known['sha256']
+        sha256 = file_hash(path)
+        self._hashes[os.path.abspath(path)] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': sha256}
+        self._write_hashes()
+        return sha256
+
+    def _write_hashes(self):
+        tmp_path = f'{self._hashes_path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._hashes, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self._hashes_path)
+
+    def key(self, name, sources, *settings):
+        """Entry name for input `name` built from the files in `sources` with `settings`."""
+        digest = hashlib.sha256(repr(settings).encode())
+        for source in sources:
+            digest.update(self.source_hash(source).encode())
+        return f'{name}-{digest.hexdigest()[:24]}'
+
+    def path(self, key, extension=''):
+        return os.path.join(self.directory, key + extension)
+
+    def _replace(self, key, tmp_path, extension=''):
+        """Move a finished snapshot into place and drop the older entries of the same input."""
+        path = self.path(key, extension)
+        try:
+            os.replace(tmp_path, path)
+        except OSError:
+            if not os.path.isdir(path):
+                raise
+            # a directory written concurrently by another run from the same sources, which may
+            # already map it; keep that one
+            shutil.rmtree(tmp_path, ignore_errors=True)
+        name = key.rsplit('-', 1)[0]
+        for entry in os.listdir(self.directory):
+            if entry.rsplit('-', 1)[0] != name or entry == os.path.basename(path) or entry.endswith('.tmp'):
+                continue
+            stale = os.path.join(self.directory, entry)
+            if os.path.isdir(stale):
+                self._remove_unused(stale)
+            else:
+                try:
+                    # a mapped file stays readable through its open handle
+                    os.remove(stale)
+                except OSError:
+                    pass
+        return path
+
+    def _hold(self, path):
+        """Take a shared lock on the session snapshot `path` for the lifetime of this cache.
+
+        Returns False if the snapshot was removed before the lock was taken.
+        """
+        if fcntl is None or path in self._held:
+            return os.path.exists(os.path.join(path, SPEC_FILE))
+        try:
+            lock = open(os.path.join(path, LOCK_FILE), 'a')
+        except OSError:
+            return False
+        fcntl.flock(lock, fcntl.LOCK_SH)
+        if not os.path.exists(os.path.join(path, SPEC_FILE)):
+            # removed by another run while we waited for the lock
+            lock.close()
+            return False
+        self._held[path] = lock
+        return True
+
+    def _remove_unused(self, path):
+        """Remove the session snapshot `path` unless a running job holds its lock."""
+        if fcntl is None:
+            return
+        try:
+            lock = open(os.path.join(path, LOCK_FILE), 'a')
+        except OSError:
+            return
+        with lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                logger.info('Keeping %s, which another run is using', path)
+                return
+            # the spec goes first so that a run waiting for the lock sees the snapshot as gone
+            try:
+                os.remove(os.path.join(path, SPEC_FILE))
+            except OSError:
+                pass
+            shutil.rmtree(path, ignore_errors=True)
+
+    def load_frame(self, key, geo=False):
+        """Map the frame stored under `key`, or return None if there is none."""
+        path = self.path(key, '.arrow')
+        if not os.path.exists(path):
+            return None
+        if geo:
+            import geopandas as gpd
+
+            frame = gpd.read_feather(path, memory_map=True)
+        else:
+            import pyarrow.feather as feather
+
+            frame = feather.read_table(path, memory_map=True).to_pandas()
+        logger.info('Loaded %s from the input cache', key)
+        return frame
+
+    def save_frame(self, key, frame, geo=False):
+        tmp_path = self.path(key, f'.arrow.{os.getpid()}.tmp')
+        if geo:
+            frame.to_feather(tmp_path, compression='uncompressed')
+        else:
+            import pyarrow.feather as feather
+
+            feather.write_feather(frame.reset_index(drop=True), tmp_path, compression='uncompressed')
+        logger.info('Wrote %s to the input cache', key)
+        return self._replace(key, tmp_path, '.arrow')
+
+    def frame(self, name, sources, build, geo=False):
+        """Return input `name` from its snapshot, or build it with `build()` and store the snapshot."""
+        key = self.key(name, sources)
+        frame = self.load_frame(key, geo)
+        if frame is None:
+            frame = build()
+            self.save_frame(key, frame, geo)
+        return frame
+
+    def sessions_path(self, key):
+        """Directory of the session snapshot `key` if it exists (usable by `load_sessions`), else None."""
+        path = self.path(key)
+        return path if os.path.exists(os.path.join(path, SPEC_FILE)) else None
+
+    def load_sessions(self, key):
+        """Map the session table stored under `key`; returns (sessions, IngestStats) or None."""
+        path = self.sessions_path(key)
+        if path is None or not self._hold(path):
+            return None
+        started = time.perf_counter()
+        sessions = load_sessions(path)
+        size = sum(entry.stat().st_size for entry in os.scandir(path))
+        logger.info('Mapped %d sessions from the input cache %s', len(sessions), path)
+        return sessions, IngestStats(rows=len(sessions), chunks=0, bytes=size, seconds=time.perf_counter() - started)
+
+    def save_sessions(self, key, sessions):
+        """Store a session table in store order (see `SessionStore`) under `key`."""
+        tmp_path = self.path(key, f'.{os.getpid()}.tmp')
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        export_sessions(sessions, tmp_path)
+        # locked before it is moved into place, so no other run can remove it while this one maps it
+        self._hold(tmp_path)
+        logger.info('Wrote %d sessions to the input cache', len(sessions))
+        path = self._replace(key, tmp_path)
+        lock = self._held.pop(tmp_path, None)
+        if lock is not None:
+            if os.fstat(lock.fileno()).st_ino == os.stat(os.path.join(path, LOCK_FILE)).st_ino:
+                self._held[path] = lock
+            else:
+                # another run moved the same snapshot into place first; ours was discarded
+                lock.close()
+                self._hold(path)
+        return path
@@ -0,0 +1,102 @@
+import hashlib
+import json
+import os
+import pandas as pd
+
+
+MANIFEST_FILE = 'manifest.jsonl'
+
+FINGERPRINT_COLUMNS = ['Start', 'Duration', 'Consumed(kWh)', 'Nominal Power (kW)', 'Postcode', 'Region ID']
+
+
+def session_fingerprint(group, *settings):
+    """Hash a connector's sessions (and the settings its output depends on) into a hex digest."""
+    digest = hashlib.sha1(repr(settings).encode())
+    columns = [c for c in FINGERPRINT_COLUMNS if c in group.columns]
+    digest.update(pd.util.hash_pandas_object(group[columns], index=False).values.tobytes())
+    return digest.hexdigest()
+
+
+class Manifest:
+    """Record of the connector outputs generated for one local authority.
+
+    Stored as ``<base_dir>/<local_auth>/manifest<suffix>.jsonl`` (the suffix of the output
+    resolution, see `resolution_suffix`), one JSON entry per line keyed by
+    '<CP ID>_<Connector>' with the session fingerprint, the carbon range that was merged in
+    and the output path. Entries are appended as soon as an output is written, so a crashed
+    run resumes from the last finished connector; the last entry for a key wins.
+    """
+
+    def __init__(self, base_dir, local_auth, suffix=''):
+        name, extension = os.path.splitext(MANIFEST_FILE)
+        self.path = os.path.join(base_dir, local_auth, name + suffix + extension)
+        self.entries = {}
+        self._pending = []
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # torn last line from an interrupted run
+                        continue
+                    self.entries[entry['key']] = entry
+
+    @staticmethod
+    def key(cp_id, connector):
+        return f"{cp_id}_{connector}"
+
+    def is_current(self, key, fingerprint):
+        """True if `key` was generated from the same sessions, with full carbon data, and still exists."""
+        entry = self.entries.get(key)
+        if entry is None or entry['fingerprint'] != fingerprint:
+            return False
+        if entry['carbon_start'] is None or entry['carbon_start'] > entry['required_start'] \
+                or entry['carbon_end'] < entry['required_end']:
+            return False
+        return os.path.exists(entry['output'])
+
+    def record(self, key, fingerprint, required, carbon, output, commit=True):
+        """Add an entry; `required` and `carbon` are (start, end) timestamps, carbon may be (None, None).
+
+        With ``commit=False`` the entry is held back until `commit`, for writers whose output
+        only becomes valid once closed.
+        """
+        def iso(ts):
+            if ts is None or pd.isnull(ts):
+                return None
+            ts = pd.Timestamp(ts)
+            ts = ts.tz_localize('UTC') if ts.tzinfo is None else ts.tz_convert('UTC')
+            return ts.isoformat()
+
+        entry = {
+            'key': key,
+            'fingerprint': fingerprint,
+            'required_start': iso(required[0]),
+            'required_end': iso(required[1]),
+            'carbon_start': iso(carbon[0]),
+            'carbon_end': iso(carbon[1]),
+            'output': output,
+        }
+        self._pending.append(entry)
+        if commit:
+            self.commit()
+
+    def commit(self):
+        if not self._pending:
+            return
+        with open(self.path, 'a') as f:
+            for entry in self._pending:
+                f.write(json.dumps(entry) + '\n')
+                self.entries[entry['key']] = entry
+            f.flush()
+            os.fsync(f.fileno())
+        self._pending = []
+
+    def compact(self):
+        """Rewrite the manifest with only the latest entry per key."""
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            for entry in self.entries.values():
+                f.write(json.dumps(entry) + '\n')
+        os.replace(tmp_path, self.path)
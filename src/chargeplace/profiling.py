@@ -0,0 +1,164 @@
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+TOTALS = ('calls', 'wall', 'cpu', 'rows')
+
+
+def peak_rss_mb(children=False):
+    """Peak resident set size of this process (or its largest waited-for child) in MiB."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in KiB elsewhere
+    return round(peak / (1 << 20 if sys.platform == 'darwin' else 1 << 10), 1)
+
+
+class StageRecord:
+    """Handle yielded by `Profiler.stage`; set `rows` to the number of rows the stage processed."""
+
+    __slots__ = ('rows',)
+
+    def __init__(self):
+        self.rows = None
+
+
+class Profiler:
+    """Collects wall time, CPU time and row counts of named pipeline stages.
+
+    Stages may be entered from several threads at once. Each stage is aggregated over all
+    its calls, and stages entered with an `authority` are also aggregated per local
+    authority. A disabled profiler records nothing and costs only a context manager per stage.
+
+    Parameters
+    ----------
+    `enabled` : bool
+        Record stages; when False every call is a no-op.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.stages = {}
+        self.authorities = {}
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+        self._started_cpu = time.process_time()
+        self._worker_peak_rss_mb = None
+
+    @contextmanager
+    def stage(self, name, authority=None, process_cpu=False):
+        """Time the enclosed block as one call of stage `name`.
+
+        CPU time is that of the calling thread, or of the whole process with `process_cpu`
+        (for stages that fan work out to other threads).
+        """
+        record = StageRecord()
+        if not self.enabled:
+            yield record
+            return
+        cpu_clock = time.process_time if process_cpu else time.thread_time
+        wall_start, cpu_start = time.perf_counter(), cpu_clock()
+        try:
+            yield record
+        finally:
+            self._add(name, authority, dict(calls=1, wall=time.perf_counter() - wall_start,
+                                            cpu=cpu_clock() - cpu_start, rows=record.rows or 0))
+
+    def _add(self, name, authority, totals):
+        with self._lock:
+            self._merge_totals(self.stages.setdefault(name, {}), totals)
+            if authority is not None:
+                self._merge_totals(self.authorities.setdefault(authority, {}).setdefault(name, {}), totals)
+
+    @staticmethod
+    def _merge_totals(target, totals):
+        for field in TOTALS:
+            target[field] = target.get(field, 0) + totals.get(field, 0)
+
+    def drain(self):
+        """Return and clear the recorded stages, e.g. to ship them from a worker process."""
+        with self._lock:
+            records = {'stages': self.stages, 'authorities': self.authorities, 'peak_rss_mb': peak_rss_mb()}
+            self.stages, self.authorities = {}, {}
+        return records
+
+    def merge(self, records):
+        """Add the records `drain`ed from another profiler to this one."""
+        if not self.enabled or not records:
+            return
+        with self._lock:
+            if records.get('peak_rss_mb') is not None:
+                self._worker_peak_rss_mb = max(self._worker_peak_rss_mb or 0, records['peak_rss_mb'])
+            for name, totals in records['stages'].items():
+                self._merge_totals(self.stages.setdefault(name, {}), totals)
+            for authority, stages in records['authorities'].items():
+                for name, totals in stages.items():
+                    self._merge_totals(self.authorities.setdefault(authority, {}).setdefault(name, {}), totals)
+
+    def report(self):
+        """Return the collected metrics as a JSON-serialisable dict."""
+        with self._lock:
+            stages = {name: dict(totals) for name, totals in self.stages.items()}
+            authorities = {}
+            for authority, authority_stages in self.authorities.items():
+                total = authority_stages.get('authority', {})
+                wall = total.get('wall', 0)
+                authorities[authority] = {
+                    'wall': round(wall, 4),
+                    'cpu': round(total.get('cpu', 0), 4),
+                    'sessions': total.get('rows', 0),
+                    'sessions_per_second': round(total.get('rows', 0) / wall, 1) if wall else None,
+                    'stages': {name: {field: round(value, 4) for field, value in totals.items()}
+                               for name, totals in authority_stages.items()},
+                }
+        for totals in stages.values():
+            for field in ('wall', 'cpu'):
+                totals[field] = round(totals[field], 4)
+        return {
+            'created': datetime.now(timezone.utc).isoformat(),
+            'pid': os.getpid(),
+            'wall': round(time.perf_counter() - self._started, 4),
+            'cpu': round(time.process_time() - self._started_cpu, 4),
+            'peak_rss_mb': peak_rss_mb(),
+            'peak_rss_children_mb': peak_rss_mb(children=True),
+            'peak_rss_worker_mb': self._worker_peak_rss_mb,
+            'stages': stages,
+            'authorities': authorities,
+        }
+
+    def summary(self, report=None):
+        """Human readable table of the report (stages, then the slowest authorities)."""
+        report = report or self.report()
+        lines = [f"Run: {report['wall']:.1f}s wall, {report['cpu']:.1f}s CPU, peak RSS {report['peak_rss_mb']} MiB",
+                 f"{'stage':<36}{'calls':>8}{'wall s':>11}{'cpu s':>11}{'rows':>12}"]
+        for name, totals in sorted(report['stages'].items(), key=lambda item: -item[1]['wall']):
+            lines.append(f"{name:<36}{totals['calls']:>8}{totals['wall']:>11.2f}{totals['cpu']:>11.2f}"
+                         f"{totals['rows']:>12}")
+        if report['authorities']:
+            lines.append(f"{'authority':<36}{'sessions':>10}{'wall s':>11}{'sessions/s':>13}")
+            for authority, totals in sorted(report['authorities'].items(), key=lambda item: -item[1]['wall']):
+                rate = totals['sessions_per_second']
+                lines.append(f"{authority:<36}{totals['sessions']:>10}{totals['wall']:>11.2f}"
+                             f"{rate if rate is not None else '-':>13}")
+        return '\n'.join(lines)
+
+    def write_report(self, path):
+        """Write the JSON report to `path`, log the summary and return the report."""
+        report = self.report()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+        logger.info('Profile written to %s\n%s', path, self.summary(report))
+        return report
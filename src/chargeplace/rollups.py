@@ -0,0 +1,105 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+
+ROLLUP_COLUMNS = ['Timestamp', 'Local Authority', 'Region ID', 'Consumed', 'Occupied Connectors']
+
+
+def _epoch_ns(timestamps):
+    return np.asarray(pd.to_datetime(timestamps), dtype='datetime64[ns]').view(np.int64)
+
+
+class RollupAccumulator:
+    """Accumulates one local authority's load per interval while its connectors are expanded.
+
+    Every connector adds its expanded energy and occupancy intervals together with the carbon
+    region its output was merged with; `frame` then sums the energy and counts the connectors
+    occupied in each interval, per carbon region. Only the interval arrays are kept, never the
+    per-connector output frames.
+
+    Parameters
+    ----------
+    `local_auth` : str
+        Name of the local authority.
+    """
+
+    def __init__(self, local_auth):
+        self.local_auth = local_auth
+        # {carbon region: ([energy times], [energy], [occupied times])}
+        self._regions = {}
+
+    def add(self, energy_timestamps, energy, occupied_timestamps, occupied, region_id=None):
+        """Add the expanded intervals of one connector in carbon region `region_id`."""
+        energy_times, energy_values, occupied_times = self._regions.setdefault(region_id, ([], [], []))
+        energy_times.append(_epoch_ns(energy_timestamps))
+        energy_values.append(np.asarray(energy, dtype=np.float64))
+        occupied = _epoch_ns(occupied_timestamps)[np.asarray(occupied) > 0]
+        # overlapping sessions of the same connector still occupy a single connector
+        occupied_times.append(np.unique(occupied))
+
+    def frame(self, granularity=30):
+        """Return the rollup on a complete `granularity` minute UTC grid (inactive intervals are zero),
+        one row per interval and carbon region of the authority."""
+        totals = {}
+        for region_id, (energy_times, energy, occupied_times) in self._regions.items():
+            energy_times = np.concatenate(energy_times)
+            occupied_times = np.concatenate(occupied_times)
+            if not len(energy_times) and not len(occupied_times):
+                continue
+            consumed = pd.Series(np.concatenate(energy)).groupby(energy_times).sum()
+            times, counts = np.unique(occupied_times, return_counts=True)
+            totals[region_id] = (consumed, pd.Series(counts, index=times))
+        if not totals:
+            return pd.DataFrame(columns=ROLLUP_COLUMNS)
+
+        # one grid for the whole authority
+        bounds = [bound for consumed, occupied in totals.values() for series in (consumed, occupied)
+                  if len(series) for bound in (series.index.min(), series.index.max())]
+        grid = np.arange(int(min(bounds)), int(max(bounds)) + 1, granularity * 60 * 10 ** 9, dtype=np.int64)
+        timestamps = pd.DatetimeIndex(grid.view('datetime64[ns]')).tz_localize('UTC')
+
+        frames = []
+        for region_id in sorted(totals, key=str):
+            consumed, occupied = totals[region_id]
+            frames.append(pd.DataFrame({
+                'Timestamp': timestamps,
+                'Local Authority': self.local_auth,
+                'Region ID': region_id,
+                'Consumed': consumed.reindex(grid, fill_value=0).to_numpy(),
+                'Occupied Connectors': occupied.reindex(grid, fill_value=0).to_numpy(),
+            }, columns=ROLLUP_COLUMNS))
+        return pd.concat(frames, ignore_index=True)
+
+
+def region_rollups(authority_rollups):
+    """Sum authority rollups into one rollup per carbon region."""
+    frames = [frame for frame in authority_rollups if frame is not None and len(frame)]
+    if not frames:
+        return pd.DataFrame(columns=['Timestamp', 'Region ID', 'Consumed', 'Occupied Connectors'])
+    combined = pd.concat(frames, ignore_index=True)
+    combined['Region ID'] = combined['Region ID'].astype(str)
+    return (combined.groupby(['Region ID', 'Timestamp'], sort=True)[['Consumed', 'Occupied Connectors']]
+            .sum().reset_index()[['Timestamp', 'Region ID', 'Consumed', 'Occupied Connectors']])
+
+
+def write_rollups(base_dir, authority_rollups, output_format='csv', suffix=''):
+    """Write authority_rollups and region_rollups next to the authority folders in `base_dir`.
+
+    `suffix` is appended to the file names (see `resolution_suffix`). Returns the paths of
+    the two files.
+    """
+    frames = [frame for frame in authority_rollups if frame is not None and len(frame)]
+    authorities = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=ROLLUP_COLUMNS)
+    regions = region_rollups(frames)
+
+    paths = []
+    for name, frame in (('authority_rollups', authorities), ('region_rollups', regions)):
+        path = os.path.join(base_dir, f'{name}{suffix}.{output_format}')
+        if output_format == 'parquet':
+            frame.astype({'Region ID': str}).to_parquet(path, index=False)
+        else:
+            frame.to_csv(path, index=False)
+        paths.append(path)
+    return paths
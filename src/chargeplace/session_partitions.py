@@ -0,0 +1,170 @@
+import json
+import logging
+import os
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from src.chargeplace.ingest import SESSION_COLUMNS, IngestStats, combine_parts, log_stats, parse_chunk, \
+    read_sessions_csv
+
+logger = logging.getLogger(__name__)
+
+CATALOG_FILE = 'catalog.json'
+DEFAULT_SESSIONS_DIR = 'data/source/sessions'
+
+
+def month_key(year, month):
+    return f'{int(year):04d}-{int(month):02d}'
+
+
+def _frame_parts(frame):
+    """Split a typed partition frame into the per-column arrays `combine_parts` expects."""
+    return {
+        'Start': frame['Start'].values.astype('datetime64[ns]').view(np.int64),
+        'Duration': frame['Duration'].values.astype('timedelta64[ns]').view(np.int64),
+        'Consumed(kWh)': frame['Consumed(kWh)'].values.astype(np.float32),
+        'Paid(gbp)': frame['Paid(gbp)'].values.astype(np.float32),
+        'CP ID': pd.Categorical(frame['CP ID']),
+        'Connector': frame['Connector'].astype('Int32').reset_index(drop=True),
+    }
+
+
+class SessionPartitions:
+    """Session table stored as one Parquet file per month plus a small JSON catalog.
+
+    Months are written independently: appending or replacing a month rewrites only its own
+    file and catalog entry. Files hold the typed columns of `read_sessions_csv` (datetime
+    starts, timedelta durations, float32 measures, categorical CP IDs, nullable connectors)
+    so loading does no parsing, and the catalog's per-month start range lets a date range
+    query skip months entirely.
+
+    Parameters
+    ----------
+    `directory` : str
+        Directory holding the month files and `catalog.json`.
+    """
+
+    def __init__(self, directory=DEFAULT_SESSIONS_DIR):
+        self.directory = directory
+        self.catalog = self._read_catalog()
+
+    def _read_catalog(self):
+        try:
+            with open(os.path.join(self.directory, CATALOG_FILE), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_catalog(self):
+        path = os.path.join(self.directory, CATALOG_FILE)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.catalog, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, path)
+
+    def months(self):
+        return sorted(self.catalog)
+
+    def is_current(self, year, month, source=None):
+        """True if the month is stored (and was built from `source`, when given) and its file exists."""
+        entry = self.catalog.get(month_key(year, month))
+        if entry is None or not os.path.exists(os.path.join(self.directory, entry['file'])):
+            return False
+        return source is None or entry.get('source') == source
+
+    def append(self, year, month, sessions, source=None):
+        """Store the sessions of one month, replacing that month if it was stored before.
+
+        `sessions` has the columns of all_sessions.csv, as text or already parsed. `source`
+        identifies what the month was built from (e.g. the hash of the downloaded report).
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        key = month_key(year, month)
+        typed = combine_parts({name: [values] for name, values in parse_chunk(sessions[SESSION_COLUMNS]).items()})
+
+        file_name = f'sessions-{key}.parquet'
+        path = os.path.join(self.directory, file_name)
+        # write under a temporary name so a concurrent reader never sees a partial file
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        typed.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+
+        start = typed['Start'].dropna()
+        self.catalog[key] = {
+            'file': file_name,
+            'rows': len(typed),
+            'bytes': os.path.getsize(path),
+            'start_min': start.min().isoformat() if len(start) else None,
+            'start_max': start.max().isoformat() if len(start) else None,
+            'source': source,
+            'written': datetime.now(timezone.utc).isoformat(),
+        }
+        self._write_catalog()
+        logger.info('Stored %d sessions for %s in %s', len(typed), key, path)
+        return path
+
+    def select(self, months=None, start=None, end=None):
+        """Keys of the stored months that are in `months` and may hold sessions in [start, end)."""
+        keys = self.months() if months is None else sorted(set(months) & set(self.catalog))
+        start = pd.Timestamp(start) if start is not None else None
+        end = pd.Timestamp(end) if end is not None else None
+        selected = []
+        for key in keys:
+            entry = self.catalog[key]
+            if entry['start_min'] is not None:
+                if start is not None and pd.Timestamp(entry['start_max']) < start:
+                    continue
+                if end is not None and pd.Timestamp(entry['start_min']) >= end:
+                    continue
+            selected.append(key)
+        return selected
+
+    def load(self, months=None, start=None, end=None):
+        """Load the sessions of the selected months (all by default) starting in [start, end).
+
+        `months` are 'YYYY-MM' keys. Returns (sessions, IngestStats) like `read_sessions_csv`.
+        """
+        started = time.perf_counter()
+        parts = {name: [] for name in SESSION_COLUMNS}
+        keys = self.select(months, start, end)
+        size = 0
+        for key in keys:
+            path = os.path.join(self.directory, self.catalog[key]['file'])
+            frame = pd.read_parquet(path, columns=SESSION_COLUMNS)
+            if start is not None:
+                frame = frame[frame['Start'] >= pd.Timestamp(start)]
+            if end is not None:
+                frame = frame[frame['Start'] < pd.Timestamp(end)]
+            for name, values in _frame_parts(frame).items():
+                parts[name].append(values)
+            size += os.path.getsize(path)
+
+        sessions = combine_parts(parts)
+        stats = IngestStats(rows=len(sessions), chunks=len(keys), bytes=size, seconds=time.perf_counter() - started)
+        log_stats(stats, sessions)
+        return sessions, stats
+
+
+def load_sessions_source(path, months=None, start=None, end=None):
+    """Load sessions from a partitioned store directory or from a single all_sessions.csv file.
+
+    `months`, `start` and `end` restrict what is loaded from a store; a CSV file is always
+    read whole and then filtered by date.
+    """
+    if os.path.isdir(path):
+        return SessionPartitions(path).load(months, start, end)
+    sessions, stats = read_sessions_csv(path)
+    if months is None and start is None and end is None:
+        return sessions, stats
+    keep = np.ones(len(sessions), dtype=bool)
+    if months is not None:
+        keep &= sessions['Start'].dt.strftime('%Y-%m').isin(set(months)).to_numpy()
+    if start is not None:
+        keep &= (sessions['Start'] >= pd.Timestamp(start)).to_numpy()
+    if end is not None:
+        keep &= (sessions['Start'] < pd.Timestamp(end)).to_numpy()
+    sessions = sessions[keep].reset_index(drop=True)
+    return sessions, stats._replace(rows=len(sessions))
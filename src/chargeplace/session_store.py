@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+
+
+KEY_COLUMNS = ['CP ID', 'Connector']
+
+
+def _string_categorical(values):
+    """Categorical of ``values.astype(str)``, converting only the distinct values to strings."""
+    categorical = pd.Categorical(values)
+    try:
+        return categorical.rename_categories([str(c) for c in categorical.categories])
+    except ValueError:
+        # distinct values with the same string form (e.g. 1 and '1')
+        return pd.Categorical(values.astype(str))
+
+
+class SessionStore:
+    """Read-only session table sorted by charger key with offset ranges per (CP ID, Connector).
+
+    Built once from the full session table. CP IDs and connectors are held as categorical
+    columns so each session carries integer codes instead of Python strings, and the sessions of a single
+    connector occupy one contiguous block, so `get` is an O(1) slice that does not copy.
+    The table is shared between threads and must not be modified in place.
+
+    Parameters
+    ----------
+    `sessions` : pandas DataFrame
+        Session table with at least 'CP ID' and 'Connector' columns.
+    `presorted` : bool
+        Skip the sort when `sessions` is already in store order (e.g. exported from a store).
+    """
+
+    def __init__(self, sessions, presorted=False):
+        sessions = sessions.assign(**{
+            'CP ID': _string_categorical(sessions['CP ID']),
+            'Connector': _string_categorical(sessions['Connector']),
+        })
+        if not presorted:
+            # stable sort keeps the original session order within each connector
+            order = np.lexsort((sessions['Connector'].cat.codes.to_numpy(), sessions['CP ID'].cat.codes.to_numpy()))
+            sessions = sessions.take(order)
+        self.sessions = sessions.reset_index(drop=True)
+
+        cp_codes = self.sessions['CP ID'].cat.codes.to_numpy()
+        connector_codes = self.sessions['Connector'].cat.codes.to_numpy()
+        if len(self.sessions):
+            changed = (cp_codes[1:] != cp_codes[:-1]) | (connector_codes[1:] != connector_codes[:-1])
+            starts = np.concatenate(([0], np.flatnonzero(changed) + 1))
+        else:
+            starts = np.array([], dtype=np.int64)
+        stops = np.append(starts[1:], len(self.sessions))
+        cp_ids = self.sessions['CP ID'].cat.categories
+        connectors = self.sessions['Connector'].cat.categories
+
+        # sessions with a missing key (code -1) can never be matched and get no offsets
+        self.offsets = {(cp_ids[cp_codes[start]], connectors[connector_codes[start]]): (int(start), int(stop))
+                        for start, stop in zip(starts, stops)
+                        if cp_codes[start] >= 0 and connector_codes[start] >= 0}
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def __contains__(self, key):
+        return key in self.offsets
+
+    def keys(self):
+        return self.offsets.keys()
+
+    def get(self, cp_id, connector):
+        """Return the sessions of one connector as a view on the store (empty if unknown)."""
+        start, stop = self.offsets.get((str(cp_id), str(connector)), (0, 0))
+        return self.sessions.iloc[start:stop]
+
+    def join(self, infrastructure):
+        """Attach infrastructure rows to their connectors' sessions.
+
+        Equivalent to an inner ``pd.merge`` of all sessions with `infrastructure` on
+        ('CP ID', 'Connector'), but only the matched sessions are touched. Rows come out
+        grouped by connector in store order, keeping session order within a connector.
+        """
+        infrastructure = infrastructure.reset_index(drop=True)
+        infra_keys = zip(infrastructure['CP ID'].astype(str), infrastructure['Connector'].astype(str))
+
+        infra_rows = {}
+        for row, key in enumerate(infra_keys):
+            if key in self.offsets:
+                infra_rows.setdefault(key, []).append(row)
+
+        session_positions = []
+        infra_positions = []
+        for key in sorted(infra_rows, key=self.offsets.get):
+            start, stop = self.offsets[key]
+            rows = infra_rows[key]
+            # every session is repeated once per matching infrastructure row, as in a merge
+            session_positions.append(np.repeat(np.arange(start, stop), len(rows)))
+            infra_positions.append(np.tile(rows, stop - start))
+
+        if session_positions:
+            session_positions = np.concatenate(session_positions)
+            infra_positions = np.concatenate(infra_positions)
+        else:
+            session_positions = infra_positions = np.array([], dtype=np.int64)
+
+        sessions = self.sessions.take(session_positions).reset_index(drop=True)
+        sessions['CP ID'] = sessions['CP ID'].astype(str)
+        sessions['Connector'] = sessions['Connector'].astype(str)
+        extra = infrastructure.drop(KEY_COLUMNS, axis=1).take(infra_positions).reset_index(drop=True)
+        return pd.concat([sessions, extra], axis=1)
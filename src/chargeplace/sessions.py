@@ -1,3 +1,4 @@
+from collections import namedtuple
 from datetime import timedelta
 import pandas as pd
 import pytz
@@ -86,3 +87,122 @@ def get_time_occupied(start_time, num_intervals, granularity):
         occupied_series.append(1)
 
     return time_series, occupied_series
+
+
+SessionIntervals = namedtuple('SessionIntervals', ['session', 'timestamp', 'value'])
+
+_NS_PER_MINUTE = 60 * 10 ** 9
+_NS_PER_HOUR = 60 * _NS_PER_MINUTE
+
+
+def floor_to_granularity(t_ns, granularity):
+    """Vectorized equivalent of ``t.replace(minute=(t.minute // g) * g, second=0, microsecond=0)``.
+
+    Operates on int64 nanosecond epochs so it can be applied to whole columns at once.
+    """
+    hour = t_ns - t_ns % _NS_PER_HOUR
+    minute = (t_ns - hour) // _NS_PER_MINUTE
+    return hour + (minute // granularity) * granularity * _NS_PER_MINUTE
+
+
+def _interval_positions(counts):
+    """Return (session index, interval number within session) for every expanded interval."""
+    counts = counts.astype(np.int64)
+    session = np.repeat(np.arange(len(counts), dtype=np.int64), counts)
+    first = np.cumsum(counts) - counts
+    step = np.arange(len(session), dtype=np.int64) - np.repeat(first, counts)
+    return session, step
+
+
+def expand_sessions(start, duration, consumed, max_charge_rate, granularity):
+    """Expand a whole table of sessions into per-interval energy and occupancy arrays at once.
+
+    Vectorized counterpart of calling ``calculate_time_intervals``, ``get_time_energy`` and
+    ``get_time_occupied`` for every session. The first interval only receives the partial
+    charge left after the session start and the last interval is corrected so that each
+    session's energy sums to its consumed kWh, as in the reference functions.
+
+    start : array-like of datetime64 (naive)
+    duration : array-like of timedelta64 (NaT sessions are skipped, like the reference loop)
+    consumed : array-like of float kWh
+    max_charge_rate : array-like of float kW
+    granularity : int minutes
+
+    Returns (energy, occupied), two ``SessionIntervals`` tuples of flat arrays ordered by
+    session and then by time. ``session`` holds the positional index of the source session,
+    ``timestamp`` is datetime64[ns] and ``value`` is kWh (energy) or 1 (occupied).
+    Sessions whose energy cannot be distributed (missing kWh, zero or missing power) are
+    skipped as well instead of aborting the whole batch.
+    """
+    start_dt = np.asarray(start, dtype='datetime64[ns]')
+    duration_td = np.asarray(duration, dtype='timedelta64[ns]')
+    consumed = np.asarray(consumed, dtype=np.float64)
+    max_charge_rate = np.asarray(max_charge_rate, dtype=np.float64)
+    g_ns = granularity * _NS_PER_MINUTE
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        real_charging_duration = consumed / max_charge_rate  # in hours
+    valid = ~np.isnat(start_dt) & ~np.isnat(duration_td) & np.isfinite(real_charging_duration)
+
+    start_ns = np.where(valid, start_dt.view(np.int64), 0)
+    duration_ns = np.where(valid, duration_td.view(np.int64), 0)
+    # timedelta(minutes=60) * hours is rounded to whole microseconds
+    charge_ns = np.rint(np.where(valid, real_charging_duration, 0) * 3.6e9).astype(np.int64) * 1000
+
+    rounded_start = floor_to_granularity(start_ns, granularity)
+    rounded_end = floor_to_granularity(start_ns + charge_ns, granularity) + g_ns
+    rounded_stay = floor_to_granularity(start_ns + duration_ns, granularity) + g_ns
+
+    num_charging = np.where(valid, ((rounded_end - rounded_start) / g_ns).astype(np.int64), 0).clip(min=0)
+    num_stay = np.where(valid, ((rounded_stay - rounded_start) / g_ns).astype(np.int64), 0).clip(min=0)
+
+    # energy
+    session, step = _interval_positions(num_charging)
+    times = floor_to_granularity(start_ns[session] + step * g_ns, granularity)
+    period_charged = max_charge_rate / (60 / granularity)
+    first_fraction = (g_ns - (start_ns - rounded_start)) / g_ns
+    energy = np.where(step == 0, (period_charged * first_fraction)[session], period_charged[session])
+
+    # correct final period of each session so the total matches exactly
+    has_intervals = num_charging > 0
+    last = np.cumsum(num_charging)[has_intervals] - 1
+    accumulated = np.bincount(session, weights=energy, minlength=len(num_charging))[has_intervals]
+    energy[last] -= accumulated - consumed[has_intervals]
+
+    energy_intervals = SessionIntervals(session, times.view('datetime64[ns]'), energy)
+
+    # occupancy
+    session, step = _interval_positions(num_stay)
+    times = floor_to_granularity(start_ns[session] + step * g_ns, granularity)
+    occupied_intervals = SessionIntervals(session, times.view('datetime64[ns]'), np.ones(len(session), dtype=np.int64))
+
+    return energy_intervals, occupied_intervals
+
+
+def slice_intervals(intervals, first_session, last_session):
+    """Return the (timestamp, value) arrays of ``intervals`` for sessions in [first_session, last_session)."""
+    lo, hi = np.searchsorted(intervals.session, [first_session, last_session])
+    return intervals.timestamp[lo:hi], intervals.value[lo:hi]
+
+
+def downsample_intervals(intervals, granularity, how='sum'):
+    """Aggregate ``intervals`` expanded at a finer granularity to `granularity` minutes.
+
+    Each session's intervals are grouped by the coarser interval they fall in and their
+    values summed (``how='sum'``, energy) or combined with max (``how='max'``, occupancy:
+    a coarse interval is occupied if any of its fine intervals is). `granularity` must be a
+    multiple of the source granularity that divides an hour, which makes the result equal to
+    expanding the sessions at `granularity` directly (up to float rounding of the energy).
+
+    Returns a ``SessionIntervals`` tuple, still ordered by session and then by time.
+    """
+    if not len(intervals.session):
+        return SessionIntervals(intervals.session, intervals.timestamp, intervals.value)
+    times = floor_to_granularity(intervals.timestamp.view(np.int64), granularity)
+    # intervals are ordered by session and time, so every (session, coarse interval) is one run
+    boundary = np.ones(len(times), dtype=bool)
+    boundary[1:] = (intervals.session[1:] != intervals.session[:-1]) | (times[1:] != times[:-1])
+    first = np.flatnonzero(boundary)
+    reduce = np.add if how == 'sum' else np.maximum
+    return SessionIntervals(intervals.session[first], times[first].view('datetime64[ns]'),
+                            reduce.reduceat(intervals.value, first))
@@ -0,0 +1,231 @@
+import heapq
+import logging
+import os
+import re
+import shutil
+from collections import namedtuple, defaultdict
+
+import numpy as np
+import pandas as pd
+
+from src.chargeplace.manifest import MANIFEST_FILE, Manifest
+from src.chargeplace.rollups import ROLLUP_COLUMNS, write_rollups
+from src.chargeplace.sparse import read_carbon_table, write_carbon_tables
+from src.chargeplace.writers import DEFAULT_GRANULARITY, SPARSE_FOLDER, SPARSE_INDEX, SPARSE_INDEX_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+SHARD_MODES = ('connector', 'authority')
+
+# Shard `index` (1-based) of `count`; `by` is one of SHARD_MODES
+Shard = namedtuple('Shard', ['index', 'count', 'by'])
+
+SHARD_NAME = re.compile(r'^shard-(\d+)-of-(\d+)$')
+ROLLUP_FILE = re.compile(r'^authority_rollups(_(\d+)min)?\.(csv|parquet)$')
+CARBON_TABLE_FILE = re.compile(r'^carbon_region_(.+)\.csv$')
+
+
+def parse_shard(text, by='connector'):
+    """Parse 'i/N' (1 <= i <= N) into a `Shard`."""
+    match = re.match(r'^\s*(\d+)\s*/\s*(\d+)\s*$', str(text))
+    if not match or not 1 <= int(match.group(1)) <= int(match.group(2)):
+        raise ValueError(f"shard must be 'i/N' with 1 <= i <= N, got {text!r}")
+    if by not in SHARD_MODES:
+        raise ValueError(f"shards are split by one of {SHARD_MODES}, got {by!r}")
+    return Shard(int(match.group(1)), int(match.group(2)), by)
+
+
+def shard_root(base_dir):
+    """Directory holding the shard outputs of `base_dir`; a sibling, so it is never taken for an authority."""
+    return os.path.normpath(base_dir) + '_shards'
+
+
+def shard_dir(base_dir, shard):
+    return os.path.join(shard_root(base_dir), f'shard-{shard.index}-of-{shard.count}')
+
+
+def connector_costs(sessions, granularity=DEFAULT_GRANULARITY):
+    """Estimated work per (CP ID, Connector): its sessions plus the intervals between its first and last session.
+
+    Expansion scales with the sessions, merging and writing with the intervals of the output.
+    """
+    ends = sessions['Start'] + sessions['Duration']
+    grouped = pd.DataFrame({'CP ID': sessions['CP ID'].astype(str), 'Connector': sessions['Connector'].astype(str),
+                            'Start': sessions['Start'], 'End': ends}) \
+        .groupby(['CP ID', 'Connector'], sort=False).agg({'Start': ['size', 'min'], 'End': 'max'})
+    span = (grouped[('End', 'max')] - grouped[('Start', 'min')]) / pd.Timedelta(minutes=granularity)
+    costs = grouped[('Start', 'size')] + np.ceil(span.clip(lower=0)).astype(np.int64) + 1
+    return dict(zip(costs.index, costs.to_numpy().tolist()))
+
+
+def assign_shards(costs, count):
+    """Assign every key of `costs` ({key: cost}) to one of `count` shards (1-based) with similar total cost.
+
+    Keys are taken from the most to the least costly and each goes to the currently lightest
+    shard. Ties are broken by key and shard number, so every node computes the same assignment.
+    """
+    loads = [(0, index) for index in range(1, count + 1)]
+    assignment = {}
+    for key in sorted(costs, key=lambda k: (-costs[k], str(k))):
+        load, index = heapq.heappop(loads)
+        assignment[key] = index
+        heapq.heappush(loads, (load + costs[key], index))
+    return assignment
+
+
+def find_shards(base_dir):
+    """Return [(Shard, path)] of the shard outputs of `base_dir` in shard order; every shard of one run must be present."""
+    root = shard_root(base_dir)
+    found = {}
+    for name in sorted(os.listdir(root)) if os.path.isdir(root) else []:
+        match = SHARD_NAME.match(name)
+        if match and os.path.isdir(os.path.join(root, name)):
+            found[int(match.group(1)), int(match.group(2))] = os.path.join(root, name)
+    counts = {count for _, count in found}
+    if not found:
+        raise ValueError(f"No shard outputs in {root}")
+    if len(counts) > 1:
+        raise ValueError(f"Shard outputs of runs with different shard counts {sorted(counts)} in {root}")
+    count = counts.pop()
+    missing = [index for index in range(1, count + 1) if (index, count) not in found]
+    if missing:
+        raise ValueError(f"Shards {missing} of {count} have no output in {root}")
+    return [(Shard(index, count, None), found[index, count]) for index in range(1, count + 1)]
+
+
+def _move_files(source, target):
+    os.makedirs(target, exist_ok=True)
+    for name in os.listdir(source):
+        os.replace(os.path.join(source, name), os.path.join(target, name))
+
+
+def _rebase(path, source_dir, base_dir):
+    """`path` below `source_dir` moved to the same place below `base_dir` (other paths unchanged)."""
+    if path is None or os.path.commonpath([os.path.abspath(path), os.path.abspath(source_dir)]) \
+            != os.path.abspath(source_dir):
+        return path
+    return os.path.join(base_dir, os.path.relpath(path, source_dir))
+
+
+def _read_rollup(path):
+    if path.endswith('.parquet'):
+        frame = pd.read_parquet(path)
+    else:
+        frame = pd.read_csv(path, dtype={'Region ID': str, 'Local Authority': str})
+    frame['Timestamp'] = pd.to_datetime(frame['Timestamp'], utc=True)
+    return frame
+
+
+def merge_rollups(frames, granularity=DEFAULT_GRANULARITY):
+    """Sum partial authority rollups (e.g. of disjoint connectors) into one rollup per authority.
+
+    Connectors of different shards are disjoint, so consumption and occupied connectors add
+    up; every authority is put back on a complete `granularity` minute grid.
+    """
+    frames = [frame for frame in frames if frame is not None and len(frame)]
+    if not frames:
+        return []
+    combined = pd.concat(frames, ignore_index=True)
+    combined['Region ID'] = combined['Region ID'].astype(str)
+    merged = []
+    for (local_auth, region_id), rows in combined.groupby(['Local Authority', 'Region ID'], sort=True):
+        totals = rows.groupby('Timestamp')[['Consumed', 'Occupied Connectors']].sum()
+        grid = pd.date_range(totals.index.min(), totals.index.max(), freq=pd.Timedelta(minutes=granularity))
+        totals = totals.reindex(grid, fill_value=0)
+        merged.append(pd.DataFrame({
+            'Timestamp': grid,
+            'Local Authority': local_auth,
+            'Region ID': region_id,
+            'Consumed': totals['Consumed'].to_numpy(),
+            'Occupied Connectors': totals['Occupied Connectors'].to_numpy(),
+        }, columns=ROLLUP_COLUMNS))
+    return merged
+
+
+def merge_shards(base_dir):
+    """Combine the outputs of all shards of `base_dir` (see `find_shards`) into the `base_dir` layout.
+
+    Connector files are moved into the authority folders, per-shard Parquet files become parts
+    of the authority datasets, and the manifests, sparse indexes, shared carbon tables and
+    rollups are merged with what `base_dir` already holds. The shard outputs are removed once
+    everything is merged. Returns the number of shards merged.
+    """
+    shards = find_shards(base_dir)
+    manifests = defaultdict(list)
+    datasets = defaultdict(list)
+    indexes = defaultdict(list)
+    rollups = defaultdict(list)
+
+    for shard, path in shards:
+        for name in sorted(os.listdir(path)):
+            source = os.path.join(path, name)
+            match = ROLLUP_FILE.match(name)
+            if match:
+                granularity = int(match.group(2)) if match.group(2) else DEFAULT_GRANULARITY
+                rollups[match.group(1) or '', match.group(3), granularity].append(_read_rollup(source))
+                continue
+            match = CARBON_TABLE_FILE.match(name)
+            if match:
+                region = match.group(1)
+                write_carbon_tables(base_dir, {region: read_carbon_table(path, region)})
+                continue
+            if not os.path.isdir(source):
+                # region rollups are recomputed from the merged authority rollups; profiles stay per shard
+                continue
+
+            local_auth = name
+            for entry in sorted(os.listdir(source)):
+                entry_path = os.path.join(source, entry)
+                target = os.path.join(base_dir, local_auth, entry)
+                stem, extension = os.path.splitext(MANIFEST_FILE)
+                if entry.startswith(stem) and entry.endswith(extension):
+                    manifests[local_auth, entry[len(stem):-len(extension)]].append(path)
+                elif entry.endswith('.parquet') and os.path.isdir(entry_path):
+                    datasets[local_auth, entry].append((shard.index, entry_path))
+                elif entry.startswith(SPARSE_FOLDER) and os.path.isdir(entry_path):
+                    index_path = os.path.join(entry_path, SPARSE_INDEX)
+                    if os.path.exists(index_path):
+                        indexes[local_auth, entry].append(pd.read_csv(index_path, dtype={'CP ID': str,
+                                                                                         'Connector': str}))
+                        os.remove(index_path)
+                    _move_files(entry_path, target)
+                elif os.path.isdir(entry_path):
+                    _move_files(entry_path, target)
+
+    for (local_auth, name), parts in datasets.items():
+        # Parquet datasets are rewritten as a whole (shards never skip connectors of non-incremental
+        # writers), so the parts of the shards replace the previous dataset
+        target = os.path.join(base_dir, local_auth, name)
+        shutil.rmtree(target, ignore_errors=True)
+        for index, dataset in parts:
+            for root, _, files in os.walk(dataset):
+                for file in files:
+                    directory = os.path.join(target, os.path.relpath(root, dataset))
+                    os.makedirs(directory, exist_ok=True)
+                    os.replace(os.path.join(root, file), os.path.join(directory, f'part-{index - 1}.parquet'))
+
+    for (local_auth, name), frames in indexes.items():
+        index_path = os.path.join(base_dir, local_auth, name, SPARSE_INDEX)
+        if os.path.exists(index_path):
+            frames = [pd.read_csv(index_path, dtype={'CP ID': str, 'Connector': str})] + frames
+        index = pd.concat(frames, ignore_index=True).drop_duplicates(['CP ID', 'Connector'], keep='last') \
+            .sort_values(['CP ID', 'Connector'])[SPARSE_INDEX_COLUMNS]
+        tmp_path = f'{index_path}.{os.getpid()}.tmp'
+        index.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, index_path)
+
+    for (local_auth, suffix), paths in manifests.items():
+        os.makedirs(os.path.join(base_dir, local_auth), exist_ok=True)
+        manifest = Manifest(base_dir, local_auth, suffix)
+        for path in paths:
+            for key, entry in Manifest(path, local_auth, suffix).entries.items():
+                manifest.entries[key] = dict(entry, output=_rebase(entry['output'], path, base_dir))
+        manifest.compact()
+
+    for (suffix, output_format, granularity), frames in rollups.items():
+        paths = write_rollups(base_dir, merge_rollups(frames, granularity), output_format, suffix)
+        logger.info('Merged rollups into %s', ', '.join(paths))
+
+    shutil.rmtree(shard_root(base_dir))
+    logger.info('Merged %d shards into %s', len(shards), base_dir)
+    return len(shards)
@@ -0,0 +1,55 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+
+
+SPEC_FILE = 'sessions.json'
+
+
+def export_sessions(sessions, directory):
+    """Write the session table column by column as .npy files that worker processes can memory-map.
+
+    String columns are factorized so that only fixed-width integer codes go to disk; their
+    categories are stored in the small JSON spec next to the arrays. Returns the directory,
+    which is all a worker needs to rebuild the table with `load_sessions`.
+    """
+    os.makedirs(directory, exist_ok=True)
+    spec = {'columns': []}
+    for name in sessions.columns:
+        column = sessions[name]
+        filename = f"{len(spec['columns'])}.npy"
+        entry = {'name': name, 'file': filename}
+        if pd.api.types.is_categorical_dtype(column.dtype):
+            values = column.cat.codes.to_numpy().astype(np.int32)
+            entry['categories'] = [str(c) for c in column.cat.categories]
+        elif pd.api.types.is_object_dtype(column.dtype) or pd.api.types.is_string_dtype(column.dtype):
+            codes, categories = pd.factorize(column)
+            values = codes.astype(np.int32)
+            entry['categories'] = [str(c) for c in categories]
+        else:
+            values = column.to_numpy()
+        np.save(os.path.join(directory, filename), values, allow_pickle=False)
+        spec['columns'].append(entry)
+
+    with open(os.path.join(directory, SPEC_FILE), 'w') as f:
+        json.dump(spec, f)
+    return directory
+
+
+def load_sessions(directory):
+    """Rebuild the session table exported by `export_sessions` from memory-mapped arrays.
+
+    String columns come back as categoricals over the exported codes.
+    """
+    with open(os.path.join(directory, SPEC_FILE)) as f:
+        spec = json.load(f)
+
+    data = {}
+    for entry in spec['columns']:
+        values = np.load(os.path.join(directory, entry['file']), mmap_mode='r', allow_pickle=False)
+        if 'categories' in entry:
+            # codes stay memory-mapped; -1 marks missing values as in pd.factorize
+            values = pd.Categorical.from_codes(values, categories=entry['categories'])
+        data[entry['name']] = values
+    return pd.DataFrame(data)
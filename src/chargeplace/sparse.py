@@ -0,0 +1,119 @@
+import os
+
+import pandas as pd
+
+from src.carbon.carbon_parser import align_carbon
+from src.chargeplace.writers import DEFAULT_GRANULARITY, SPARSE_FOLDER, SPARSE_INDEX, resolution_suffix
+
+FUEL_COLUMNS = ['biomass', 'coal', 'imports', 'gas', 'nuclear', 'other', 'hydro', 'solar', 'wind']
+
+CARBON_COLUMNS = ['Biomass', 'Coal', 'Gas', 'Nuclear', 'Hydro', 'Solar', 'Wind', 'Imports', 'Other', 'Forecast',
+                  'Carbon Index']
+
+DENSE_COLUMNS = ['Timestamp', 'Consumed', 'Occupied'] + CARBON_COLUMNS + ['Region ID']
+
+
+def carbon_table_path(base_dir, carbon_region):
+    return os.path.join(base_dir, f'carbon_region_{carbon_region}.csv')
+
+
+def carbon_table(carbon_data, gen_mix_data):
+    """Carbon intensity and generation mix in the column layout of the dense output."""
+    table = carbon_data.merge(gen_mix_data, on='timestamp')
+    table[FUEL_COLUMNS] = table[FUEL_COLUMNS] / 100
+    table = table.rename(columns={'timestamp': 'Timestamp', 'forecast': 'Forecast', 'index': 'Carbon Index',
+                                  **{fuel: fuel.capitalize() for fuel in FUEL_COLUMNS}})
+    return table[['Timestamp'] + CARBON_COLUMNS]
+
+
+def sparse_rows(session_data):
+    """Keep the rows of a connector's interval series with non-zero consumption or occupancy."""
+    session_data = session_data.rename(columns={'timestamp': 'Timestamp', 'consumed_total': 'Consumed',
+                                                'occupied': 'Occupied'})
+    active = (session_data['Consumed'] != 0) | (session_data['Occupied'] != 0)
+    return session_data.loc[active, ['Timestamp', 'Consumed', 'Occupied']]
+
+
+def read_carbon_table(base_dir, carbon_region):
+    path = carbon_table_path(base_dir, carbon_region)
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=['Timestamp'] + CARBON_COLUMNS)
+    table = pd.read_csv(path)
+    table['Timestamp'] = pd.to_datetime(table['Timestamp'], utc=True)
+    return table
+
+
+def write_carbon_tables(base_dir, tables):
+    """Merge the collected `tables` ({carbon region: rows}) into the shared per-region carbon tables.
+
+    Rows already in a table are kept unless the new rows cover the same timestamps.
+    """
+    paths = []
+    for carbon_region, table in tables.items():
+        existing = read_carbon_table(base_dir, carbon_region)
+        table = pd.concat([table, existing], ignore_index=True) if len(existing) else table
+        table = table.drop_duplicates('Timestamp').sort_values('Timestamp')
+        path = carbon_table_path(base_dir, carbon_region)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        table.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, path)
+        paths.append(path)
+    return paths
+
+
+def sparse_folder(base_dir, local_auth, granularity=DEFAULT_GRANULARITY):
+    return os.path.join(base_dir, local_auth, SPARSE_FOLDER + resolution_suffix(granularity))
+
+
+def read_index(base_dir, local_auth, granularity=DEFAULT_GRANULARITY):
+    """Index of the sparse connector files of a local authority at `granularity` minutes."""
+    return pd.read_csv(os.path.join(sparse_folder(base_dir, local_auth, granularity), SPARSE_INDEX),
+                       dtype={'CP ID': str, 'Connector': str})
+
+
+def expand_connector(sparse, entry, carbon):
+    """Expand one connector's sparse rows back to the dense per-connector schema.
+
+    `carbon` is the carbon table of the connector's region, already aligned to its granularity.
+    """
+    grid = pd.date_range(start=pd.Timestamp(entry['Start']), end=pd.Timestamp(entry['End']),
+                         freq=f"{int(entry['Granularity'])}min")
+    sparse = sparse.assign(Timestamp=pd.to_datetime(sparse['Timestamp'], utc=True))
+    dense = pd.DataFrame({'Timestamp': grid.tz_convert('UTC') if grid.tz else grid.tz_localize('UTC')})
+    dense = dense.merge(sparse, on='Timestamp', how='left')
+    dense[['Consumed', 'Occupied']] = dense[['Consumed', 'Occupied']].fillna(0).astype(float)
+    dense = dense.merge(carbon, on='Timestamp')
+    dense['Region ID'] = entry['Region ID']
+    return dense.reindex(columns=DENSE_COLUMNS)
+
+
+def load_connector(base_dir, local_auth, cp_id, connector, index=None, carbon_tables=None,
+                   granularity=DEFAULT_GRANULARITY):
+    """Load one connector of the sparse layout as the dense frame the csv layout would have written.
+
+    `index` and `carbon_tables` (a dict filled on use) avoid re-reading shared files when
+    loading many connectors.
+    """
+    index = read_index(base_dir, local_auth, granularity) if index is None else index
+    match = index[(index['CP ID'] == str(cp_id)) & (index['Connector'] == str(connector))]
+    if match.empty:
+        raise KeyError(f'{cp_id}_{connector} is not in the sparse index of {local_auth}')
+    entry = match.iloc[0]
+
+    carbon_tables = {} if carbon_tables is None else carbon_tables
+    # the shared tables are half-hourly; align them once per region and granularity
+    key = (entry['Carbon Region'], int(entry['Granularity']))
+    if key not in carbon_tables:
+        carbon_tables[key] = align_carbon(read_carbon_table(base_dir, key[0]), key[1], time_column='Timestamp')
+
+    sparse = pd.read_csv(os.path.join(sparse_folder(base_dir, local_auth, granularity), entry['File']))
+    return expand_connector(sparse, entry, carbon_tables[key])
+
+
+def iter_connectors(base_dir, local_auth, granularity=DEFAULT_GRANULARITY):
+    """Yield ((cp_id, connector), dense frame) for every connector of a local authority."""
+    index = read_index(base_dir, local_auth, granularity)
+    carbon_tables = {}
+    for cp_id, connector in zip(index['CP ID'], index['Connector']):
+        yield (cp_id, connector), load_connector(base_dir, local_auth, cp_id, connector, index, carbon_tables,
+                                                 granularity)
@@ -0,0 +1,197 @@
+import os
+import shutil
+import pandas as pd
+
+
+OUTPUT_FORMATS = ('csv', 'parquet')
+
+OUTPUT_LAYOUTS = ('dense', 'sparse')
+
+# resolution (minutes) whose outputs keep the plain names; others get a '_<granularity>min' suffix
+DEFAULT_GRANULARITY = 30
+
+SPARSE_FOLDER = 'sessions_sparse'
+SPARSE_INDEX = 'index.csv'
+SPARSE_INDEX_COLUMNS = ['CP ID', 'Connector', 'Start', 'End', 'Granularity', 'Region ID', 'Carbon Region', 'File']
+
+CARBON_INDEX_LEVELS = ['very low', 'low', 'moderate', 'high', 'very high']
+
+
+def resolution_suffix(granularity):
+    """Suffix of the output names of `granularity`, e.g. '' for 30 and '_15min' for 15."""
+    return '' if granularity == DEFAULT_GRANULARITY else f'_{granularity}min'
+
+
+class CsvWriter:
+    """Write one CSV per connector into `folder`, normally ``<base_dir>/<local_auth>/sessions_mix/``."""
+
+    # each connector is its own file, so unchanged connectors can be left in place
+    incremental = True
+    sparse = False
+
+    def __init__(self, folder):
+        self.folder = folder
+        os.makedirs(folder, exist_ok=True)
+
+    def write(self, frame, cp_id, connector):
+        filename = os.path.join(self.folder, f"{cp_id}_{connector}.csv")
+        frame.to_csv(filename, index=False)
+        return filename
+
+    def close(self):
+        pass
+
+
+class ParquetWriter:
+    """Write all connectors of a local authority into one Parquet dataset.
+
+    The dataset lives in ``<base_dir>/<local_auth>/sessions_mix<suffix>.parquet/`` and is optionally
+    split into ``year=<YYYY>`` partitions. Rows keep the CSV columns plus 'CP ID' and
+    'Connector', stored with compact types (float32 consumption, uint8 occupancy and a
+    dictionary-encoded carbon index). Connectors are buffered and flushed as row groups
+    of about `row_group_size` rows, so memory stays bounded per authority.
+    """
+
+    # the dataset is rewritten as a whole whenever a connector changed; left alone when none did
+    incremental = False
+    sparse = False
+
+    def __init__(self, base_dir, local_auth, partition_by_year=False, row_group_size=1_000_000, suffix=''):
+        import pyarrow.parquet as pq
+
+        self._pq = pq
+        self.folder = os.path.join(base_dir, local_auth, f'sessions_mix{suffix}.parquet')
+        self.partition_by_year = partition_by_year
+        self.row_group_size = row_group_size
+        self._buffers = {}
+        self._writers = {}
+        self._written = False
+        self._cleared = False
+
+    @staticmethod
+    def compact(frame, cp_id, connector):
+        """Return `frame` with identification columns added and compact dtypes applied."""
+        frame = frame.assign(**{
+            'Consumed': frame['Consumed'].astype('float32'),
+            'Occupied': frame['Occupied'].astype('uint8'),
+            'Carbon Index': pd.Categorical(frame['Carbon Index'], categories=CARBON_INDEX_LEVELS),
+            'Region ID': frame['Region ID'].astype(str),
+            'CP ID': str(cp_id),
+            'Connector': str(connector),
+        })
+        return frame
+
+    def _path(self, partition):
+        if partition is None:
+            return os.path.join(self.folder, 'part-0.parquet')
+        return os.path.join(self.folder, f'year={partition}', 'part-0.parquet')
+
+    def write(self, frame, cp_id, connector):
+        self._written = True
+        frame = self.compact(frame, cp_id, connector)
+        if self.partition_by_year:
+            parts = frame.groupby(frame['Timestamp'].dt.year)
+        else:
+            parts = [(None, frame)]
+        for partition, part in parts:
+            buffer = self._buffers.setdefault(partition, [])
+            buffer.append(part)
+            if sum(len(p) for p in buffer) >= self.row_group_size:
+                self._flush(partition)
+        return self.folder
+
+    def _flush(self, partition):
+        import pyarrow as pa
+
+        buffer = self._buffers.pop(partition, [])
+        if not buffer:
+            return
+        table = pa.Table.from_pandas(pd.concat(buffer, ignore_index=True), preserve_index=False)
+        self._clear()
+        writer = self._writers.get(partition)
+        if writer is None:
+            path = self._path(partition)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            writer = self._pq.ParquetWriter(path, table.schema)
+            self._writers[partition] = writer
+        writer.write_table(table.cast(writer.schema))
+
+    def _clear(self):
+        if not self._cleared:
+            # drop partitions left over from earlier runs before writing the new dataset
+            shutil.rmtree(self.folder, ignore_errors=True)
+            self._cleared = True
+
+    def close(self):
+        for partition in list(self._buffers):
+            self._flush(partition)
+        if self._written:
+            # connectors were regenerated but gave no rows: an earlier run's dataset must not stay behind
+            self._clear()
+        for writer in self._writers.values():
+            writer.close()
+        self._writers = {}
+
+
+class SparseCsvWriter:
+    """Write only the active intervals of each connector into ``<base_dir>/<local_auth>/sessions_sparse/``.
+
+    Each connector file keeps the 'Timestamp', 'Consumed' and 'Occupied' rows where either
+    value is non-zero. Everything else needed to rebuild the dense files lives elsewhere:
+    `index.csv` records each connector's interval range, granularity, region and carbon
+    region, and the carbon and generation mix columns are collected in `carbon` (per carbon
+    region) to be written once as shared tables. See `src.chargeplace.sparse` for the loader.
+    """
+
+    incremental = True
+    sparse = True
+
+    def __init__(self, folder):
+        self.folder = folder
+        os.makedirs(folder, exist_ok=True)
+        self.index_path = os.path.join(folder, SPARSE_INDEX)
+        self.carbon = {}
+        self._index = {}
+        if os.path.exists(self.index_path):
+            # connectors that are not regenerated keep their entries
+            existing = pd.read_csv(self.index_path, dtype={'CP ID': str, 'Connector': str})
+            self._index = {(row['CP ID'], row['Connector']): row for row in existing.to_dict('records')}
+
+    def write(self, frame, cp_id, connector, start=None, end=None, granularity=None, region_id=None,
+              carbon_region=None):
+        name = f"{cp_id}_{connector}.csv"
+        filename = os.path.join(self.folder, name)
+        frame.to_csv(filename, index=False)
+        self._index[(str(cp_id), str(connector))] = {
+            'CP ID': str(cp_id), 'Connector': str(connector), 'Start': start, 'End': end,
+            'Granularity': granularity, 'Region ID': region_id, 'Carbon Region': carbon_region, 'File': name,
+        }
+        return filename
+
+    def add_carbon(self, carbon_region, table):
+        """Collect the carbon rows of `carbon_region` used by this authority."""
+        if carbon_region in self.carbon:
+            table = pd.concat([self.carbon[carbon_region], table], ignore_index=True)
+        self.carbon[carbon_region] = table
+
+    def close(self):
+        index = pd.DataFrame([self._index[key] for key in sorted(self._index)], columns=SPARSE_INDEX_COLUMNS)
+        tmp_path = f'{self.index_path}.{os.getpid()}.tmp'
+        index.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, self.index_path)
+
+
+def create_writer(output_format, base_dir, local_auth, partition_by_year=False, layout='dense',
+                  granularity=DEFAULT_GRANULARITY):
+    suffix = resolution_suffix(granularity)
+    if layout == 'sparse':
+        if output_format != 'csv':
+            raise ValueError("The sparse layout is only available for csv output")
+        return SparseCsvWriter(os.path.join(base_dir, local_auth, SPARSE_FOLDER + suffix))
+    if layout != 'dense':
+        raise ValueError(f"layout must be one of {OUTPUT_LAYOUTS}, got {layout!r}")
+    if output_format == 'csv':
+        return CsvWriter(os.path.join(base_dir, local_auth, 'sessions_mix' + suffix))
+    if output_format == 'parquet':
+        return ParquetWriter(base_dir, local_auth, partition_by_year=partition_by_year, suffix=suffix)
+    raise ValueError(f"output_format must be one of {OUTPUT_FORMATS}, got {output_format!r}")
@@ -0,0 +1,62 @@
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+
+ARCHIVE_URL = "https://archive-api.open-meteo.com/v1/archive"
+
+# hourly Open-Meteo variables and the output columns they are written to
+HOURLY_VARIABLES = {
+    'temperature_2m': 'Temperature',
+    'relative_humidity_2m': 'Humidity',
+    'precipitation': 'Precipitation',
+    'snowfall': 'Snowfall',
+    'cloud_cover': 'Cloud Cover',
+    'wind_speed_10m': 'Wind Speed',
+    'shortwave_radiation': 'Solar Radiation',
+}
+
+
+class OpenMeteoClient:
+    """Client for the Open-Meteo historical weather API with an HTTP cache and retries.
+
+    Requests go through `openmeteo_requests` over a `requests_cache` session wrapped by
+    `retry_requests`, so a repeated request (e.g. after an interrupted run) is answered from
+    `cache_path`. Several locations are requested in one call and answered in request order.
+    Counts the calls it makes in `requests`.
+    """
+
+    def __init__(self, url=ARCHIVE_URL, cache_path='data/cache/open_meteo', expire_after=timedelta(days=1),
+                 retries=5, backoff_factor=0.5):
+        import openmeteo_requests
+        import requests_cache
+        from retry_requests import retry
+
+        session = requests_cache.CachedSession(cache_path, expire_after=expire_after)
+        self.client = openmeteo_requests.Client(session=retry(session, retries=retries,
+                                                              backoff_factor=backoff_factor))
+        self.url = url
+        self.requests = 0
+
+    def hourly(self, latitudes, longitudes, start_date, end_date, variables=tuple(HOURLY_VARIABLES)):
+        """Return one frame per location with a UTC 'timestamp' column and a column per variable,
+        covering the days `start_date` to `end_date` (inclusive)."""
+        params = {
+            'latitude': [float(lat) for lat in latitudes],
+            'longitude': [float(lon) for lon in longitudes],
+            'start_date': str(start_date),
+            'end_date': str(end_date),
+            'hourly': list(variables),
+            'timezone': 'GMT',
+        }
+        self.requests += 1
+        frames = []
+        for response in self.client.weather_api(self.url, params=params):
+            hourly = response.Hourly()
+            seconds = np.arange(hourly.Time(), hourly.TimeEnd(), hourly.Interval())
+            frame = pd.DataFrame({'timestamp': pd.to_datetime(seconds, unit='s', utc=True)})
+            for i, variable in enumerate(variables):
+                frame[variable] = hourly.Variables(i).ValuesAsNumpy()
+            frames.append(frame)
+        return frames
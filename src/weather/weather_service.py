@@ -0,0 +1,135 @@
+import logging
+import threading
+
+import numpy as np
+import pandas as pd
+
+from src.weather.weather_client import HOURLY_VARIABLES
+
+logger = logging.getLogger(__name__)
+
+# degrees; the resolution of the ERA5-Land reanalysis behind the archive API
+DEFAULT_CELL_SIZE = 0.1
+
+HOUR = pd.Timedelta(hours=1)
+DAY = pd.Timedelta(days=1)
+
+
+def weather_cells(latitudes, longitudes, cell_size=DEFAULT_CELL_SIZE):
+    """Return (cell ids, cell latitudes, cell longitudes) of the grid cells the coordinates fall in."""
+    latitudes = np.round(np.asarray(latitudes, dtype=float) / cell_size) * cell_size
+    longitudes = np.round(np.asarray(longitudes, dtype=float) / cell_size) * cell_size
+    ids = [f'{lat:.4f},{lon:.4f}' for lat, lon in zip(latitudes, longitudes)]
+    return np.array(ids, dtype=object), latitudes, longitudes
+
+
+def _utc(values):
+    """Session times are UTC, stored naive; make `values` (scalar or Series) timezone-aware."""
+    if isinstance(values, pd.Series):
+        return values.dt.tz_localize('UTC') if values.dt.tz is None else values.dt.tz_convert('UTC')
+    return values.tz_localize('UTC') if values.tzinfo is None else values.tz_convert('UTC')
+
+
+def join_weather(frame, table, time_column='Timestamp'):
+    """Add the hourly weather of one cell (`table`, indexed by UTC hour) to the rows of `frame`.
+
+    Every interval takes the weather of the hour it starts in; hours without data are NaN.
+    """
+    values = table.reindex(_utc(frame[time_column]).dt.floor(HOUR))
+    return frame.assign(**{HOURLY_VARIABLES[variable]: values[variable].to_numpy() for variable in table.columns})
+
+
+class WeatherService:
+    """Hourly weather per grid cell, fetched in batches and kept in a `WeatherStore`.
+
+    Charger coordinates are snapped to a grid of `cell_size` degrees, so chargers close to
+    each other share one weather series. Missing (cell, date range) gaps are fetched with
+    multi-location requests of up to `batch_size` cells; the cells of a batch are requested
+    over the union of their ranges, and gaps are sorted by start so the ranges of a batch
+    stay close to each other. Two gaps of the same cell never share a request.
+
+    Accepts an injectable `client` for testing (anything with the `hourly` method of
+    `OpenMeteoClient`); the real client is only created when something has to be fetched.
+    """
+
+    def __init__(self, store, client=None, cell_size=DEFAULT_CELL_SIZE, batch_size=50):
+        self.store = store
+        self._client = client
+        self.cell_size = cell_size
+        self.batch_size = batch_size
+        # gap detection and fetching are serialized so concurrent authorities sharing a cell fetch it once
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            from src.weather.weather_client import OpenMeteoClient
+
+            self._client = OpenMeteoClient()
+        return self._client
+
+    def cell_ranges(self, chargers, sessions):
+        """Grid cells of `chargers` (rows with 'CP ID', 'Latitude' and 'Longitude') and the days
+        spanned by their `sessions` ('CP ID', 'Start', 'Duration').
+
+        Returns a frame with 'cell', 'latitude', 'longitude', 'start' and 'end' (UTC midnights,
+        `end` exclusive); cells without sessions are left out.
+        """
+        chargers = chargers.drop_duplicates('CP ID')
+        cells, latitudes, longitudes = weather_cells(chargers['Latitude'], chargers['Longitude'], self.cell_size)
+        located = pd.DataFrame({'CP ID': chargers['CP ID'].astype(str).to_numpy(), 'cell': cells,
+                                'latitude': latitudes, 'longitude': longitudes})
+
+        cp_ids = sessions['CP ID'].astype(str)
+        active = pd.DataFrame({'CP ID': cp_ids, 'start': sessions['Start'],
+                               'end': sessions['Start'] + sessions['Duration']}) \
+            .groupby('CP ID', sort=False).agg({'start': 'min', 'end': 'max'}).reset_index()
+        ranges = located.merge(active, on='CP ID').groupby('cell', sort=True) \
+            .agg({'latitude': 'first', 'longitude': 'first', 'start': 'min', 'end': 'max'}).reset_index()
+        # whole days, with room for the last interval of a session ending just before midnight
+        ranges['start'] = _utc(ranges['start']).dt.floor(DAY)
+        ranges['end'] = _utc(ranges['end'] + HOUR).dt.floor(DAY) + DAY
+        return ranges
+
+    def prefetch(self, cells):
+        """Fetch what the store lacks for `cells` (a `cell_ranges` frame). Returns the number of requests."""
+        with self._lock:
+            gaps = []
+            for row in cells.itertuples(index=False):
+                for gap_start, gap_end in self.store.missing(row.cell, row.start, row.end):
+                    gaps.append((gap_start, gap_end, row.cell, row.latitude, row.longitude))
+            gaps.sort()
+            requests = 0
+            for batch in self._batches(gaps):
+                start, end = min(gap[0] for gap in batch), max(gap[1] for gap in batch)
+                frames = self.client.hourly([gap[3] for gap in batch], [gap[4] for gap in batch],
+                                            start.date(), (end - DAY).date(), list(self.store.VARIABLES))
+                self.store.add([gap[2] for gap in batch], start, end, frames)
+                requests += 1
+            if gaps:
+                logger.info('Fetched weather for %d cell ranges in %d requests', len(gaps), requests)
+            return requests
+
+    def _batches(self, gaps):
+        """Split sorted gaps into batches of up to `batch_size`, starting a new batch when a cell
+        repeats: a batch is requested over the union of its ranges, which for two gaps of one
+        cell would fetch the range stored between them again."""
+        batch, batch_cells = [], set()
+        for gap in gaps:
+            if len(batch) == self.batch_size or gap[2] in batch_cells:
+                yield batch
+                batch, batch_cells = [], set()
+            batch.append(gap)
+            batch_cells.add(gap[2])
+        if batch:
+            yield batch
+
+    def hourly(self, cells):
+        """Return {cell: hourly weather indexed by UTC hour} for `cells` (a `cell_ranges` frame),
+        fetching anything that is not stored yet."""
+        if cells.empty:
+            return {}
+        self.prefetch(cells)
+        weather = self.store.load(cells['cell'], cells['start'].min(), cells['end'].max())
+        return {cell: frame.drop(columns='cell').set_index('timestamp')
+                for cell, frame in weather.groupby('cell', sort=False)}
@@ -0,0 +1,118 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytz
+
+from src.carbon.carbon_store import from_epoch_seconds, to_epoch_seconds
+from src.weather.weather_client import HOURLY_VARIABLES
+
+
+class WeatherStore:
+    """Persistent SQLite store of hourly weather per grid cell.
+
+    Like `CarbonStore`, rows are kept together with the time ranges already fetched for
+    each cell, so callers only request the gaps. Safe to share between threads (one
+    connection per thread) and processes (SQLite file locking).
+
+    Parameters
+    ----------
+    `path` : str
+        Location of the SQLite database; parent directories are created.
+    `settle_period` : timedelta
+        Data this close to the present is stored but not marked as covered: the archive
+        API publishes the last days from forecasts and replaces them with reanalysis later.
+    """
+
+    VARIABLES = list(HOURLY_VARIABLES)
+
+    def __init__(self, path='data/cache/weather.sqlite', settle_period=timedelta(days=7)):
+        self.path = path
+        self.settle_period = settle_period
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._create_tables()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=60)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _create_tables(self):
+        columns = ", ".join(f"{variable} REAL" for variable in self.VARIABLES)
+        with self._connection() as conn:
+            conn.execute(f"CREATE TABLE IF NOT EXISTS weather (cell TEXT, timestamp INTEGER, {columns}, "
+                         "PRIMARY KEY (cell, timestamp))")
+            conn.execute("CREATE TABLE IF NOT EXISTS coverage (cell TEXT, start INTEGER, end INTEGER)")
+
+    def _coverage(self, conn, cell):
+        return conn.execute("SELECT start, end FROM coverage WHERE cell = ? ORDER BY start", (cell,)).fetchall()
+
+    def missing(self, cell, start, end):
+        """Return the (start, end) sub-ranges of [start, end) that are not covered yet for `cell`."""
+        start_s, end_s = int(to_epoch_seconds(start)), int(to_epoch_seconds(end))
+        gaps = []
+        cursor = start_s
+        for covered_start, covered_end in self._coverage(self._connection(), cell):
+            if covered_end < cursor:
+                continue
+            if covered_start > end_s:
+                break
+            if covered_start > cursor:
+                gaps.append((cursor, covered_start))
+            cursor = max(cursor, covered_end)
+        if cursor < end_s:
+            gaps.append((cursor, end_s))
+        return [(from_epoch_seconds(a), from_epoch_seconds(b)) for a, b in gaps]
+
+    def add(self, cells, start, end, frames):
+        """Store the hourly `frames` fetched for `cells` (in the same order) and mark [start, end)
+        (minus the settle period) as covered for each of them."""
+        conn = self._connection()
+        placeholders = ", ".join("?" * (len(self.VARIABLES) + 2))
+        settled = min(pd.Timestamp(end), pd.Timestamp(datetime.now(pytz.utc) - self.settle_period))
+        with conn:
+            for cell, frame in zip(cells, frames):
+                columns = [to_epoch_seconds(frame['timestamp']).tolist()]
+                columns += [frame[variable].astype(float).tolist() for variable in self.VARIABLES]
+                conn.executemany(f"INSERT OR REPLACE INTO weather VALUES ({placeholders})",
+                                 ((cell,) + row for row in zip(*columns)))
+                if settled <= start:
+                    continue
+                intervals = self._coverage(conn, cell) + [(int(to_epoch_seconds(start)),
+                                                           int(to_epoch_seconds(settled)))]
+                merged = []
+                for covered_start, covered_end in sorted(intervals):
+                    if merged and covered_start <= merged[-1][1]:
+                        merged[-1][1] = max(merged[-1][1], covered_end)
+                    else:
+                        merged.append([covered_start, covered_end])
+                conn.execute("DELETE FROM coverage WHERE cell = ?", (cell,))
+                conn.executemany("INSERT INTO coverage VALUES (?, ?, ?)", ((cell, a, b) for a, b in merged))
+
+    def load(self, cells, start, end):
+        """Return the rows of `cells` with timestamps in [start, end), sorted by cell and time:
+        columns 'cell', 'timestamp' and one per weather variable."""
+        conn = self._connection()
+        cells = sorted(set(cells))
+        bounds = [int(to_epoch_seconds(start)), int(to_epoch_seconds(end))]
+        frames = []
+        # stay below SQLite's limit on bound parameters
+        for i in range(0, len(cells), 500):
+            chunk = cells[i:i + 500]
+            frames.append(pd.read_sql_query(
+                "SELECT cell, timestamp, " + ", ".join(self.VARIABLES) + " FROM weather "
+                f"WHERE cell IN ({', '.join('?' * len(chunk))}) AND timestamp >= ? AND timestamp < ? "
+                "ORDER BY cell, timestamp", conn, params=chunk + bounds))
+        weather = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(
+            columns=['cell', 'timestamp'] + self.VARIABLES)
+        weather['timestamp'] = from_epoch_seconds(weather['timestamp'])
+        weather[self.VARIABLES] = weather[self.VARIABLES].astype(float)
+        return weather
@@ -0,0 +1,72 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import FakeCarbonClient, council_areas, make_chargers, write_sessions_csv
+from src.carbon.carbon_adapter import CarbonAdapter
+from src.carbon.carbon_fetcher import AsyncCarbonFetcher
+from src.carbon.carbon_intensity_api import CarbonIntensityAPI
+from src.carbon.carbon_store import CarbonStore
+from src.chargeplace.chargeplace_scotland_api import ChargePlaceScotlandAPI
+from src.chargeplace.ingest import read_sessions_csv
+from src.chargeplace.session_store import SessionStore
+
+INFRASTRUCTURE_COLUMNS = ['Latitude', 'Longitude', 'CP ID', 'Connector', 'Nominal Power (kW)', 'Connector Type',
+                          'Tariff', 'Connection Fee', 'Address', 'Postcode', 'Local Authority', 'Region ID']
+
+
+def write_infrastructure(base_dir, areas, chargers):
+    """Write the charging_infrastructure.csv of every area, as the spatial-locate stage would."""
+    for k, area in enumerate(areas):
+        rows = [(charger.latitude, charger.longitude, charger.cp_id, connector, 7.0 * connector, 'Type 2', 0.3, 0,
+                 f'Site {charger.cp_id}', charger.postcode.split(' ')[0], area.local_auth, area.region_id)
+                for charger in chargers[k::len(areas)] for connector in range(1, charger.connectors + 1)]
+        os.makedirs(os.path.join(base_dir, area.local_auth), exist_ok=True)
+        pd.DataFrame(rows, columns=INFRASTRUCTURE_COLUMNS).to_csv(
+            os.path.join(base_dir, area.local_auth, 'charging_infrastructure.csv'), index=False)
+
+
+class Pipeline:
+    """A small synthetic result directory and an API that populates it, with carbon data
+    served by `FakeCarbonClient` and kept in a carbon store (which process workers read)."""
+
+    def __init__(self, directory, n_authorities=2, n_chargers=6, n_sessions=300, seed=0):
+        rng = np.random.default_rng(seed)
+        self.areas = council_areas(n_authorities)
+        self.chargers = make_chargers(n_chargers, self.areas, rng)
+        self.sessions_path = os.path.join(directory, 'all_sessions.csv')
+        write_sessions_csv(self.sessions_path, self.chargers, n_sessions, rng, days=20)
+        self.base_dir = os.path.join(directory, 'result')
+        write_infrastructure(self.base_dir, self.areas, self.chargers)
+
+        self.carbon_cache_path = os.path.join(directory, 'carbon.sqlite')
+        self.client = FakeCarbonClient()
+        self.fetcher = AsyncCarbonFetcher(client=self.client, rate=1000, burst=1000)
+        self.api = self.build_api(read_sessions_csv(self.sessions_path)[0])
+
+    def build_api(self, sessions):
+        api = ChargePlaceScotlandAPI._from_sessions(SessionStore(sessions), self.carbon_cache_path)
+        carbon_api = CarbonIntensityAPI(client=self.client)
+        carbon_api.service.fetcher = self.fetcher
+        api.carbon_adapter = CarbonAdapter(api=carbon_api, store=CarbonStore(self.carbon_cache_path))
+        return api
+
+    @property
+    def local_auths(self):
+        return [area.local_auth for area in self.areas]
+
+    def populate(self, **kwargs):
+        kwargs.setdefault('max_workers', 1)
+        self.api.populate_session_data_per_charger(base_dir=kwargs.pop('base_dir', self.base_dir), **kwargs)
+
+    def path(self, local_auth, *parts):
+        return os.path.join(self.base_dir, local_auth, *parts)
+
+
+@pytest.fixture
+def pipeline(tmp_path):
+    pipeline = Pipeline(str(tmp_path))
+    yield pipeline
+    pipeline.fetcher.close()
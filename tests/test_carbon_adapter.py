@@ -0,0 +1,106 @@
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import FakeCarbonClient
+from src.carbon.carbon_adapter import CarbonAdapter
+from src.carbon.carbon_fetcher import AsyncCarbonFetcher
+from src.carbon.carbon_intensity_api import CarbonIntensityAPI
+from src.carbon.carbon_store import CarbonStore
+
+
+class RecordingAPI:
+    """`CarbonIntensityAPI` on `FakeCarbonClient` that remembers the ranges it is asked for and can fail."""
+
+    def __init__(self, fetcher, client):
+        self.api = CarbonIntensityAPI(client=client)
+        self.api.service.fetcher = fetcher
+        self.calls = []
+        self.fail = False
+
+    def between(self, start, end, type='national', region_id=None, postcode=None):
+        self.calls.append((pd.Timestamp(start), pd.Timestamp(end)))
+        if self.fail:
+            return pd.DataFrame(), pd.DataFrame()
+        return self.api.between(start, end, type=type, region_id=region_id, postcode=postcode)
+
+    def region_for_postcode(self, postcode):
+        return self.api.region_for_postcode(postcode)
+
+
+@pytest.fixture
+def api():
+    client = FakeCarbonClient()
+    fetcher = AsyncCarbonFetcher(client=client, rate=1000, burst=1000)
+    yield RecordingAPI(fetcher, client)
+    fetcher.close()
+
+
+def utc(value):
+    return pd.Timestamp(value, tz='UTC')
+
+
+def test_store_only_fetches_gaps(tmp_path, api):
+    store = CarbonStore(str(tmp_path / 'carbon.sqlite'))
+    CarbonAdapter(api=api, store=store).fetch('2022-01-01', '2022-01-05', 'regional', region_id=1)
+
+    # a new adapter (e.g. the next run) only asks for what the store lacks
+    carbon, gen_mix = CarbonAdapter(api=api, store=store).fetch('2022-01-03', '2022-01-08', 'regional',
+                                                                region_id=1)
+
+    assert api.calls[1:] == [(utc('2022-01-05'), utc('2022-01-08'))]
+    assert carbon['timestamp'].min() == utc('2022-01-03')
+    assert carbon['timestamp'].max() == utc('2022-01-08')
+    assert carbon['timestamp'].is_unique and len(carbon) == len(gen_mix) == 5 * 48 + 1
+
+
+def test_stored_rows_match_a_direct_fetch(tmp_path, api):
+    store = CarbonStore(str(tmp_path / 'carbon.sqlite'))
+    adapter = CarbonAdapter(api=api, store=store)
+    adapter.fetch('2022-01-01', '2022-01-02', 'regional', region_id=2)
+    stored, stored_mix = CarbonAdapter(api=api, store=store).fetch('2022-01-01', '2022-01-02', 'regional',
+                                                                   region_id=2)
+
+    direct, direct_mix = CarbonAdapter(api=api).fetch('2022-01-01', '2022-01-02', 'regional', region_id=2)
+
+    pd.testing.assert_frame_equal(stored.reset_index(drop=True), direct.reset_index(drop=True), check_dtype=False)
+    pd.testing.assert_frame_equal(stored_mix.reset_index(drop=True), direct_mix.reset_index(drop=True),
+                                  check_dtype=False)
+
+
+def test_failed_gaps_are_fetched_again(tmp_path, api):
+    adapter = CarbonAdapter(api=api, store=CarbonStore(str(tmp_path / 'carbon.sqlite')))
+    api.fail = True
+    carbon, _ = adapter.fetch('2022-01-01', '2022-01-02', 'regional', region_id=1)
+    assert carbon.empty
+
+    api.fail = False
+    carbon, _ = adapter.fetch('2022-01-01', '2022-01-02', 'regional', region_id=1)
+
+    assert len(api.calls) == 2
+    assert len(carbon) == 49
+
+
+def test_postcodes_of_one_region_share_its_series(tmp_path, api):
+    store = CarbonStore(str(tmp_path / 'carbon.sqlite'))
+    adapter = CarbonAdapter(api=api, store=store)
+
+    # FakeCarbonClient puts S01 and S21 in region 1, S11 in region 2
+    first, _ = adapter.fetch('2022-01-01', '2022-01-02', 'postcode', postcode='S01')
+    second, _ = adapter.fetch('2022-01-01', '2022-01-02', 'postcode', postcode='S21')
+    other, _ = adapter.fetch('2022-01-01', '2022-01-02', 'postcode', postcode='S11')
+
+    assert len(api.calls) == 2
+    pd.testing.assert_frame_equal(first, second)
+    assert set(first['regionid']) == {1} and set(other['regionid']) == {2}
+    assert store.region_for_postcode('S21') == 1
+
+    # the postcode to region map is stored as well: a new adapter needs no lookups
+    requests = api.api.service.client.requests
+    CarbonAdapter(api=api, store=store).fetch('2022-01-01', '2022-01-02', 'postcode', postcode='S01')
+    assert api.api.service.client.requests == requests
+
+
+def test_postcode_series_without_region_resolution(api):
+    carbon, _ = CarbonAdapter(api=api, resolve_regions=False).fetch('2022-01-01', '2022-01-02', 'postcode',
+                                                                     postcode='S11')
+    assert set(carbon['regionid']) == {2}
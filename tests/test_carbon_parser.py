@@ -0,0 +1,93 @@
+import pandas as pd
+import pytest
+from numpy import nan
+
+from benchmarks.synthetic import FakeCarbonClient
+from src.carbon.carbon_parser import CarbonParser
+
+FUEL_MIX_LABELS = CarbonParser.FUEL_MIX_LABELS
+
+
+def parse_reference(response, type_):
+    """The row-by-row parse the column-wise parser replaced: DataFrames built from lists of rows."""
+    if type_ == 'national':
+        rows = [[d['to'], d['intensity'].get('forecast', nan), d['intensity'].get('actual', nan),
+                 d['intensity']['index']] for d in response.get('data', [])]
+        carbon = pd.DataFrame(rows, columns=['timestamp', 'forecast', 'actual', 'index'])
+        carbon['timestamp'] = pd.to_datetime(carbon['timestamp'], utc=True)
+        return carbon, None
+
+    region = response.get('data', {})
+    carbon_rows, fuel_mix_rows = [], []
+    for datum in region.get('data', []):
+        carbon_rows.append([datum['to'], region.get('regionid'), datum['intensity'].get('forecast', nan),
+                            datum['intensity'].get('actual', nan), datum['intensity']['index']])
+        mix = {f['fuel']: f.get('perc', nan) for f in datum.get('generationmix', [])}
+        fuel_mix_rows.append([datum['to'], region.get('regionid')] + [mix.get(label, nan) for label in FUEL_MIX_LABELS])
+    carbon = pd.DataFrame(carbon_rows, columns=['timestamp', 'regionid', 'forecast', 'actual', 'index'])
+    carbon['timestamp'] = pd.to_datetime(carbon['timestamp'], utc=True)
+    fuel_mix = pd.DataFrame(fuel_mix_rows, columns=['timestamp', 'regionid'] + FUEL_MIX_LABELS)
+    fuel_mix['timestamp'] = pd.to_datetime(fuel_mix['timestamp'], utc=True)
+    return carbon, fuel_mix
+
+
+def payload(type_):
+    client = FakeCarbonClient()
+    if type_ == 'national':
+        return client.fetch_json('https://api.carbonintensity.org.uk/intensity/2022-01-01T00:00Z/2022-01-02T00:00Z')
+    return client.fetch_json('https://api.carbonintensity.org.uk/regional/intensity/2022-01-01T00:00Z/'
+                             '2022-01-02T00:00Z/regionid/2')
+
+
+def with_gaps(response, type_):
+    """`response` with the missing and unexpected values the API sometimes returns."""
+    data = response['data'] if type_ == 'national' else response['data']['data']
+    for i, datum in enumerate(data):
+        if i % 2:
+            datum['intensity']['actual'] = datum['intensity']['forecast'] + 3
+        if i % 5 == 0:
+            del datum['intensity']['forecast']
+        mix = datum['generationmix']
+        if i % 3 == 0:
+            mix[0]['perc'] = None
+        if i % 4 == 0:
+            del mix[-1]
+        if i % 7 == 0:
+            mix.append({'fuel': 'pumped storage', 'perc': 1.0})
+    return response
+
+
+@pytest.mark.parametrize('type_', ['national', 'regional'])
+@pytest.mark.parametrize('gaps', [False, True])
+def test_column_parse_matches_row_parse(type_, gaps):
+    response = payload(type_)
+    if gaps:
+        response = with_gaps(response, type_)
+
+    carbon, fuel_mix = CarbonParser().parse_fromto_json(response, type_)
+    expected_carbon, expected_fuel_mix = parse_reference(response, type_)
+
+    pd.testing.assert_frame_equal(carbon, expected_carbon)
+    if type_ == 'national':
+        assert fuel_mix is None
+    else:
+        pd.testing.assert_frame_equal(fuel_mix, expected_fuel_mix)
+
+
+def test_arrow_tables_hold_the_same_columns():
+    response = with_gaps(payload('regional'), 'regional')
+    parser = CarbonParser()
+
+    frames = parser.parse_fromto_json(response, 'regional')
+    tables = parser.parse_fromto_json(response, 'regional', as_arrow=True)
+
+    for frame, table in zip(frames, tables):
+        pd.testing.assert_frame_equal(table.to_pandas(), frame)
+
+
+def test_empty_payload():
+    carbon, fuel_mix = CarbonParser().parse_fromto_json({'data': {'regionid': 1, 'data': []}}, 'regional')
+
+    assert carbon.empty and fuel_mix.empty
+    assert list(carbon.columns) == ['timestamp', 'regionid', 'forecast', 'actual', 'index']
+    assert list(fuel_mix.columns) == ['timestamp', 'regionid'] + FUEL_MIX_LABELS
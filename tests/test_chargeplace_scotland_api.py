@@ -0,0 +1,67 @@
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+
+def read_connectors(pipeline, folder='sessions_mix'):
+    """{(local_auth, file name): frame} of every connector CSV in `folder` of each authority."""
+    frames = {}
+    for la in pipeline.local_auths:
+        directory = pipeline.path(la, folder)
+        for name in sorted(os.listdir(directory)):
+            frames[la, name] = pd.read_csv(os.path.join(directory, name))
+    return frames
+
+
+def assert_same_outputs(left, right):
+    assert sorted(left) == sorted(right)
+    for key in left:
+        pd.testing.assert_frame_equal(left[key], right[key], check_exact=False, rtol=1e-9, atol=1e-9)
+
+
+def test_vectorized_and_reference_expansion_write_the_same_files(pipeline):
+    pipeline.populate(expansion='reference', incremental=False)
+    reference = read_connectors(pipeline)
+    for la in pipeline.local_auths:
+        shutil.rmtree(pipeline.path(la, 'sessions_mix'))
+
+    pipeline.populate(expansion='vectorized', incremental=False)
+
+    assert reference
+    assert_same_outputs(read_connectors(pipeline), reference)
+
+
+def test_process_backend_writes_the_same_files_as_threads(pipeline):
+    pipeline.populate(backend='thread', incremental=False)
+    threads = read_connectors(pipeline)
+    for la in pipeline.local_auths:
+        shutil.rmtree(pipeline.path(la, 'sessions_mix'))
+
+    # the workers build their own carbon adapter on the store the thread run filled
+    pipeline.populate(backend='process', max_workers=2, incremental=False)
+
+    assert_same_outputs(read_connectors(pipeline), threads)
+
+
+def test_multi_resolution_run_writes_the_single_resolution_files(pipeline):
+    folders = {15: 'sessions_mix_15min', 30: 'sessions_mix', 60: 'sessions_mix_60min'}
+    single = {}
+    for granularity, folder in folders.items():
+        pipeline.populate(granularity=granularity, incremental=False)
+        single[granularity] = read_connectors(pipeline, folder)
+        for la in pipeline.local_auths:
+            shutil.rmtree(pipeline.path(la, folder))
+
+    # one expansion at 15 minutes, downsampled to 30 and 60
+    pipeline.populate(granularity=[60, 15, 30], incremental=False)
+
+    for granularity, folder in folders.items():
+        assert single[granularity]
+        assert_same_outputs(read_connectors(pipeline, folder), single[granularity])
+
+
+def test_granularities_must_nest(pipeline):
+    with pytest.raises(ValueError):
+        pipeline.populate(granularity=[20, 30], incremental=False)
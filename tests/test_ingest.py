@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+from src.chargeplace.ingest import SESSION_COLUMNS, read_sessions_csv
+
+CSV = """Start,Duration,Consumed(kWh),Paid(gbp),CP ID,Connector,Site
+2024-01-01 10:00:00,01:30:00,3.5,1.05,50001,1,a
+2024-01-01 11:15:00,00:45:00,2.25,0.7,50002,2,b
+01/02/2024 08:00,02:00:00,10,3,50001,1,c
+2024-01-02 09:00:00,,1,0.3,50003,1.5,d
+not a date,00:10:00,x,,50002,1,e
+2024-01-03 12:00:00,23:59:00,40,12,,2,f
+2024-01-03 12:30:00,00:01:00,0.1,0.03,50004,3,g
+"""
+
+
+def test_chunked_read_matches_a_single_parse(tmp_path):
+    path = tmp_path / 'all_sessions.csv'
+    path.write_text(CSV)
+
+    sessions, stats = read_sessions_csv(str(path), chunksize=2)
+    whole, _ = read_sessions_csv(str(path), chunksize=100)
+
+    assert stats.rows == 7 and stats.chunks == 4
+    assert list(sessions.columns) == SESSION_COLUMNS
+    pd.testing.assert_frame_equal(sessions, whole)
+
+
+def test_columns_are_compact_and_typed(tmp_path):
+    path = tmp_path / 'all_sessions.csv'
+    path.write_text(CSV)
+
+    sessions, _ = read_sessions_csv(str(path), chunksize=3)
+
+    assert sessions['Start'].dtype == 'datetime64[ns]'
+    assert sessions['Duration'].dtype == 'timedelta64[ns]'
+    assert sessions['Consumed(kWh)'].dtype == np.float32
+    assert sessions['CP ID'].dtype == 'category'
+    assert str(sessions['Connector'].dtype) == 'Int32'
+
+    # other formats fall back to pandas' parser; bad values become missing
+    assert list(sessions['Start'][:3]) == list(pd.to_datetime(['2024-01-01 10:00', '2024-01-01 11:15',
+                                                                '2024-01-02 08:00']))
+    assert sessions['Start'].isna().tolist() == [False] * 4 + [True] + [False] * 2
+    assert sessions['Duration'].isna().sum() == 1
+    assert np.isnan(sessions['Consumed(kWh)'][4])
+    # fractional connectors are not connectors
+    assert sessions['Connector'].isna().tolist() == [False] * 3 + [True] + [False] * 3
+    assert sessions['CP ID'].isna().sum() == 1
+    assert sorted(sessions['CP ID'].cat.categories) == ['50001', '50002', '50003', '50004']
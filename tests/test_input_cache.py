@@ -0,0 +1,88 @@
+import os
+
+import pandas as pd
+
+from src.chargeplace.chargeplace_scotland_api import ChargePlaceScotlandAPI
+from src.chargeplace.ingest import read_sessions_csv
+from src.chargeplace.input_cache import InputCache
+from src.chargeplace.session_store import SessionStore
+
+
+def sessions_api(pipeline, cache_dir):
+    return ChargePlaceScotlandAPI(None, pipeline.sessions_path, None, None, carbon_cache_path=None,
+                                  cache_dir=str(cache_dir))
+
+
+def test_frame_is_built_once(tmp_path):
+    source = tmp_path / 'council_areas.csv'
+    source.write_text('local_auth,region_id\nA,1\nB,2\n')
+    cache = InputCache(str(tmp_path / 'cache'))
+    builds = []
+
+    def build():
+        builds.append(1)
+        return pd.read_csv(source)
+
+    first = cache.frame('council_areas', [str(source)], build)
+    second = InputCache(str(tmp_path / 'cache')).frame('council_areas', [str(source)], build)
+
+    assert len(builds) == 1
+    pd.testing.assert_frame_equal(second, first)
+
+
+def test_changed_source_replaces_the_entry(tmp_path):
+    source = tmp_path / 'council_areas.csv'
+    source.write_text('local_auth,region_id\nA,1\n')
+    cache = InputCache(str(tmp_path / 'cache'))
+    old_key = cache.key('council_areas', [str(source)])
+    cache.frame('council_areas', [str(source)], lambda: pd.read_csv(source))
+
+    source.write_text('local_auth,region_id\nA,1\nB,2\n')
+    new_key = cache.key('council_areas', [str(source)])
+    frame = cache.frame('council_areas', [str(source)], lambda: pd.read_csv(source))
+
+    assert new_key != old_key and len(frame) == 2
+    assert not os.path.exists(cache.path(old_key, '.arrow'))
+    assert cache.key('council_areas', [str(source)], 'other settings') != new_key
+
+
+def test_session_snapshot_round_trip(pipeline, tmp_path):
+    sessions = SessionStore(read_sessions_csv(pipeline.sessions_path)[0]).sessions
+    cache = InputCache(str(tmp_path / 'cache'))
+    key = cache.key('sessions', [pipeline.sessions_path])
+    assert cache.load_sessions(key) is None
+
+    cache.save_sessions(key, sessions)
+    loaded, stats = InputCache(str(tmp_path / 'cache')).load_sessions(key)
+
+    assert stats.rows == len(sessions)
+    pd.testing.assert_frame_equal(loaded.reset_index(drop=True), sessions.reset_index(drop=True),
+                                  check_categorical=False)
+
+
+def test_warm_start_maps_the_snapshot(pipeline, tmp_path):
+    cold = sessions_api(pipeline, tmp_path / 'cache')
+    cold_sessions = cold.sessions
+    assert cold.sessions_cache_path is not None
+
+    warm = sessions_api(pipeline, tmp_path / 'cache')
+    warm_sessions = warm.sessions
+
+    # the snapshot is mapped, not parsed: nothing is read in chunks
+    assert warm.ingest_stats.chunks == 0 and cold.ingest_stats.chunks > 0
+    assert warm.sessions_cache_path == cold.sessions_cache_path
+    pd.testing.assert_frame_equal(warm_sessions.reset_index(drop=True), cold_sessions.reset_index(drop=True),
+                                  check_categorical=False)
+    assert sorted(warm.session_store.keys()) == sorted(cold.session_store.keys())
+
+
+def test_changed_sessions_miss_the_cache(pipeline, tmp_path):
+    sessions_api(pipeline, tmp_path / 'cache').sessions
+    with open(pipeline.sessions_path, 'a') as f:
+        f.write('2022-01-05 10:00:00,01:00:00,3.0,0.9,50000,1\n')
+
+    api = sessions_api(pipeline, tmp_path / 'cache')
+
+    assert len(api.sessions) == len(read_sessions_csv(pipeline.sessions_path)[0])
+    assert api.ingest_stats.chunks > 0
+
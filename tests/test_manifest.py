@@ -0,0 +1,110 @@
+import os
+
+import pandas as pd
+import pytest
+
+from src.chargeplace.ingest import read_sessions_csv
+from src.chargeplace.manifest import Manifest
+
+OLD = 1_000_000_000_000_000_000  # ns, 2001
+
+
+def output_files(pipeline, folder):
+    return {os.path.join(la, name): pipeline.path(la, folder, name)
+            for la in pipeline.local_auths for name in sorted(os.listdir(pipeline.path(la, folder)))}
+
+
+def age(paths):
+    """Set the modification time of `paths` into the past so that a rewrite is visible."""
+    for path in paths:
+        os.utime(path, ns=(OLD, OLD))
+
+
+def rewritten(paths):
+    return sorted(name for name, path in paths.items() if os.stat(path).st_mtime_ns != OLD)
+
+
+def change_one_connector(pipeline):
+    """Rebuild the pipeline's API on sessions where one connector's first session changed; returns its file name."""
+    sessions, _ = read_sessions_csv(pipeline.sessions_path)
+    infrastructure = pd.read_csv(pipeline.path(pipeline.local_auths[0], 'charging_infrastructure.csv'), dtype=str)
+    cp_id, connector = infrastructure.loc[0, ['CP ID', 'Connector']]
+    row = ((sessions['CP ID'].astype(str) == cp_id) & (sessions['Connector'].astype(str) == connector)).idxmax()
+    sessions.loc[row, 'Consumed(kWh)'] += 1
+    pipeline.api = pipeline.build_api(sessions)
+    return f'{cp_id}_{connector}.csv'
+
+
+@pytest.mark.parametrize('layout, folder', [('dense', 'sessions_mix'), ('sparse', 'sessions_sparse')])
+def test_rerun_only_regenerates_changed_connectors(pipeline, layout, folder):
+    pipeline.populate(layout=layout)
+    files = output_files(pipeline, folder)
+    age(files.values())
+
+    pipeline.populate(layout=layout)
+    # only the sparse index is rewritten, with the same entries
+    assert rewritten(files) == ([os.path.join(la, 'index.csv') for la in pipeline.local_auths]
+                                if layout == 'sparse' else [])
+
+    age(files.values())
+    changed = change_one_connector(pipeline)
+    pipeline.populate(layout=layout)
+    changed = os.path.join(pipeline.local_auths[0], changed)
+    assert [name for name in rewritten(files) if not name.endswith('index.csv')] == [changed]
+
+
+def test_missing_outputs_are_regenerated(pipeline):
+    pipeline.populate()
+    files = output_files(pipeline, 'sessions_mix')
+    age(files.values())
+    removed = sorted(files)[0]
+    os.remove(files[removed])
+
+    pipeline.populate()
+
+    assert rewritten(files) == [removed]
+
+
+def test_full_rebuild_regenerates_every_connector(pipeline):
+    pipeline.populate()
+    files = output_files(pipeline, 'sessions_mix')
+    age(files.values())
+
+    pipeline.populate(incremental=False)
+
+    assert rewritten(files) == sorted(files)
+
+
+def test_parquet_change_rewrites_the_whole_dataset(pipeline):
+    pipeline.populate(output_format='parquet')
+    la = pipeline.local_auths[0]
+    before = pd.read_parquet(pipeline.path(la, 'sessions_mix.parquet'))
+
+    change_one_connector(pipeline)
+    pipeline.populate(output_format='parquet')
+
+    after = pd.read_parquet(pipeline.path(la, 'sessions_mix.parquet'))
+    assert sorted(set(zip(after['CP ID'], after['Connector']))) == sorted(set(zip(before['CP ID'],
+                                                                              before['Connector'])))
+    assert after['Consumed'].sum() == pytest.approx(before['Consumed'].sum() + 1, rel=1e-5)
+
+
+def test_manifest_keeps_the_last_entry_and_skips_torn_lines(tmp_path):
+    (tmp_path / 'LA').mkdir()
+    output = tmp_path / 'out.csv'
+    output.write_text('')
+    manifest = Manifest(str(tmp_path), 'LA')
+    required = (pd.Timestamp('2024-01-01'), pd.Timestamp('2024-01-02'))
+    manifest.record('1_1', 'old', required, required, str(output))
+    manifest.record('1_1', 'new', required, required, str(output))
+    with open(manifest.path, 'a') as f:
+        f.write('{"key": "2_1", "finger')
+
+    manifest = Manifest(str(tmp_path), 'LA')
+
+    assert manifest.is_current('1_1', 'new')
+    assert not manifest.is_current('1_1', 'old')
+    assert '2_1' not in manifest.entries
+    # carbon data that does not cover the required range is not current
+    manifest.record('1_1', 'new', required, (required[0], pd.Timestamp('2024-01-01 12:00')), str(output))
+    assert not manifest.is_current('1_1', 'new')
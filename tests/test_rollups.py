@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.chargeplace.rollups import RollupAccumulator, region_rollups
+
+
+def times(*values):
+    return pd.to_datetime(list(values)).values
+
+
+def test_connectors_count_towards_their_own_carbon_region():
+    rollup = RollupAccumulator('Authority 00')
+    rollup.add(times('2024-01-01 10:00', '2024-01-01 10:30'), [1.0, 2.0],
+               times('2024-01-01 10:00', '2024-01-01 10:30'), [1, 1], region_id=1)
+    rollup.add(times('2024-01-01 10:30'), [4.0], times('2024-01-01 10:30', '2024-01-01 11:00'), [1, 1], region_id=2)
+    rollup.add(times('2024-01-01 11:00'), [0.5], times('2024-01-01 11:00'), [1], region_id=1)
+
+    frame = rollup.frame(30)
+
+    assert list(frame['Region ID']) == [1, 1, 1, 2, 2, 2]
+    np.testing.assert_allclose(frame['Consumed'], [1.0, 2.0, 0.5, 0.0, 4.0, 0.0])
+    np.testing.assert_array_equal(frame['Occupied Connectors'], [1, 1, 1, 0, 1, 1])
+
+    regions = region_rollups([frame])
+    assert regions.groupby('Region ID')['Consumed'].sum().to_dict() == {'1': 3.5, '2': 4.0}
+
+
+def test_overlapping_sessions_occupy_one_connector():
+    rollup = RollupAccumulator('Authority 00')
+    rollup.add(times('2024-01-01 10:00'), [1.0], times('2024-01-01 10:00', '2024-01-01 10:00'), [1, 1], region_id=1)
+    assert list(rollup.frame(30)['Occupied Connectors']) == [1]
+
+
+def test_pipeline_rollups_use_the_carbon_region(pipeline):
+    # the infrastructure claims a region the carbon data of the authority does not belong to
+    for la in pipeline.local_auths:
+        path = pipeline.path(la, 'charging_infrastructure.csv')
+        infrastructure = pd.read_csv(path)
+        infrastructure.loc[::2, 'Region ID'] = 99
+        infrastructure.to_csv(path, index=False)
+
+    pipeline.populate(rollups=True, incremental=False)
+
+    authorities = pd.read_csv(pipeline.base_dir + '/authority_rollups.csv')
+    assert 99 not in set(authorities['Region ID'])
+    regions = pd.read_csv(pipeline.base_dir + '/region_rollups.csv')
+    np.testing.assert_allclose(regions['Consumed'].sum(), authorities['Consumed'].sum())
+
+
+def test_rollups_are_not_combined_with_incremental_runs(pipeline):
+    with pytest.raises(ValueError, match='Rollups'):
+        pipeline.populate(rollups=True, incremental=True)
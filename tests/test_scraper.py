@@ -0,0 +1,152 @@
+import hashlib
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from data import scraper
+from src.chargeplace.session_partitions import SessionPartitions
+
+BASE_URL = 'https://chargeplacescotland.org/'
+PAGE = """
+<html><body>
+<p>January 2024 <a href="/reports/jan-2024-sessions.csv">Session data</a></p>
+<p>February 2024 <a href="/reports/feb-2024-sessions.csv">Session data</a></p>
+</body></html>
+"""
+
+
+def report_content(year, month, n=150, consumed=5.0):
+    """A monthly report as published: day first starts, hh:mm:ss durations, the report's own column names."""
+    rows = [{'CP ID': 50000 + k % 4, 'Connector ID': 1 + k % 2,
+             'Start Date': f'{1 + k % 28:02d}/{month:02d}/{year} {k % 24:02d}:{k % 60:02d}',
+             'Duration': f'{k % 5:02d}:{k % 60:02d}:00', 'Consumed kWh': consumed + k % 7, 'Amount': 1.5}
+            for k in range(n)]
+    return pd.DataFrame(rows).to_csv(index=False).encode('utf-8')
+
+
+class Response:
+    def __init__(self, status_code, content=None, headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f'HTTP {self.status_code}')
+
+
+class FakeSite:
+    """Serves report files with an ETag and answers matching conditional requests with 304."""
+
+    def __init__(self):
+        self.files = {
+            BASE_URL + 'reports/jan-2024-sessions.csv': report_content(2024, 1),
+            BASE_URL + 'reports/feb-2024-sessions.csv': report_content(2024, 2),
+        }
+        self.requests = []
+
+    def etag(self, url):
+        return '"' + hashlib.sha256(self.files[url]).hexdigest()[:16] + '"'
+
+    def get(self, url, headers=None, timeout=None):
+        headers = headers or {}
+        self.requests.append((url, dict(headers)))
+        if headers.get('If-None-Match') == self.etag(url):
+            return Response(304, headers={'ETag': self.etag(url)})
+        return Response(200, self.files[url], {'ETag': self.etag(url)})
+
+    # requests.Session interface used by scrape_sessions_data
+    def mount(self, prefix, adapter):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+@pytest.fixture
+def site(monkeypatch):
+    site = FakeSite()
+    monkeypatch.setattr(scraper.requests, 'Session', lambda: site)
+    return site
+
+
+def scrape(tmp_path, **kwargs):
+    scraper.scrape_sessions_data(PAGE, output_dir=str(tmp_path / 'reports'), max_workers=2,
+                                 sessions_dir=str(tmp_path / 'sessions'), **kwargs)
+
+
+def mtimes(tmp_path):
+    directory = tmp_path / 'reports'
+    return {name: os.stat(directory / name).st_mtime_ns for name in ('january-2024.csv', 'february-2024.csv')}
+
+
+def test_find_session_reports():
+    reports = scraper.find_session_reports(PAGE, base_url=BASE_URL)
+
+    assert [(r.month, r.year, r.filename) for r in reports] == [('january', '2024', 'january-2024.csv'),
+                                                                ('february', '2024', 'february-2024.csv')]
+    assert reports[0].url == BASE_URL + 'reports/jan-2024-sessions.csv'
+
+
+def test_unchanged_reports_are_revalidated_not_converted(tmp_path, site):
+    scrape(tmp_path)
+    index = json.loads((tmp_path / 'reports' / scraper.REPORT_INDEX).read_text())
+    assert set(index) == {'january-2024.csv', 'february-2024.csv'}
+    assert index['january-2024.csv']['start_format'] == '%d/%m/%Y %H:%M'
+    assert all(not headers for _, headers in site.requests)
+    assert SessionPartitions(str(tmp_path / 'sessions')).months() == ['2024-01', '2024-02']
+    before = mtimes(tmp_path)
+
+    site.requests.clear()
+    scrape(tmp_path)
+
+    # every report is asked for with its ETag and none is converted again
+    assert sorted(headers['If-None-Match'] for _, headers in site.requests) == sorted(
+        entry['etag'] for entry in index.values())
+    assert mtimes(tmp_path) == before
+
+
+def test_changed_report_is_converted_again(tmp_path, site):
+    scrape(tmp_path)
+    before = mtimes(tmp_path)
+    written = SessionPartitions(str(tmp_path / 'sessions')).catalog['2024-01']['written']
+
+    site.files[BASE_URL + 'reports/feb-2024-sessions.csv'] = report_content(2024, 2, consumed=8.0)
+    scrape(tmp_path)
+
+    after = mtimes(tmp_path)
+    assert after['january-2024.csv'] == before['january-2024.csv']
+    assert after['february-2024.csv'] != before['february-2024.csv']
+    store = SessionPartitions(str(tmp_path / 'sessions'))
+    assert store.catalog['2024-01']['written'] == written
+    sessions, _ = store.load(months=['2024-02'])
+    assert sessions['Consumed(kWh)'].min() == pytest.approx(8.0)
+
+
+def test_force_converts_every_report(tmp_path, site):
+    scrape(tmp_path)
+    before = mtimes(tmp_path)
+
+    site.requests.clear()
+    scrape(tmp_path, force=True)
+
+    assert all(not headers for _, headers in site.requests)
+    assert all(after != before[name] for name, after in mtimes(tmp_path).items())
+
+
+def test_converted_report_round_trips(tmp_path, site):
+    scrape(tmp_path)
+
+    report = pd.read_csv(tmp_path / 'reports' / 'january-2024.csv')
+    sessions, _ = SessionPartitions(str(tmp_path / 'sessions')).load(months=['2024-01'])
+
+    # the CSV keeps the published text formats, the store the parsed values
+    assert report['Duration'].str.match(r'^\d{2}:\d{2}:\d{2}$').all()
+    assert report['Start'].str.match(r'^2024-01-\d{2} \d{2}:\d{2}:\d{2}$').all()
+    assert len(sessions) == len(report)
+    assert sorted(pd.to_timedelta(report['Duration'])) == sorted(sessions['Duration'])
@@ -0,0 +1,91 @@
+import os
+
+import pandas as pd
+import pytest
+
+from src.chargeplace.ingest import read_sessions_csv
+from src.chargeplace.session_partitions import CATALOG_FILE, SessionPartitions, load_sessions_source
+
+
+def month_sessions(year, month, n=4, consumed=2.0):
+    return pd.DataFrame({
+        'Start': [f'{year}-{month:02d}-{1 + 7 * k:02d} 10:00:00' for k in range(n)],
+        'Duration': '01:00:00',
+        'Consumed(kWh)': [consumed + k for k in range(n)],
+        'Paid(gbp)': 0.5,
+        'CP ID': [str(50000 + k % 2) for k in range(n)],
+        'Connector': 1,
+    })
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SessionPartitions(str(tmp_path / 'sessions'))
+    for month in (1, 2, 3):
+        store.append(2024, month, month_sessions(2024, month), source=f'report-{month}')
+    return store
+
+
+def test_catalog_records_every_month(store):
+    reopened = SessionPartitions(store.directory)
+
+    assert reopened.months() == ['2024-01', '2024-02', '2024-03']
+    entry = reopened.catalog['2024-02']
+    assert entry['rows'] == 4 and entry['source'] == 'report-2'
+    assert entry['start_min'] == '2024-02-01T10:00:00' and entry['start_max'] == '2024-02-22T10:00:00'
+    assert os.path.exists(os.path.join(store.directory, CATALOG_FILE))
+
+
+def test_replacing_a_month_leaves_the_others(store):
+    files = {key: os.stat(os.path.join(store.directory, store.catalog[key]['file'])).st_mtime_ns
+             for key in store.months()}
+
+    store.append(2024, 2, month_sessions(2024, 2, n=2, consumed=9.0), source='report-2b')
+
+    for key in ('2024-01', '2024-03'):
+        assert os.stat(os.path.join(store.directory, store.catalog[key]['file'])).st_mtime_ns == files[key]
+    sessions, _ = store.load(months=['2024-02'])
+    assert list(sessions['Consumed(kWh)']) == [9.0, 10.0]
+    assert store.is_current(2024, 2, source='report-2b') and not store.is_current(2024, 2, source='report-2')
+
+
+def test_is_current_needs_the_month_file(store):
+    assert store.is_current(2024, 1) and not store.is_current(2024, 4)
+
+    os.remove(os.path.join(store.directory, store.catalog['2024-01']['file']))
+
+    assert not store.is_current(2024, 1)
+
+
+def test_date_range_skips_months(store):
+    assert store.select(start='2024-02-10') == ['2024-02', '2024-03']
+    assert store.select(end='2024-02-01') == ['2024-01']
+    assert store.select(months=['2024-03', '2024-05']) == ['2024-03']
+
+    sessions, stats = store.load(start='2024-02-10', end='2024-03-10')
+
+    assert stats.chunks == 2
+    assert list(sessions['Start'].dt.strftime('%Y-%m-%d')) == ['2024-02-15', '2024-02-22', '2024-03-01',
+                                                                '2024-03-08']
+
+
+def test_store_loads_like_the_csv(store, tmp_path):
+    path = tmp_path / 'all_sessions.csv'
+    pd.concat([month_sessions(2024, month) for month in (1, 2, 3)]).to_csv(path, index=False)
+
+    from_store, _ = load_sessions_source(store.directory)
+    from_csv, _ = read_sessions_csv(str(path))
+
+    pd.testing.assert_frame_equal(from_store, from_csv)
+
+
+def test_csv_source_is_filtered_like_the_store(store, tmp_path):
+    path = tmp_path / 'all_sessions.csv'
+    pd.concat([month_sessions(2024, month) for month in (1, 2, 3)]).to_csv(path, index=False)
+
+    for selection in [dict(months=['2024-01', '2024-03']), dict(start='2024-01-20', end='2024-03-02')]:
+        from_store, _ = load_sessions_source(store.directory, **selection)
+        from_csv, stats = load_sessions_source(str(path), **selection)
+
+        assert stats.rows == len(from_csv)
+        pd.testing.assert_frame_equal(from_store.reset_index(drop=True), from_csv)
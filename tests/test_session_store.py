@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+from src.chargeplace.session_store import SessionStore
+
+SESSIONS = pd.DataFrame({
+    'Start': pd.to_datetime(['2024-01-01 10:00', '2024-01-01 09:00', '2024-01-02 08:00', '2024-01-01 12:00',
+                             '2024-01-03 07:00', '2024-01-01 13:00']),
+    'Duration': pd.to_timedelta(['1h', '2h', '30min', '1h', '3h', '1h']),
+    'Consumed(kWh)': [1.0, 2.0, 3.0, 4.0, 5.0, 6.0],
+    'CP ID': ['50002', '50001', '50002', '50001', '50003', None],
+    'Connector': [1, 2, 1, 2, 1, 1],
+})
+INFRASTRUCTURE = pd.DataFrame({
+    'CP ID': [50001, 50002, 50004],
+    'Connector': ['2', '1', '1'],
+    'Nominal Power (kW)': [7.0, 22.0, 50.0],
+})
+
+
+def test_get_returns_a_connectors_sessions_in_order():
+    store = SessionStore(SESSIONS)
+
+    sessions = store.get('50002', 1)
+    assert list(sessions['Consumed(kWh)']) == [1.0, 3.0]
+    assert store.get(50001, '2')['Consumed(kWh)'].tolist() == [2.0, 4.0]
+    assert store.get('50004', 1).empty
+    # sessions without a CP ID can never be matched
+    assert len(store) == len(SESSIONS)
+    assert sorted(store.keys()) == [('50001', '2'), ('50002', '1'), ('50003', '1')]
+
+
+def test_join_matches_an_inner_merge():
+    joined = SessionStore(SESSIONS).join(INFRASTRUCTURE)
+
+    expected = pd.merge(SESSIONS.astype({'CP ID': str, 'Connector': str}),
+                        INFRASTRUCTURE.astype({'CP ID': str, 'Connector': str}), on=['CP ID', 'Connector'])
+    order = ['CP ID', 'Connector', 'Start']
+    joined = joined.sort_values(order).reset_index(drop=True)
+    expected = expected.sort_values(order).reset_index(drop=True)
+    pd.testing.assert_frame_equal(joined[expected.columns], expected, check_dtype=False)
+
+
+def test_join_keeps_each_connector_contiguous():
+    joined = SessionStore(SESSIONS).join(INFRASTRUCTURE)
+
+    keys = list(zip(joined['CP ID'], joined['Connector']))
+    changes = sum(a != b for a, b in zip(keys, keys[1:]))
+    assert changes == len(set(keys)) - 1
+    np.testing.assert_array_equal(joined['Nominal Power (kW)'], [7.0, 7.0, 22.0, 22.0])
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.chargeplace.chargeplace_scotland_api import ChargePlaceScotlandAPI
+from src.chargeplace.sessions import expand_sessions
+
+SESSIONS = pd.DataFrame([
+    # start, duration, kWh, kW
+    ('2024-01-01 10:00', '1h', 3.5, 7.0),             # starts on an interval boundary
+    ('2024-01-01 10:20', '2h', 5.0, 7.0),             # charging and stay cross several boundaries
+    ('2024-01-01 23:50', '40min', 2.0, 22.0),         # crosses midnight
+    ('2024-01-02 08:07', '9h13min', 40.0, 7.0),       # long charge with an overstay
+    ('2024-01-02 12:44', '3h', 4.0, 50.0),            # finishes charging within its first interval
+    ('2024-01-02 14:30', '30min', 0.0, 7.0),          # zero consumption
+    ('2024-01-03 09:15', None, 6.0, 7.0),             # unknown end
+    ('2024-01-03 17:59', '1min', 0.1, 3.6),
+], columns=['Start', 'Duration', 'Consumed(kWh)', 'Nominal Power (kW)'])
+SESSIONS['Start'] = pd.to_datetime(SESSIONS['Start'])
+SESSIONS['Duration'] = pd.to_timedelta(SESSIONS['Duration'])
+SESSIONS['CP ID'] = '50001'
+SESSIONS['Connector'] = 1
+
+
+def expand_reference(sessions, granularity):
+    # the reference loop only uses the interval helpers, not the loaded inputs
+    api = ChargePlaceScotlandAPI.__new__(ChargePlaceScotlandAPI)
+    return api._expand_group_reference(sessions, granularity)
+
+
+def expand_vectorized(sessions, granularity):
+    energy, occupied = expand_sessions(sessions['Start'].values, sessions['Duration'].values,
+                                       sessions['Consumed(kWh)'].values, sessions['Nominal Power (kW)'].values,
+                                       granularity)
+    return energy.timestamp, energy.value, occupied.timestamp, occupied.value
+
+
+def assert_equivalent(sessions, granularity):
+    energy_times, energy, occupied_times, occupied = expand_reference(sessions, granularity)
+    v_energy_times, v_energy, v_occupied_times, v_occupied = expand_vectorized(sessions, granularity)
+
+    np.testing.assert_array_equal(v_energy_times, pd.to_datetime(energy_times).values)
+    np.testing.assert_allclose(v_energy, energy, rtol=0, atol=1e-9)
+    np.testing.assert_array_equal(v_occupied_times, pd.to_datetime(occupied_times).values)
+    np.testing.assert_array_equal(v_occupied, occupied)
+
+
+@pytest.mark.parametrize('granularity', [15, 30, 60])
+def test_vectorized_expansion_matches_reference(granularity):
+    assert_equivalent(SESSIONS, granularity)
+
+
+def test_sessions_with_unknown_end_are_skipped(caplog):
+    with caplog.at_level('WARNING'):
+        expand_reference(SESSIONS, 30)
+    assert 'Issue stay period 50001_1 at 2024-01-03 09:15:00' in caplog.text
+
+    energy, occupied = expand_sessions(SESSIONS['Start'].values, SESSIONS['Duration'].values,
+                                       SESSIONS['Consumed(kWh)'].values, SESSIONS['Nominal Power (kW)'].values, 30)
+    skipped = SESSIONS.index[SESSIONS['Duration'].isna()][0]
+    assert skipped not in energy.session
+    assert skipped not in occupied.session
+
+
+def test_missing_consumption_is_skipped_without_affecting_other_sessions():
+    sessions = SESSIONS.copy()
+    sessions.loc[1, 'Consumed(kWh)'] = np.nan
+    energy, occupied = expand_sessions(sessions['Start'].values, sessions['Duration'].values,
+                                       sessions['Consumed(kWh)'].values, sessions['Nominal Power (kW)'].values, 30)
+    assert 1 not in energy.session
+    assert 1 not in occupied.session
+
+    # the reference loop cannot distribute NaN kWh at all, so compare against it without that session
+    kept = sessions.drop(index=1)
+    energy_times, energy_values, occupied_times, _ = expand_reference(kept, 30)
+    np.testing.assert_array_equal(energy.timestamp, pd.to_datetime(energy_times).values)
+    np.testing.assert_allclose(energy.value, energy_values, rtol=0, atol=1e-9)
+    np.testing.assert_array_equal(occupied.timestamp, pd.to_datetime(occupied_times).values)
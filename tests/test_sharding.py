@@ -0,0 +1,118 @@
+import os
+
+import pandas as pd
+import pytest
+
+from conftest import Pipeline
+from src.chargeplace.manifest import Manifest
+from src.chargeplace.sharding import assign_shards, find_shards, merge_shards, parse_shard, shard_root
+
+
+def read_outputs(pipeline, output_format='csv', layout='dense'):
+    """{(local_auth, name): frame} of every connector output, Parquet datasets in a stable row order."""
+    frames = {}
+    for la in pipeline.local_auths:
+        if output_format == 'parquet':
+            dataset = pd.read_parquet(pipeline.path(la, 'sessions_mix.parquet'))
+            frames[la, 'sessions_mix.parquet'] = dataset.sort_values(['CP ID', 'Connector', 'Timestamp']) \
+                .reset_index(drop=True)
+            continue
+        folder = pipeline.path(la, 'sessions_sparse' if layout == 'sparse' else 'sessions_mix')
+        for name in sorted(os.listdir(folder)):
+            frame = pd.read_csv(os.path.join(folder, name))
+            if name == 'index.csv':
+                frame = frame.sort_values(['CP ID', 'Connector']).reset_index(drop=True)
+            frames[la, name] = frame
+    return frames
+
+
+@pytest.fixture
+def pipelines(tmp_path):
+    """Two pipelines on the same synthetic inputs: one runs unsharded, the other in shards."""
+    for name in ('whole', 'sharded'):
+        (tmp_path / name).mkdir()
+    pair = Pipeline(str(tmp_path / 'whole')), Pipeline(str(tmp_path / 'sharded'))
+    yield pair
+    for pipeline in pair:
+        pipeline.fetcher.close()
+
+
+def test_parse_shard():
+    assert parse_shard('2/3') == (2, 3, 'connector')
+    assert parse_shard(' 1 / 1 ', 'authority') == (1, 1, 'authority')
+    for text in ['0/2', '3/2', '1', 'a/b']:
+        with pytest.raises(ValueError):
+            parse_shard(text)
+    with pytest.raises(ValueError):
+        parse_shard('1/2', 'charger')
+
+
+def test_assignment_is_deterministic_and_balanced():
+    costs = {f'key{k}': cost for k, cost in enumerate([9, 7, 6, 5, 5, 4, 3, 2, 2, 1])}
+
+    assignment = assign_shards(costs, 3)
+
+    assert assignment == assign_shards(dict(reversed(list(costs.items()))), 3)
+    loads = [sum(cost for key, cost in costs.items() if assignment[key] == index) for index in (1, 2, 3)]
+    assert max(loads) - min(loads) <= max(costs.values()) / 2
+
+
+@pytest.mark.parametrize('by', ['connector', 'authority'])
+@pytest.mark.parametrize('output_format, layout', [('csv', 'dense'), ('csv', 'sparse'), ('parquet', 'dense')])
+def test_merged_shards_match_an_unsharded_run(pipelines, by, output_format, layout):
+    whole, sharded = pipelines
+    settings = dict(output_format=output_format, layout=layout, incremental=False)
+    whole.populate(**settings)
+
+    for index in (1, 2):
+        sharded.populate(shard=parse_shard(f'{index}/2', by), **settings)
+    assert [shard.index for shard, _ in find_shards(sharded.base_dir)] == [1, 2]
+    assert merge_shards(sharded.base_dir) == 2
+
+    assert not os.path.exists(shard_root(sharded.base_dir))
+    expected = read_outputs(whole, output_format, layout)
+    assert expected
+    assert read_outputs(sharded, output_format, layout).keys() == expected.keys()
+    for key, frame in read_outputs(sharded, output_format, layout).items():
+        pd.testing.assert_frame_equal(frame, expected[key], check_exact=False, rtol=1e-9, atol=1e-9)
+
+
+def test_merged_manifest_keeps_the_outputs_current(pipelines):
+    whole, sharded = pipelines
+    whole.populate()
+    for index in (1, 2):
+        sharded.populate(shard=parse_shard(f'{index}/2'))
+    merge_shards(sharded.base_dir)
+
+    for la in sharded.local_auths:
+        merged = Manifest(sharded.base_dir, la).entries
+        assert merged.keys() == Manifest(whole.base_dir, la).entries.keys()
+        assert all(os.path.dirname(entry['output']) == sharded.path(la, 'sessions_mix')
+                   for entry in merged.values())
+
+    # an incremental run after the merge finds every connector up to date
+    files = [sharded.path(la, 'sessions_mix', name) for la in sharded.local_auths
+             for name in os.listdir(sharded.path(la, 'sessions_mix'))]
+    before = {path: os.stat(path).st_mtime_ns for path in files}
+    sharded.populate()
+    assert {path: os.stat(path).st_mtime_ns for path in files} == before
+
+
+def test_merged_rollups_match_an_unsharded_run(pipelines):
+    whole, sharded = pipelines
+    whole.populate(rollups=True, incremental=False)
+    for index in (1, 2):
+        sharded.populate(shard=parse_shard(f'{index}/2'), rollups=True, incremental=False)
+    merge_shards(sharded.base_dir)
+
+    expected = pd.read_csv(os.path.join(whole.base_dir, 'authority_rollups.csv'))
+    merged = pd.read_csv(os.path.join(sharded.base_dir, 'authority_rollups.csv'))
+    pd.testing.assert_frame_equal(merged, expected, check_exact=False, rtol=1e-9, atol=1e-9)
+
+
+def test_missing_shard_is_refused(pipelines):
+    _, sharded = pipelines
+    sharded.populate(shard=parse_shard('1/2'))
+
+    with pytest.raises(ValueError, match='Shards \\[2\\]'):
+        merge_shards(sharded.base_dir)
@@ -0,0 +1,52 @@
+import os
+
+import pandas as pd
+import pytest
+
+from src.chargeplace.sparse import DENSE_COLUMNS, iter_connectors, load_connector, read_index
+
+
+def read_dense(pipeline, local_auth, name, folder='sessions_mix'):
+    frame = pd.read_csv(pipeline.path(local_auth, folder, name))
+    frame['Timestamp'] = pd.to_datetime(frame['Timestamp'], utc=True)
+    return frame[DENSE_COLUMNS]
+
+
+@pytest.mark.parametrize('granularity', [30, 15])
+def test_sparse_layout_expands_to_the_dense_files(pipeline, granularity):
+    pipeline.populate(layout='dense', granularity=granularity, incremental=False)
+    pipeline.populate(layout='sparse', granularity=granularity, incremental=False)
+
+    suffix = '' if granularity == 30 else f'_{granularity}min'
+    compared = 0
+    for la in pipeline.local_auths:
+        dense_names = sorted(os.listdir(pipeline.path(la, 'sessions_mix' + suffix)))
+        connectors = dict(iter_connectors(pipeline.base_dir, la, granularity))
+        assert sorted(f'{cp_id}_{connector}.csv' for cp_id, connector in connectors) == dense_names
+
+        for (cp_id, connector), sparse in connectors.items():
+            dense = read_dense(pipeline, la, f'{cp_id}_{connector}.csv', 'sessions_mix' + suffix)
+            pd.testing.assert_frame_equal(sparse, dense, check_dtype=False)
+            compared += 1
+    assert compared
+
+
+def test_sparse_files_only_hold_active_intervals(pipeline):
+    pipeline.populate(layout='dense', incremental=False)
+    pipeline.populate(layout='sparse', incremental=False)
+
+    la = pipeline.local_auths[0]
+    index = read_index(pipeline.base_dir, la)
+    entry = index.iloc[0]
+    sparse = pd.read_csv(pipeline.path(la, 'sessions_sparse', entry['File']))
+    dense = read_dense(pipeline, la, f"{entry['CP ID']}_{entry['Connector']}.csv")
+
+    active = dense[(dense['Consumed'] != 0) | (dense['Occupied'] != 0)]
+    assert len(sparse) == len(active) < len(dense)
+
+
+def test_unknown_connector(pipeline):
+    pipeline.populate(layout='sparse', incremental=False)
+
+    with pytest.raises(KeyError):
+        load_connector(pipeline.base_dir, pipeline.local_auths[0], 'missing', 1)
@@ -0,0 +1,88 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import FakeWeatherClient
+from src.weather.weather_client import HOURLY_VARIABLES
+from src.weather.weather_service import WeatherService, join_weather
+from src.weather.weather_store import WeatherStore
+
+
+class RecordingWeatherClient(FakeWeatherClient):
+    """`FakeWeatherClient` that also remembers the date range and locations of every request."""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def hourly(self, latitudes, longitudes, start_date, end_date, variables):
+        self.calls.append((list(latitudes), list(longitudes), start_date, end_date))
+        return super().hourly(latitudes, longitudes, start_date, end_date, variables)
+
+
+def utc(value):
+    return pd.Timestamp(value, tz='UTC')
+
+
+def cell_frame(cells, start, end):
+    return pd.DataFrame({'cell': [f'{lat:.4f},{lon:.4f}' for lat, lon in cells],
+                         'latitude': [lat for lat, _ in cells], 'longitude': [lon for _, lon in cells],
+                         'start': utc(start), 'end': utc(end)})
+
+
+@pytest.fixture
+def store(tmp_path):
+    return WeatherStore(str(tmp_path / 'weather.sqlite'))
+
+
+def test_prefetch_batches_cells_and_caches_them(store):
+    client = RecordingWeatherClient()
+    service = WeatherService(store, client=client, batch_size=2)
+    cells = cell_frame([(55.9, -3.2), (55.8, -4.3), (57.1, -2.1)], '2024-01-01', '2024-01-03')
+
+    assert service.prefetch(cells) == 2
+    assert client.requests == 2
+    assert client.locations == 3
+
+    weather = service.hourly(cells)
+    assert client.requests == 2
+    assert sorted(weather) == sorted(cells['cell'])
+    for table in weather.values():
+        assert len(table) == 48
+        assert table.index.min() == utc('2024-01-01')
+    assert service.prefetch(cells) == 0
+
+
+def test_store_fetches_only_missing_ranges(store):
+    client = RecordingWeatherClient()
+    service = WeatherService(store, client=client)
+    service.prefetch(cell_frame([(55.9, -3.2)], '2024-01-03', '2024-01-05'))
+
+    cells = cell_frame([(55.9, -3.2)], '2024-01-01', '2024-01-07')
+    assert store.missing(cells['cell'][0], utc('2024-01-01'), utc('2024-01-07')) == [
+        (utc('2024-01-01'), utc('2024-01-03')), (utc('2024-01-05'), utc('2024-01-07'))]
+
+    assert service.prefetch(cells) == 2
+    # the two gaps are requested on their own, never the range stored by the first call
+    assert [(call[2], call[3]) for call in client.calls[1:]] == [
+        (date(2024, 1, 1), date(2024, 1, 2)), (date(2024, 1, 5), date(2024, 1, 6))]
+    assert store.missing(cells['cell'][0], utc('2024-01-01'), utc('2024-01-07')) == []
+    assert len(store.load(cells['cell'], utc('2024-01-01'), utc('2024-01-07'))) == 6 * 24
+
+
+def test_join_weather_matches_the_hour_an_interval_starts_in():
+    hours = pd.date_range(utc('2024-01-01 10:00'), periods=2, freq='60min')
+    table = pd.DataFrame({'temperature_2m': [4.0, 6.0], 'snowfall': [0.0, 1.5]}, index=hours)
+    # session times are naive UTC; 10:30 and 10:45 fall mid-hour, 12:00 has no weather
+    frame = pd.DataFrame({'Timestamp': pd.to_datetime(['2024-01-01 10:00', '2024-01-01 10:30',
+                                                       '2024-01-01 10:45', '2024-01-01 11:00',
+                                                       '2024-01-01 11:59', '2024-01-01 12:00'])})
+
+    joined = join_weather(frame, table)
+
+    temperature = HOURLY_VARIABLES['temperature_2m']
+    np.testing.assert_array_equal(joined[temperature], [4.0, 4.0, 4.0, 6.0, 6.0, np.nan])
+    np.testing.assert_array_equal(joined[HOURLY_VARIABLES['snowfall']], [0.0, 0.0, 0.0, 1.5, 1.5, np.nan])
+    pd.testing.assert_series_equal(joined['Timestamp'], frame['Timestamp'])
@@ -0,0 +1,43 @@
+import os
+
+import pandas as pd
+
+from src.chargeplace.writers import ParquetWriter
+
+
+def test_parquet_rerun_keeps_dataset(pipeline):
+    pipeline.populate(output_format='parquet')
+    first = {la: pd.read_parquet(pipeline.path(la, 'sessions_mix.parquet')) for la in pipeline.local_auths}
+
+    # nothing changed: every connector is current and no writer receives rows
+    pipeline.populate(output_format='parquet')
+
+    for la in pipeline.local_auths:
+        assert os.path.isdir(pipeline.path(la, 'sessions_mix.parquet'))
+        pd.testing.assert_frame_equal(pd.read_parquet(pipeline.path(la, 'sessions_mix.parquet')), first[la])
+
+
+def test_parquet_writer_replaces_earlier_dataset(tmp_path):
+    stale = tmp_path / 'LA' / 'sessions_mix.parquet' / 'year=2020'
+    stale.mkdir(parents=True)
+    (stale / 'part-0.parquet').write_bytes(b'')
+
+    writer = ParquetWriter(str(tmp_path), 'LA', partition_by_year=True)
+    frame = pd.DataFrame({'Timestamp': pd.date_range('2024-01-01', periods=3, freq='30min'),
+                          'Consumed': [0.0, 1.5, 0.5], 'Occupied': [0, 1, 1],
+                          'Carbon Index': ['low', 'low', 'high'], 'Region ID': [1, 1, 1]})
+    writer.write(frame, 50001, 1)
+    writer.close()
+
+    assert sorted(os.listdir(tmp_path / 'LA' / 'sessions_mix.parquet')) == ['year=2024']
+    assert len(pd.read_parquet(tmp_path / 'LA' / 'sessions_mix.parquet')) == 3
+
+
+def test_parquet_writer_without_writes_leaves_dataset(tmp_path):
+    dataset = tmp_path / 'LA' / 'sessions_mix.parquet'
+    dataset.mkdir(parents=True)
+    (dataset / 'part-0.parquet').write_bytes(b'')
+
+    ParquetWriter(str(tmp_path), 'LA').close()
+
+    assert os.listdir(dataset) == ['part-0.parquet']